@@ -0,0 +1,512 @@
+#
+#  dagBenchmark.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Time the DAG and closure code of vocload, and measure its peak
+#      memory, on synthetic ontologies (see ontologyGenerator.py), so
+#      changes can be measured without a database:
+#
+#          dagClosure.closurePairs      - the closure used by loadDAG.py
+#          loadDAG.getClosure           - the closure as a dictionary
+#          vocloadDAG.build             - building a vocloadDAG.DAG
+#          vocloadDAG.buildChecked      - building it with every edge
+#                                         checked for cycles (in a
+#                                         shuffled order)
+#          vocloadDAG.Closure           - the closure traversal
+#          vocloadDAG.checkCycles       - the cycle check (of a DAG with
+#                                         one cycle added)
+#          vocloadDAG.freeze            - taking a FrozenDAG snapshot
+#          FrozenDAG.getClosure         - the closure of the snapshot
+#          ReachabilityIndex            - building the ancestor/descendant
+#                                         index, and querying it
+#          vocloadDAG.walkParents       - visiting every node's parents,
+#                                         as emapload.py does
+#          FrozenDAG.walkParents        - the same, on the snapshot
+#          DAG.getTransitiveClosure     - the closure of lib/DAG.py
+#          DAG.getSortOrder             - the sort used by loadTopSort.py
+#          Ontology.OboLoader           - parsing the OBO file into a DAG
+#          OBOParser.Parser             - parsing the OBO file into terms
+#
+#  Usage:
+#
+#      dagBenchmark.py [-s shape,...] [-b benchmark,...] [-n terms]
+#          [-r repeats] [-e seed] [-o output file]
+#
+#      -s : shapes to generate (default: all of ontologyGenerator.SHAPES)
+#      -b : benchmarks to run (default: all)
+#      -n : number of terms (default: each shape's own)
+#      -r : number of timed runs of each benchmark (default: 3)
+#      -e : seed for the generator (default: 1)
+#      -o : where to write the JSON results (default: stdout)
+#
+#  Env Vars:
+#
+#      VOCLOAD - the vocload product directory
+#
+#  Inputs:  None; the ontologies are generated, and the OBO files are
+#           written to a temporary directory
+#
+#  Outputs:
+#
+#      - JSON: for each shape and benchmark, the time of each run, the
+#        best and median times, the tracemalloc peak, and the size of
+#        the result (to check that changes give the same answer)
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      The timed runs are made without tracemalloc (which slows Python
+#      down); one more run, with it, gives the peak memory.  The setup of
+#      each benchmark (building its input) is neither timed nor traced.
+#      Benchmarks whose code is too slow for a large ontology (or whose
+#      modules cannot be imported here) are skipped, with the reason
+#      given in the results.
+#
+###########################################################################
+
+import sys
+import os
+import getopt
+import json
+import platform
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.environ['VOCLOAD'], 'lib'))
+sys.path.insert(0, os.path.join(os.environ['VOCLOAD'], 'bin'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ontologyGenerator
+import dagClosure
+import vocloadDAG
+import DAG
+import Node
+import Ontology
+
+# loadDAG needs the MGI libraries (though not a database); without them,
+# its benchmark is skipped
+os.environ.setdefault('MGITYPE', '13')
+try:
+    import loadDAG
+except ImportError as message:
+    loadDAG = None
+    loadDAGMissing = str(message)
+
+# OBOParser reads the vocabulary name from the environment
+os.environ.setdefault('VOCAB_NAME', 'Benchmark')
+import OBOParser
+
+###--- Globals ---###
+
+USAGE = 'Usage: %s [-s shape,...] [-b benchmark,...] [-n terms] [-r repeats] [-e seed] [-o output file]\n' % sys.argv[0]
+
+REPEATS = 3
+
+###--- Classes ---###
+
+class Log:
+    # IS: a log which throws its lines away
+    # HAS: nothing
+    # DOES: accepts lines (for code which writes to a Log.Log)
+
+    def writeline (self, line):
+        return
+
+###--- Functions ---###
+
+def setupClosurePairs (ontology, tmpdir):
+    # Purpose: get the children lists used by dagClosure
+    # Returns: list of lists of integers
+
+    return ontology.children()
+
+def runClosurePairs (children):
+    # Purpose: generate the closure pairs with dagClosure
+    # Returns: integer; number of pairs
+
+    count = 0
+    for pair in dagClosure.indexedClosurePairs(children):
+        count = count + 1
+    return count
+
+def setupLoadDAGClosure (ontology, tmpdir):
+    # Purpose: get the list of lists used by loadDAG.getClosure()
+    # Returns: list of lists of integers
+
+    # it wants list[0] = the roots, list[i] = the children of
+    # node i (for i > 0)
+    dag = [ [ i + 1 for i in ontology.roots ] ]
+    for kids in ontology.children():
+        dag.append([ i + 1 for i in kids ])
+    return dag
+
+def runLoadDAGClosure (dag):
+    # Purpose: compute the closure with loadDAG.getClosure()
+    # Returns: integer; number of pairs
+
+    closure = loadDAG.getClosure(dag, Log())
+    return sum([ len(descendants) for descendants in closure.values() ]) - len(closure[0])
+
+def buildVocloadDAG (ontology):
+    # Purpose: build a vocloadDAG.DAG of the ontology (without cycle checks)
+    # Returns: vocloadDAG.DAG
+
+    dag = vocloadDAG.DAG()
+    for i in range(0, ontology.termCount()):
+        dag.addNode(i)
+    for (child, parent, relationship) in ontology.edges:
+        dag.addEdge(parent, child, relationship, checkCycles=False)
+    return dag
+
+def setupVocloadDAGBuild (ontology, tmpdir):
+    # Purpose: nothing to set up; the build is what is timed
+    # Returns: the ontology
+
+    return ontology
+
+def runVocloadDAGBuild (ontology):
+    # Purpose: build a vocloadDAG.DAG of the ontology
+    # Returns: integer; number of edges
+
+    return len(list(buildVocloadDAG(ontology).iterEdges()))
+
+def setupVocloadDAGBuildChecked (ontology, tmpdir):
+    # Purpose: shuffle the edges, so they are not added parents first
+    # Returns: tuple; (number of terms, list of edges)
+
+    edges = list(ontology.edges)
+    random.Random(len(edges)).shuffle(edges)
+    return (ontology.termCount(), edges)
+
+def runVocloadDAGBuildChecked (args):
+    # Purpose: build a vocloadDAG.DAG, checking each edge for cycles
+    # Returns: integer; number of edges
+
+    (terms, edges) = args
+    dag = vocloadDAG.DAG()
+    for i in range(0, terms):
+        dag.addNode(i)
+    for (child, parent, relationship) in edges:
+        dag.addEdge(parent, child, relationship)
+    return len(list(dag.iterEdges()))
+
+def setupVocloadDAGClosure (ontology, tmpdir):
+    # Purpose: build the vocloadDAG.DAG to compute the closure of
+    # Returns: vocloadDAG.DAG
+
+    return buildVocloadDAG(ontology)
+
+def runVocloadDAGClosure (dag):
+    # Purpose: compute the closure with vocloadDAG.Closure
+    # Returns: integer; number of pairs (each node's set includes
+    #   the node itself, which is not counted)
+
+    closure = vocloadDAG.Closure().go(dag)
+    return sum([ len(descendants) for descendants in closure.values() ]) - len(closure)
+
+def setupVocloadDAGCycles (ontology, tmpdir):
+    # Purpose: build a vocloadDAG.DAG with one cycle: an edge from the
+    #   last term back to the root of its namespace
+    # Returns: vocloadDAG.DAG
+
+    dag = buildVocloadDAG(ontology)
+    last = ontology.termCount() - 1
+    dag.addEdge(last, ontology.roots[last % len(ontology.roots)], 'is_a', checkCycles=False)
+    return dag
+
+def runVocloadDAGCycles (dag):
+    # Purpose: check the DAG for cycles
+    # Returns: integer; number of nodes involved in cycles
+
+    return len(dag.checkCycles())
+
+def runVocloadDAGFreeze (dag):
+    # Purpose: take an array-based snapshot of the DAG
+    # Returns: integer; number of edges in the snapshot
+
+    return dag.freeze().edgeCount()
+
+def setupFrozenDAG (ontology, tmpdir):
+    # Purpose: build the FrozenDAG snapshot to run algorithms on
+    # Returns: vocloadDAG.FrozenDAG
+
+    return buildVocloadDAG(ontology).freeze()
+
+def runFrozenDAGClosure (frozen):
+    # Purpose: compute the closure of the snapshot
+    # Returns: integer; number of pairs
+
+    closure = frozen.getClosure()
+    return sum([ len(descendants) for descendants in closure.values() ])
+
+def runVocloadDAGWalkParents (dag):
+    # Purpose: visit the parents of every node of the DAG itself, for
+    #   comparison with runFrozenDAGWalkParents()
+    # Returns: integer; number of edges visited
+
+    edges = 0
+    for n in dag.iterNodes():
+        for (parent, label) in dag.iterInEdges(n):
+            edges = edges + 1
+    return edges
+
+def runFrozenDAGWalkParents (frozen):
+    # Purpose: visit the parents of every node of the snapshot
+    # Returns: integer; number of edges visited
+
+    edges = 0
+    for i in range(frozen.nodeCount()):
+        for (parent, label) in frozen.iterInEdges(i):
+            edges = edges + 1
+    return edges
+
+def runReachabilityIndex (frozen):
+    # Purpose: build a ReachabilityIndex of the snapshot and ask it
+    #   whether each node is a descendant of each of the first 20
+    # Returns: integer; number of (node, first node) pairs where it is
+
+    index = vocloadDAG.ReachabilityIndex(frozen)
+    found = 0
+    for m in frozen.nodeList[:20]:
+        for n in frozen.nodeList:
+            if index.isDescendant(n, m):
+                found = found + 1
+    return found
+
+def buildDAG (ontology):
+    # Purpose: build a DAG.DAG of the ontology, with Node.Nodes labeled by term name
+    # Returns: DAG.DAG
+
+    dag = DAG.DAG()
+    nodes = []
+    for i in range(0, ontology.termCount()):
+        nodes.append(Node.Node(i, ontology.names[i]))
+        dag.addNode(nodes[i])
+    for (child, parent, relationship) in ontology.edges:
+        dag.addEdge(nodes[parent], nodes[child], relationship)
+    return dag
+
+def setupDAGClosure (ontology, tmpdir):
+    # Purpose: build the DAG.DAG to compute the closure of
+    # Returns: DAG.DAG
+
+    return buildDAG(ontology)
+
+def runDAGClosure (dag):
+    # Purpose: compute the closure with DAG.getTransitiveClosure()
+    # Returns: integer; number of pairs
+
+    closure = dag.getTransitiveClosure()
+    return sum([ len(descendants) for descendants in closure.values() ])
+
+def setupDAGSortOrder (ontology, tmpdir):
+    # Purpose: build the DAG.DAG to sort, and find its first root
+    # Returns: tuple; (DAG.DAG, id of the root)
+
+    return (buildDAG(ontology), ontology.roots[0])
+
+def runDAGSortOrder (args):
+    # Purpose: sort the DAG as loadTopSort.py does
+    # Returns: integer; number of nodes sorted
+
+    (dag, root) = args
+    return len(dag.getSortOrder(dag.findNode(root)))
+
+def writeOBOFile (ontology, tmpdir):
+    # Purpose: write the ontology as an OBO file (once per shape)
+    # Returns: str. path to the file
+
+    filename = os.path.join(tmpdir, '%s.obo' % ontology.shape)
+    if not os.path.exists(filename):
+        fp = open(filename, 'w')
+        ontology.writeOBO(fp)
+        fp.close()
+    return filename
+
+def runOboLoader (filename):
+    # Purpose: parse the OBO file with Ontology.OboLoader
+    # Returns: integer; number of terms
+
+    ontology = Ontology.OboLoader().loadFile(filename)
+    return len(ontology.getNodes())
+
+def runOBOParser (filename):
+    # Purpose: parse the OBO file with OBOParser.Parser
+    # Returns: integer; number of terms
+
+    fp = open(filename, 'r')
+    parser = OBOParser.Parser(fp, None)
+    count = 0
+    while parser.nextTerm():
+        count = count + 1
+    fp.close()
+    return count
+
+# name -> (setup function, benchmark function, most terms it is run on)
+#   setup(ontology, temporary directory) builds the input for the
+#   benchmark, which returns the size of its result
+
+BENCHMARKS = [
+    ('dagClosure.closurePairs', setupClosurePairs, runClosurePairs, None),
+    ('loadDAG.getClosure', setupLoadDAGClosure, runLoadDAGClosure, None),
+    ('vocloadDAG.build', setupVocloadDAGBuild, runVocloadDAGBuild, None),
+    ('vocloadDAG.buildChecked', setupVocloadDAGBuildChecked, runVocloadDAGBuildChecked, None),
+    ('vocloadDAG.Closure', setupVocloadDAGClosure, runVocloadDAGClosure, None),
+    ('vocloadDAG.checkCycles', setupVocloadDAGCycles, runVocloadDAGCycles, None),
+    ('vocloadDAG.freeze', setupVocloadDAGClosure, runVocloadDAGFreeze, None),
+    ('vocloadDAG.walkParents', setupVocloadDAGClosure, runVocloadDAGWalkParents, None),
+    ('FrozenDAG.walkParents', setupFrozenDAG, runFrozenDAGWalkParents, None),
+    ('FrozenDAG.getClosure', setupFrozenDAG, runFrozenDAGClosure, None),
+    ('ReachabilityIndex', setupFrozenDAG, runReachabilityIndex, None),
+    ('DAG.getTransitiveClosure', setupDAGClosure, runDAGClosure, None),
+    ('DAG.getSortOrder', setupDAGSortOrder, runDAGSortOrder, None),
+    ('Ontology.OboLoader', writeOBOFile, runOboLoader, None),
+    ('OBOParser.Parser', writeOBOFile, runOBOParser, None),
+    ]
+
+def runBenchmark (
+    name,       # str. name of the benchmark
+    setup,      # function; see BENCHMARKS
+    run,        # function; see BENCHMARKS
+    ontology,   # ontologyGenerator.SyntheticOntology
+    tmpdir,     # str. path to a temporary directory
+    repeats     # integer; number of timed runs
+    ):
+    # Purpose: time one benchmark on one ontology, and measure its peak
+    #   memory
+    # Returns: dictionary; the results (see the Outputs above)
+    # Assumes: nothing
+    # Effects: runs the benchmark repeats + 1 times
+    # Throws: propagates any exception from the benchmark
+
+    arg = setup(ontology, tmpdir)
+
+    seconds = []
+    size = None
+    for i in range(0, repeats):
+        start = time.perf_counter()
+        size = run(arg)
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run(arg)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ordered = sorted(seconds)
+    return { 'seconds' : seconds,
+        'best' : ordered[0],
+        'median' : ordered[len(ordered) // 2],
+        'peakBytes' : peak,
+        'resultSize' : size }
+
+def benchmarkShape (
+    shape,      # str. one of the keys of ontologyGenerator.SHAPES
+    names,      # list of str.; the benchmarks to run
+    terms,      # integer; number of terms, or None for the shape's own
+    seed,       # integer; seed for the generator
+    repeats,    # integer; number of timed runs of each benchmark
+    tmpdir      # str. path to a temporary directory
+    ):
+    # Purpose: run the benchmarks on an ontology of one shape
+    # Returns: dictionary; the ontology's size and each benchmark's results
+    # Assumes: nothing
+    # Effects: writes progress to stderr
+    # Throws: propagates any exception from the benchmarks
+
+    start = time.perf_counter()
+    ontology = ontologyGenerator.generate(shape, terms, seed)
+    generated = time.perf_counter() - start
+
+    results = { 'shape' : shape,
+        'terms' : ontology.termCount(),
+        'edges' : ontology.edgeCount(),
+        'closurePairs' : dagClosure.closureSize(ontology.children()),
+        'generateSeconds' : generated,
+        'benchmarks' : {} }
+
+    for (name, setup, run, maxTerms) in BENCHMARKS:
+        if name not in names:
+            continue
+        if name == 'loadDAG.getClosure' and loadDAG is None:
+            results['benchmarks'][name] = { 'skipped' : loadDAGMissing }
+            continue
+        if maxTerms is not None and ontology.termCount() > maxTerms:
+            results['benchmarks'][name] = { 'skipped' : 'more than %d terms (use -n)' % maxTerms }
+            continue
+
+        sys.stderr.write('%s: %s...\n' % (shape, name))
+        results['benchmarks'][name] = runBenchmark(name, setup, run,
+            ontology, tmpdir, repeats)
+
+    return results
+
+###--- Main Program ---###
+
+if __name__ == '__main__':
+    shapes = sorted(ontologyGenerator.SHAPES.keys())
+    names = [ benchmark[0] for benchmark in BENCHMARKS ]
+    terms = None
+    repeats = REPEATS
+    seed = 1
+    output = None
+
+    try:
+        (options, args) = getopt.getopt(sys.argv[1:], 's:b:n:r:e:o:')
+        for (option, value) in options:
+            if option == '-s':
+                shapes = value.split(',')
+            elif option == '-b':
+                names = value.split(',')
+            elif option == '-n':
+                terms = int(value)
+            elif option == '-r':
+                repeats = max(1, int(value))
+            elif option == '-e':
+                seed = int(value)
+            elif option == '-o':
+                output = value
+        for shape in shapes:
+            if shape not in ontologyGenerator.SHAPES:
+                raise ValueError('unknown shape: %s' % shape)
+        for name in names:
+            if name not in [ benchmark[0] for benchmark in BENCHMARKS ]:
+                raise ValueError('unknown benchmark: %s' % name)
+    except (getopt.GetoptError, ValueError) as message:
+        sys.stderr.write('%s\n%s' % (message, USAGE))
+        sys.exit(1)
+
+    report = { 'python' : platform.python_version(),
+        'platform' : platform.platform(),
+        'seed' : seed,
+        'repeats' : repeats,
+        'shapes' : [] }
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for shape in shapes:
+            report['shapes'].append(benchmarkShape(shape, names, terms,
+                seed, repeats, tmpdir))
+    finally:
+        shutil.rmtree(tmpdir)
+
+    if output:
+        fp = open(output, 'w')
+        json.dump(report, fp, indent=2, sort_keys=True)
+        fp.write('\n')
+        fp.close()
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    sys.exit(0)
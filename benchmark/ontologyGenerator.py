@@ -0,0 +1,314 @@
+#
+#  ontologyGenerator.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Generate synthetic ontologies shaped like the ones vocload loads,
+#      for benchmarking the DAG and closure code without a database:
+#
+#          go     - about 50,000 terms under three namespace roots; deep,
+#                   with many terms having several parents (is_a, part_of
+#                   and regulates)
+#          mp     - about 14,000 terms under one root; mostly a tree
+#          hpo    - about 17,000 terms under one root; more parents per
+#                   term than MP
+#          emapa  - about 8,500 anatomy terms, mostly part_of, each with
+#                   a Theiler stage range (TS1-TS28) inside its parents'
+#
+#  Usage:
+#
+#      ontologyGenerator.py shape obo|dag [number of terms] [seed]
+#
+#      (writes the ontology to stdout, as an OBO file or as a DAG file
+#      in the format read by loadDAG.py)
+#
+#  Env Vars:  None
+#
+#  Inputs:  None
+#
+#  Outputs:
+#
+#      - The ontology, on stdout
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      Terms are given a level (0 for roots) so that the deeper levels
+#      hold more terms, as in the real ontologies.  Each term has one
+#      parent on the level above it and, with some probability, more
+#      parents on any level above it (in the same namespace), so every
+#      edge goes from a lower level to a higher one and the graph is
+#      acyclic.  The same shape, size and seed always give the same
+#      ontology.
+#
+###########################################################################
+
+import sys
+import random
+
+###--- Globals ---###
+
+# shape -> parameters:
+#   prefix, number of terms, namespaces (one root each), number of levels,
+#   chance of each extra parent (tried until one fails, at most
+#   MAX_PARENTS in all), relationship types and their weights, whether
+#   terms have Theiler stages
+
+SHAPES = {
+    'go' : { 'prefix' : 'GO', 'terms' : 50000,
+        'namespaces' : [ 'biological_process', 'molecular_function',
+            'cellular_component' ],
+        'levels' : 16, 'extraParent' : 0.3,
+        'relationships' : [ ('is_a', 80), ('part_of', 15), ('regulates', 5) ],
+        'stages' : False },
+    'mp' : { 'prefix' : 'MP', 'terms' : 14000,
+        'namespaces' : [ 'MPheno.ontology' ],
+        'levels' : 12, 'extraParent' : 0.1,
+        'relationships' : [ ('is_a', 100) ],
+        'stages' : False },
+    'hpo' : { 'prefix' : 'HP', 'terms' : 17000,
+        'namespaces' : [ 'human_phenotype' ],
+        'levels' : 14, 'extraParent' : 0.25,
+        'relationships' : [ ('is_a', 100) ],
+        'stages' : False },
+    'emapa' : { 'prefix' : 'EMAPA', 'terms' : 8500,
+        'namespaces' : [ 'anatomical_structure' ],
+        'levels' : 10, 'extraParent' : 0.2,
+        'relationships' : [ ('part_of', 85), ('is_a', 15) ],
+        'stages' : True },
+    }
+
+MAX_PARENTS = 6         # most parents of one term
+
+TS_START = 1            # Theiler stages
+TS_END = 28
+
+###--- Classes ---###
+
+class SyntheticOntology:
+    # IS: a generated ontology
+    # HAS: terms numbered 0..n-1, each with an ID, name, namespace and
+    #   (for EMAPA) a stage range; edges from child to parent, each with
+    #   a relationship type
+    # DOES: writes itself as an OBO file or a DAG file; gives its edges
+    #   as lists of children
+
+    def __init__ (self,
+        shape       # str. one of the keys of SHAPES
+        ):
+        # Purpose: constructor
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        self.shape = shape
+        self.ids = []           # number -> ID
+        self.names = []         # number -> term name
+        self.namespaces = []    # number -> namespace
+        self.stages = []        # number -> (start, end) stage, or None
+        self.roots = []         # numbers of the root terms
+        self.edges = []         # (child number, parent number, relationship)
+        return
+
+    def termCount (self):
+        # Purpose: get the number of terms
+        # Returns: integer
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        return len(self.ids)
+
+    def edgeCount (self):
+        # Purpose: get the number of edges
+        # Returns: integer
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        return len(self.edges)
+
+    def children (self):
+        # Purpose: get the children of each term
+        # Returns: list; children[i] = list of numbers of the children of
+        #   term i
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        children = [ [] for i in range(0, len(self.ids)) ]
+        for (child, parent, relationship) in self.edges:
+            children[parent].append(child)
+        return children
+
+    def writeOBO (self,
+        fp          # file object open for writing
+        ):
+        # Purpose: write the ontology as an OBO file
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: writes to 'fp'
+        # Throws: IOError if 'fp' cannot be written
+        # Notes: For EMAPA, the stages are written as starts_at and
+        #   ends_at relationships to TS terms, as in the EMAPA file.
+
+        parents = [ [] for i in range(0, len(self.ids)) ]
+        for (child, parent, relationship) in self.edges:
+            parents[child].append((parent, relationship))
+
+        fp.write('format-version: 1.2\n')
+        fp.write('default-namespace: %s\n' % SHAPES[self.shape]['namespaces'][0])
+        fp.write('\n')
+        for i in range(0, len(self.ids)):
+            fp.write('[Term]\n')
+            fp.write('id: %s\n' % self.ids[i])
+            fp.write('name: %s\n' % self.names[i])
+            fp.write('namespace: %s\n' % self.namespaces[i])
+            fp.write('def: "The definition of %s." []\n' % self.names[i])
+            if i % 3 == 0:
+                fp.write('synonym: "%s synonym" EXACT []\n' % self.names[i])
+            for (parent, relationship) in parents[i]:
+                if relationship == 'is_a':
+                    fp.write('is_a: %s ! %s\n' % (self.ids[parent], self.names[parent]))
+                else:
+                    fp.write('relationship: %s %s ! %s\n' % (relationship,
+                        self.ids[parent], self.names[parent]))
+            if self.stages[i] is not None:
+                (start, end) = self.stages[i]
+                fp.write('relationship: starts_at TS:%02d\n' % start)
+                fp.write('relationship: ends_at TS:%02d\n' % end)
+            fp.write('\n')
+
+        if SHAPES[self.shape]['stages']:
+            for stage in range(TS_START, TS_END + 1):
+                fp.write('[Term]\n')
+                fp.write('id: TS:%02d\n' % stage)
+                fp.write('name: TS%d\n' % stage)
+                fp.write('namespace: theiler_stage\n')
+                fp.write('\n')
+        return
+
+    def writeDAGFile (self,
+        fp          # file object open for writing
+        ):
+        # Purpose: write the ontology as a DAG file for loadDAG.py
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: writes to 'fp'
+        # Throws: IOError if 'fp' cannot be written
+
+        parents = [ [] for i in range(0, len(self.ids)) ]
+        for (child, parent, relationship) in self.edges:
+            parents[child].append((parent, relationship))
+
+        for i in range(0, len(self.ids)):
+            if not parents[i]:
+                fp.write('%s\t\t\t\n' % self.ids[i])
+            for (parent, relationship) in parents[i]:
+                fp.write('%s\t\t%s\t%s\n' % (self.ids[i],
+                    relationship.replace('_', '-'), self.ids[parent]))
+        return
+
+###--- Functions ---###
+
+def generate (
+    shape,          # str. one of the keys of SHAPES
+    terms = None,   # integer; number of terms, or None for the shape's own
+    seed = 1        # integer; seed for the random choices
+    ):
+    # Purpose: generate an ontology of the given shape
+    # Returns: SyntheticOntology
+    # Assumes: nothing
+    # Effects: nothing
+    # Throws: KeyError if 'shape' is unknown
+
+    params = SHAPES[shape]
+    if terms is None:
+        terms = params['terms']
+    namespaces = params['namespaces']
+    levels = params['levels']
+    terms = max(terms, len(namespaces))
+
+    rng = random.Random(seed)
+    ontology = SyntheticOntology(shape)
+
+    relationships = []
+    for (relationship, weight) in params['relationships']:
+        relationships = relationships + [ relationship ] * weight
+
+    # byLevel[(namespace, level)] = numbers of the terms so far on 'level'
+
+    byLevel = {}
+
+    for i in range(0, terms):
+        ontology.ids.append('%s:%07d' % (params['prefix'], i + 1))
+        ontology.names.append('%s term %d' % (shape, i + 1))
+
+        if i < len(namespaces):
+            namespace = namespaces[i]
+            level = 0
+            ontology.roots.append(i)
+        else:
+            # the deeper levels hold more of the terms
+            namespace = namespaces[i % len(namespaces)]
+            position = float(i - len(namespaces)) / max(1, terms - len(namespaces))
+            level = min(levels - 1, 1 + int((levels - 1) * (position ** 0.6)))
+            while (namespace, level - 1) not in byLevel:
+                level = level - 1
+
+        ontology.namespaces.append(namespace)
+        byLevel.setdefault((namespace, level), []).append(i)
+
+        stage = None
+        if level > 0:
+            # one parent on the level above; maybe more, on any level above
+            parents = [ rng.choice(byLevel[(namespace, level - 1)]) ]
+            while len(parents) < MAX_PARENTS and rng.random() < params['extraParent']:
+                above = rng.randint(max(0, level - 3), level - 1)
+                parent = rng.choice(byLevel[(namespace, above)])
+                if parent not in parents:
+                    parents.append(parent)
+            for parent in parents:
+                ontology.edges.append((i, parent, rng.choice(relationships)))
+
+            # a stage range inside the first parent's
+            if params['stages']:
+                (start, end) = ontology.stages[parents[0]]
+                newStart = rng.randint(start, end)
+                stage = (newStart, rng.randint(newStart, end))
+        elif params['stages']:
+            stage = (TS_START, TS_END)
+
+        ontology.stages.append(stage)
+
+    return ontology
+
+###--- Main Program ---###
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in SHAPES or sys.argv[2] not in [ 'obo', 'dag' ]:
+        sys.stderr.write('Usage: %s %s obo|dag [number of terms] [seed]\n' % \
+            (sys.argv[0], '|'.join(sorted(SHAPES.keys()))))
+        sys.exit(1)
+
+    terms = None
+    seed = 1
+    if len(sys.argv) > 3:
+        terms = int(sys.argv[3])
+    if len(sys.argv) > 4:
+        seed = int(sys.argv[4])
+
+    ontology = generate(sys.argv[1], terms, seed)
+    if sys.argv[2] == 'obo':
+        ontology.writeOBO(sys.stdout)
+    else:
+        ontology.writeDAGFile(sys.stdout)
+    sys.exit(0)
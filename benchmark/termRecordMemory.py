@@ -0,0 +1,165 @@
+#
+#  termRecordMemory.py
+###########################################################################
+#
+#  Purpose:
+#
+#      Measure the memory needed to hold the records of a Termfile, as
+#      the old vocloadlib.readTabFile() stored them (one dictionary per
+#      line) and as vocloadlib.TabFileReader stores them (one TabRecord
+#      per line, with interned status and synonym type values).
+#
+#  Usage:
+#
+#      termRecordMemory.py [number of terms]
+#
+#      (default: 100000 terms, about the size of the GO Termfile)
+#
+#  Env Vars:
+#
+#      VOCLOAD - the vocload product directory
+#
+#  Inputs:  None; a synthetic Termfile is written to a temporary directory
+#
+#  Outputs:
+#
+#      - For each representation: the tracemalloc peak while reading the
+#        file into a list, and the peak RSS of the process doing it
+#
+#  Exit Codes:
+#
+#      0:  Successful completion
+#      1:  An exception occurred
+#
+#  Assumes:  Nothing
+#
+#  Implementation:
+#
+#      Each representation is measured in its own child process, so the
+#      peak RSS of one does not hide the other.
+#
+###########################################################################
+
+import sys
+import os
+import resource
+import subprocess
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.environ['VOCLOAD'], 'lib'))
+import vocloadlib
+
+###--- Globals ---###
+
+FIELDNAMES = [ 'term', 'accID', 'status', 'abbreviation',
+    'note', 'comment', 'synonyms', 'synonymTypes', 'otherIDs' ]
+
+TERM_LINE = '%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\n'
+
+STATUSES = [ 'current', 'current', 'current', 'obsolete' ]
+SYNONYM_TYPES = [ 'exact', 'broad', 'narrow', 'related' ]
+
+###--- Functions ---###
+
+def writeTermfile (
+    filename,   # str. path of the Termfile to write
+    count       # integer; number of terms to write
+    ):
+    # Purpose: write a synthetic Termfile shaped like the GO one
+    # Returns: nothing
+    # Assumes: nothing
+    # Effects: writes 'filename'
+    # Throws: IOError if 'filename' cannot be written
+
+    fp = open(filename, 'w')
+    for i in range(0, count):
+        synonyms = '|'.join([ 'synonym %d of term %d' % (j, i) for j in range(0, i % 4) ])
+        synonymTypes = '|'.join([ SYNONYM_TYPES[j] for j in range(0, i % 4) ])
+        fp.write(TERM_LINE % ('term number %d' % i,
+            'GO:%07d' % i,
+            STATUSES[i % len(STATUSES)],
+            '',
+            'The definition of term %d, which runs to a sentence or two.' % i,
+            '',
+            synonyms,
+            synonymTypes,
+            'GO:%07d' % (i + 5000000)))
+    fp.close()
+    return
+
+def readAsDicts (
+    filename    # str. path to a Termfile
+    ):
+    # Purpose: read 'filename' the way readTabFile() used to
+    # Returns: list of dictionaries
+    # Assumes: nothing
+    # Effects: reads 'filename'
+    # Throws: IOError if 'filename' cannot be read
+
+    lines = []
+    fp = open(filename, 'r')
+    for line in fp:
+        fields = line[:-1].split('\t')
+        row = {}
+        for i in range(0, len(FIELDNAMES)):
+            row[FIELDNAMES[i]] = ''.join([j if ord(j) < 128 else ' ' for j in fields[i]])
+        lines.append(row)
+    fp.close()
+    return lines
+
+def readAsRecords (
+    filename    # str. path to a Termfile
+    ):
+    # Purpose: read 'filename' with vocloadlib.readTabFile()
+    # Returns: list of TabRecords
+    # Assumes: nothing
+    # Effects: reads 'filename'
+    # Throws: IOError if 'filename' cannot be read
+
+    return list(vocloadlib.readTabFile(filename, FIELDNAMES))
+
+def measure (
+    mode,       # str. 'dict' or 'record'
+    filename    # str. path to a Termfile
+    ):
+    # Purpose: read 'filename' into memory and report what it took
+    # Returns: nothing
+    # Assumes: nothing
+    # Effects: writes one line to stdout
+    # Throws: IOError if 'filename' cannot be read
+
+    tracemalloc.start()
+    if mode == 'dict':
+        rows = readAsDicts(filename)
+    else:
+        rows = readAsRecords(filename)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # ru_maxrss is in kilobytes on Linux
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print('%-7s %9d rows  held %8.1f MB  peak %8.1f MB  max RSS %8.1f MB' % \
+        (mode, len(rows), current / 1048576.0, peak / 1048576.0, maxrss / 1024.0))
+    return
+
+###--- Main Program ---###
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] in [ 'dict', 'record' ]:
+        measure(sys.argv[1], sys.argv[2])
+        sys.exit(0)
+
+    count = 100000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+
+    tmpdir = tempfile.mkdtemp()
+    termfile = os.path.join(tmpdir, 'Termfile')
+    try:
+        writeTermfile(termfile, count)
+        for mode in [ 'dict', 'record' ]:
+            subprocess.check_call([ sys.executable, __file__, mode, termfile ])
+    finally:
+        os.remove(termfile)
+        os.rmdir(tmpdir)
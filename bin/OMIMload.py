@@ -43,4 +43,4 @@ if __name__ == '__main__':
         wrapper = OMIM_Wrapper (sys.argv[1:])
         wrapper.go()
 
-        db.commit()
+        vocloadlib.commit()
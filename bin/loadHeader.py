@@ -39,6 +39,9 @@
 #
 #  03/17/2005  DBM  Initial development
 #
+#  The Header label is set by the DAG load; verify it here and update
+#  only the rows which lack it
+#
 ###########################################################################
 
 import sys 
@@ -113,28 +116,22 @@ db.sql('''
 db.sql('create index idx1 on Nodes(_Node_key)')
 
 #
-#  Update the label key for each of the identified nodes using the label key for a header label.
-#
-db.sql('''
-        update DAG_Node 
-            set _Label_key = %s
-            from Nodes t 
-            where DAG_Node._Node_key = t._Node_key
-        ''' % (str(labelKey)))
-
-db.sql('''
-        update DAG_Closure 
-            set _AncestorLabel_key = %s
-            from Nodes t 
-            where DAG_Closure._Ancestor_key = t._Node_key
-        ''' % (str(labelKey)))
-
-db.sql('''
-        update DAG_Closure 
-            set _DescendentLabel_key = %s
-            from  Nodes t 
-            where DAG_Closure._Descendent_key = t._Node_key
-        ''' % (str(labelKey)))
+#  Update the label key of the identified nodes which still lack the header label.
+#
+labelFields = [
+        ('DAG_Node', '_Node_key', '_Label_key'),
+        ('DAG_Closure', '_Ancestor_key', '_AncestorLabel_key'),
+        ('DAG_Closure', '_Descendent_key', '_DescendentLabel_key'),
+        ]
+for (table, keyField, labelField) in labelFields:
+        db.sql('''
+                update %s 
+                    set %s = %s
+                    from Nodes t 
+                    where %s.%s = t._Node_key
+                        and %s.%s != %s
+                ''' % (table, labelField, str(labelKey), table, keyField,
+                        table, labelField, str(labelKey)))
 
 results = db.sql('select count(*) as cnt from Nodes')
 print('Number of header nodes identified: %d' % results[0]['cnt'])
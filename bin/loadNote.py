@@ -119,7 +119,13 @@ for record in noteRecords:
         termIds.add(record[0])
 
 termIds = list(termIds)
-termKeyMap = vocloadlib.getTermKeyMap(termIds, vocabName)
+
+# use the term IDs saved by the vocabulary load, if they are still current
+session = vocloadlib.readLoadSession(os.environ.get('LOAD_SESSION_FILE', ''), vocabName)
+if session:
+        termKeyMap = session.getTermKeyMap(termIds)
+else:
+        termKeyMap = vocloadlib.getTermKeyMap(termIds, vocabName)
 
 
 #
@@ -583,7 +583,7 @@ if parseOBOFile() != 0:
 log.writeline('loadOBO.py:loadVOC.VOCLoad()')
 vocload = loadVOC.VOCLoad(config, mode, log)
 vocload.go()
-db.commit()
+vocloadlib.commit()
 log.writeline('loadOBO.py:vocload.go()')
 
 log.writeline(vocloadlib.timestamp('loadOBO.py:end:'))
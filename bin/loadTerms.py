@@ -33,19 +33,26 @@
 #       3. open Discrepancy file
 #       4. if isIncrementalLoad(): goIncremental(), else goFull()
 #       5. goFull(): open bcp files
-#       6. goIncremental(): use insert/update/delete
+#       6. goIncremental(): classify all records, then apply batched insert/update/delete
+#          (on-line sql, or bcp through staging tables if INCREMENTAL_MODE_DATA_LOADER=bcp)
 #       7. process Termfile, etc: see SECTION 3
 #       8. both goFull() and goIncrement() run checkForDuplication()
 #
 # SECTION 1: method : called from
 # __init__                          : __main__
-# getIsObsolete()                   : goIncremental(), goFull(), addTerm(), processRecordChanges()
+# getIsObsolete()                   : goIncremental(), goFull(), addTerm(), classifyRecordChanges()
 # isIncrementalLoad()               : go(), setFullModeDataLoader()
 # setFullModeDataLoader()           : __init__
+# setIncrementalModeDataLoader()    : setFullModeDataLoader()
 # loadDataFile()                    : __init__
 # go()                              : __main__
 # goFull()                          : go()
 # goIncremental()                   : go()
+# reserveKeys()                     : goFull(), goIncremental()
+# findChangedTerms()                : goIncremental()
+# getFingerprint()                  : findChangedTerms(), saveFingerprints()
+# readFingerprints()                : goIncremental()
+# saveFingerprints()                : go()
 #
 # SECTION 2: BCP & Files method : called from
 # openBCPFiles()                    : goFull()
@@ -53,20 +60,27 @@
 # loadBCPFiles()                    : goFull()
 # openDiscrepancyFiles()            : go()
 # closeDiscrepancyFiles()           : go()
-# writeDiscrepancyFile()            : checkForMissingTermsInInputFile(), checkForDuplication(), processRecordChanges()
+# writeDiscrepancyFile()            : checkForMissingTermsInInputFile(), checkForDuplication(), reportAnnotationDiscrepancies()
 #
 # SECTION 3: method : called from
 # handles both bcp and insert/update/delete
 # addTerm()            VOC_Term     : goIncremental(), goFull()
 # addAccID()           ACC_Accession: addTerm(), processSecondaryTerms()
-# generateCommentSQL() MG_Note      : addTerm(), processRecordChanges()
-# generateSynonymSQL() MGI_Synonym  : addTerm(), processRecordChanges()
+# generateCommentSQL() MG_Note      : addTerm(), classifyRecordChanges()
+# generateSynonymSQL() MGI_Synonym  : addTerm(), classifyRecordChanges()
+# flushInserts()                    : goFull(), applyChanges()
+# loadStagedBCPFiles()              : applyChanges()
+# updateTermsFromStage()            : applyChanges()
 #
 # crossReferenceFileToDB()          : goIncremental(), processSecondaryTerms()
 # checkForMissingTermsInInputFile() : goIncremental()
 # checkForDuplication()             : goInremental(), goFull(), processSecondaryTerms()
 # processSecondaryTerms()           : goIncremental()
-# processRecordChanges()            : goIncremental()
+# classifyRecordChanges()           : goIncremental()
+# sortSynonyms()                    : classifyRecordChanges(), getFingerprint()
+# getCheckedTermAnnotations()       : goIncremental()
+# applyChanges()                    : goIncremental()
+# reportAnnotationDiscrepancies()   : goIncremental()
 #
 # History
 #
@@ -81,6 +95,7 @@ import sys
 import types
 import getopt
 import os
+import hashlib
 import Set
 
 import accessionlib
@@ -130,26 +145,37 @@ has_refs = 'cannot do a full load on vocab %s which has cross references'
 # inserts
 #
 
+# SQL mode (incremental) buffers the values of each insert and sends them
+# as multi-row inserts of up to vocloadlib.SQL_BATCH_SIZE rows; see flushInserts()
+
 INSERT_TERM = '''insert into VOC_Term (_Term_key, _Vocab_key, term, abbreviation, note, sequenceNum, isObsolete)
-    values (%d, %d, '%s', '%s', '%s', %s, %d)'''
+    values %s'''
+
+TERM_VALUES = '''(%d, %d, '%s', '%s', '%s', %s, %d)'''
 
 BCP_INSERT_TERM = '''%%d|%%d|%%s|%%s|%%s|%%s|%%d|%d|%d|%s|%s\n''' % \
         (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
 
 INSERT_NOTE = '''insert into MGI_Note (_Note_key, _Object_key, _MGIType_key, _NoteType_key, note)
-    values (%d, %d, %s, %s, '%s')'''
+    values %s'''
+
+NOTE_VALUES = '''(%d, %d, %s, %s, '%s')'''
 
 BCP_INSERT_NOTE = '''%%d|%%d|%%s|%%s|%%s|%d|%d|%s|%s\n''' % \
         (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
 
 INSERT_SYNONYM ='''insert into MGI_Synonym (_Synonym_key, _Object_key, _MGIType_key, _SynonymType_key, _Refs_key, synonym)
-    values (%d, %d, %d, %d, %d, '%s')'''
+    values %s'''
+
+SYNONYM_VALUES = '''(%d, %d, %d, %d, %d, '%s')'''
 
 BCP_INSERT_SYNONYM ='''%%d|%%d|%%d|%%d|%%d|%%s|%d|%d|%s|%s\n''' % \
         (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
 
 INSERT_ACCESSION = '''insert into ACC_Accession (_Accession_key, accID, prefixPart, numericPart, _LogicalDB_key, _Object_key, _MGIType_key, private, preferred)
-    values (%d, '%s', '%s', %s, %d, %d, %d, %d, %d)'''
+    values %s'''
+
+ACCESSION_VALUES = '''(%d, '%s', '%s', %s, %d, %d, %d, %d, %d)'''
 
 BCP_INSERT_ACCESSION_NUMPART = '''%%d|%%s|%%s|%%s|%%d|%%d|%%d|%%d|%%d|%d|%d|%s|%s\n''' % \
         (CREATEDBY_KEY, CREATEDBY_KEY, CDATE, CDATE)
@@ -157,28 +183,58 @@ BCP_INSERT_ACCESSION_NUMPART = '''%%d|%%s|%%s|%%s|%%d|%%d|%%d|%%d|%%d|%d|%d|%s|%
 #
 # updates
 #
+# each update is applied to a whole set of terms at once by joining
+# VOC_Term to a list of (_Term_key, new value) pairs
 
 UPDATE_TERM = '''update VOC_Term 
-        set term = '%s', modification_date = now(), _ModifiedBy_key = 1001
-        where _Term_key = %d '''
+        set term = v.term, modification_date = now(), _ModifiedBy_key = 1001
+        from (values %s) as v(_Term_key, term)
+        where VOC_Term._Term_key = v._Term_key'''
 
-# note %s : "note = 'xxxx'" OR "note = null" (no quotes)
 UPDATE_TERMNOTE = '''update VOC_Term 
-        set note = %s, modification_date = now(), _ModifiedBy_key = 1001
-        where _Term_key = %d '''
+        set note = v.note, modification_date = now(), _ModifiedBy_key = 1001
+        from (values %s) as v(_Term_key, note)
+        where VOC_Term._Term_key = v._Term_key'''
 
 UPDATE_STATUS = '''update VOC_Term 
-        set isObsolete = %d, modification_date = now(), _ModifiedBy_key = 1001
-        where _Term_key = %d '''
+        set isObsolete = v.isObsolete, modification_date = now(), _ModifiedBy_key = 1001
+        from (values %s) as v(_Term_key, isObsolete)
+        where VOC_Term._Term_key = v._Term_key'''
+
+# incremental load with bcp: changed terms are copied into a temp staging
+# table with one row per term; the update* flags say which fields changed
+
+TERM_UPDATE_STAGE = 'tmp_vocload_termupdate'
+
+CREATE_TERM_UPDATE_STAGE = '''create temp table %s (_Term_key int, term text, updateTerm int,
+        note text, updateNote int, isObsolete smallint, updateStatus int)''' % TERM_UPDATE_STAGE
+
+BCP_UPDATE_TERM = '''%d|%s|%d|%s|%d|%d|%d\n'''
+
+STAGED_UPDATE_TERM = '''update VOC_Term 
+        set term = s.term, modification_date = now(), _ModifiedBy_key = 1001
+        from %s s
+        where VOC_Term._Term_key = s._Term_key and s.updateTerm = 1''' % TERM_UPDATE_STAGE
 
-MERGE_TERMS = '''select * from VOC_mergeTerms(%d, %d);'''
+STAGED_UPDATE_TERMNOTE = '''update VOC_Term 
+        set note = s.note, modification_date = now(), _ModifiedBy_key = 1001
+        from %s s
+        where VOC_Term._Term_key = s._Term_key and s.updateNote = 1''' % TERM_UPDATE_STAGE
+
+STAGED_UPDATE_STATUS = '''update VOC_Term 
+        set isObsolete = s.isObsolete, modification_date = now(), _ModifiedBy_key = 1001
+        from %s s
+        where VOC_Term._Term_key = s._Term_key and s.updateStatus = 1''' % TERM_UPDATE_STAGE
+
+# one statement per merge, so chained merges (A -> B, B -> C) run in file order
+MERGE_TERMS = '''select * from VOC_mergeTerms(%d, %d)'''
 
 #
 # deletes
 #
 
-DELETE_NOTE = '''delete from MGI_Note where _Object_key = %d and _NoteType_key = %s'''
-DELETE_ALL_SYNONYMS ='''delete from MGI_Synonym where _Object_key = %d and _MGIType_key = %d'''
+DELETE_NOTE = '''delete from MGI_Note where _NoteType_key = %s and _Object_key in (%s)'''
+DELETE_ALL_SYNONYMS ='''delete from MGI_Synonym where _MGIType_key = %d and _Object_key in (%s)'''
 
 # specific delete for Disease Ontology only
 DELETE_DO_XREF = '''delete from ACC_Accession a
@@ -203,6 +259,51 @@ SYNONYM_DELIMITER = '|'
 SYNONYM_TYPE_DELIMITER = '|'
 MGI_LOGICALDB_KEY = 1		# compared to self.logicalDBkey
 
+# on-line sql inserts, by table, in the order they must be applied
+INSERT_ORDER = [ 'VOC_Term', 'MGI_Note', 'MGI_Synonym', 'ACC_Accession' ]
+INSERT_SQL = {
+    'VOC_Term' : INSERT_TERM,
+    'MGI_Note' : INSERT_NOTE,
+    'MGI_Synonym' : INSERT_SYNONYM,
+    'ACC_Accession' : INSERT_ACCESSION,
+    }
+
+class TermChanges:
+    # IS: the differences between the input file and the database found
+    #   by an incremental load, grouped by the kind of change
+    # HAS: counts of new and unchanged terms; for changed terms, lists of
+    #   term keys (and new values) for each changed field; the merges
+    #   to run; the terms whose annotations must be checked for the
+    #   discrepancy report
+    # DOES: lets TermLoad apply each kind of change as one set-based
+    #   statement instead of one statement per term
+
+    def __init__(self):
+        self.newTerms = 0
+        self.unchanged = 0
+        self.fingerprinted = 0      # unchanged terms found by fingerprint
+        self.terms = []             # (term key, new term)
+        self.notes = []             # (term key, new note/definition)
+        self.statuses = []          # (term key, new isObsolete)
+        self.comments = []          # term keys whose comment is replaced
+        self.synonyms = []          # term keys whose synonyms are replaced
+        self.merges = []            # (old term key, new term key)
+        self.annotationChecks = []  # (record, db record, term key,
+                                    #  definition?, comment?, obsolete?)
+        return
+
+    def summary(self):
+        # Purpose: describe the number of changes of each kind
+        # Returns: string
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        return 'new: %d, unchanged: %d (by fingerprint: %d), term: %d, note: %d, comment: %d, synonyms: %d, status: %d, merged: %d' % \
+            (self.newTerms, self.unchanged, self.fingerprinted, len(self.terms), len(self.notes),
+            len(self.comments), len(self.synonyms), len(self.statuses),
+            len(self.merges))
+
 #
 # SECTION 1
 #
@@ -213,7 +314,7 @@ class TermLoad:
     #   and the load itself:
     #   vocab_key, vocab_name, isPrivate, isSimple, mode, filename,
     #   datafile, log, max_term_key, max_synonym_key,
-    #   max_accession_key, self.id2key
+    #   max_accession_key, self.id2key, session
     # DOES: reads from an input data file of term info to load it into
     #   the MGI database
 
@@ -223,7 +324,9 @@ class TermLoad:
         vocab,       # integer vocab key or str.vocab name; which vocabulary to load terms for
         refs_key,    # integer key for the load reference;
         log,         # Log.Log object; used for logging progress
-        passwordFile # password file for use with bcp
+        passwordFile, # password file for use with bcp
+        session = None # vocloadlib.LoadSession shared with the other
+                     #   steps of the load, or None
         ):
         # Purpose: constructor
         # Returns: nothing
@@ -237,6 +340,7 @@ class TermLoad:
 
         self.log = log
         self.passwordFile = passwordFile
+        self.session = session
         self.primaryAccIDFileList = {}
         self.secondaryAccIDFileList = Set.Set()
 
@@ -267,15 +371,14 @@ class TermLoad:
         if mode == 'full' and vocloadlib.anyTermsCrossReferenced(self.vocab_key):
                 raise TermLoadError(has_refs % vocab)
 
-        # when we actually do the load, we'll look up the current
-        # maximum keys for various tables...  For now, we'll just
-        # initialize them to None
-        self.max_term_key = None    # to be filled in once at the
-        self.max_synonym_key = None # start of the load
+        # keys are handed out by a vocloadlib.KeyAllocator; blocks of keys
+        # are reserved once we know the load mode (see reserveKeys()).
+        # the max_*_key attributes hold the last key assigned for each table.
+        self.keys = vocloadlib.KeyAllocator()
+        self.max_term_key = None
+        self.max_synonym_key = None
         self.max_note_key = None
-
-        # Need to look up this number immediately and only once for BCP
-        self.max_accession_key = vocloadlib.getMax('_Accession_key', 'ACC_Accession')
+        self.max_accession_key = None
 
         # **** FOR BACKWARD COMPATIBILITY ****
         # Determine if the load should expect to find a synonym type column
@@ -296,6 +399,17 @@ class TermLoad:
         self.refs_key = refs_key
         self.id2key = {}    # maps term IDs to term keys
 
+        # fingerprints of the input records (accID -> fingerprint), saved
+        # after a successful load so the next incremental load can skip
+        # the terms which have not changed; no file, no fingerprints
+        self.fingerprintFileName = os.environ.get('TERM_FINGERPRINT_FILE', '')
+        self.fingerprints = None
+
+        # values for multi-row inserts, by table, when using on-line sql
+        self.pendingInserts = {}
+        for table in INSERT_ORDER:
+            self.pendingInserts[table] = []
+
         # initialize and load term datafile
         self.loadDataFile(filename)
         self.log.writeline(vocloadlib.timestamp('loadTerms.py:__init__:end'))
@@ -323,8 +437,10 @@ class TermLoad:
     def setFullModeDataLoader(self):
        # Purpose: Determines the mode of loading data to the database.
        #          The mode of loading is either bcp or on-line SQL.
-       #          Incremental loads, by definition, use on-line SQL.
-       #          However, if the load is not incremental 
+       #          Incremental loads use on-line SQL unless
+       #          'INCREMENTAL_MODE_DATA_LOADER' says otherwise
+       #          (see setIncrementalModeDataLoader()).
+       #          If the load is not incremental 
        #          (ie. is full) and a configuration variable, 
        #          'FULL_MODE_DATA_LOADER', is set to 'bcp', then 
        #          bcp will be the method of loading data to the database
@@ -344,11 +460,10 @@ class TermLoad:
        elif fullModeDataLoader == "bcp":
 
            # Only do BCPs if it is a FULL load and FULL_MODE_DATA_LOADER
-           # is set to 'bcp'; INCREMENTALS ALWAYS use on-line SQL
+           # is set to 'bcp'; INCREMENTALS have their own setting
 
            if self.isIncrementalLoad():
-              self.log.writeline(vocloadlib.timestamp('setFullModeDataLoader:0:'))
-              return 0
+              return self.setIncrementalModeDataLoader()
            else:
               self.log.writeline(vocloadlib.timestamp('setFullModeDataLoader:1:'))
               return 1
@@ -356,19 +471,48 @@ class TermLoad:
        else:
            raise TermLoadError(unknown_data_loader % fullModeDataLoader)
        
+    def setIncrementalModeDataLoader(self):
+       # Purpose: Determines the mode of loading data to the database
+       #          for an incremental load.  By default, changes are sent
+       #          as on-line SQL.  If the configuration variable
+       #          'INCREMENTAL_MODE_DATA_LOADER' is set to 'bcp', new rows
+       #          are written to the bcp files and loaded into temp staging
+       #          tables, and the changes are applied from the staging
+       #          tables with set-based insert/update statements
+       #          (see applyChanges())
+       # Returns: 1 - bcp is mode of loading, 0 - online sql is mode of loading
+       # Assumes: mode is 'incremental'
+       # Effects: nothing
+       # Throws:  TermLoadError if the data loader is unknown
+
+       incModeDataLoader = os.environ.get('INCREMENTAL_MODE_DATA_LOADER', 'sql')
+
+       if incModeDataLoader == 'sql':
+           self.log.writeline(vocloadlib.timestamp('setIncrementalModeDataLoader:0:'))
+           return 0
+
+       elif incModeDataLoader == 'bcp':
+           self.log.writeline(vocloadlib.timestamp('setIncrementalModeDataLoader:1:'))
+           return 1
+
+       else:
+           raise TermLoadError(unknown_data_loader % incModeDataLoader)
+
     def loadDataFile(self, filename):
         # Load the term datafile from filename sets self.datafile
+        # (cached, as the load makes several passes over it)
 
         self.log.writeline(vocloadlib.timestamp('loadDataFile():start'))
 
         if self.useSynonymType:
             self.datafile = vocloadlib.readTabFile(filename,
                 ['term', 'accID', 'status', 'abbreviation',
-                'note', 'comment', 'synonyms', 'synonymTypes', 'otherIDs'])
+                'note', 'comment', 'synonyms', 'synonymTypes', 'otherIDs'],
+                cache = 1)
         else:
             self.datafile = vocloadlib.readTabFile(filename,
                 ['term', 'accID', 'status', 'abbreviation',
-                'note', 'comment', 'synonyms', 'otherIDs'])
+                'note', 'comment', 'synonyms', 'otherIDs'], cache = 1)
 
         self.log.writeline(vocloadlib.timestamp('loadDataFile():end'))
 
@@ -399,6 +543,9 @@ class TermLoad:
 
         self.closeDiscrepancyFiles()
 
+        # tell the other steps of the load which terms we loaded
+        self.updateSession()
+
         # call any post-processing defined by sub class
         self.postProcess()
         
@@ -409,10 +556,11 @@ class TermLoad:
             self.log.writeline(msg)
             raise TermLoadError(msg)
 
-        # update mgi_synonym_seq, voc_term_seq, mgi_note_seq auto-sequence
-        db.sql(''' select setval('mgi_synonym_seq', (select max(_Synonym_key) from MGI_Synonym)) ''', None)
-        db.sql(''' select setval('voc_term_seq', (select max(_Term_key) from VOC_Term)) ''', None)
-        db.sql(''' select setval('mgi_note_seq', (select max(_Note_key) from MGI_Note)) ''', None)
+        # the sequences were advanced as key blocks were reserved;
+        # give back whatever was not used
+        self.keys.finish()
+
+        self.saveFingerprints()
 
         self.log.writeline(vocloadlib.timestamp('go():end'))
 
@@ -439,15 +587,8 @@ class TermLoad:
         vocloadlib.deleteVocabTerms(self.vocab_key, self.log)
         self.log.writeline(vocloadlib.timestamp('goFull(): deleted remaining terms (count: %d)' % count))
 
-        # look up the maximum keys for remaining items in VOC_Term and MGI_Synonym.
-        results = db.sql(''' select nextval('voc_term_seq') as termKey ''', 'auto')
-        self.max_term_key = results[0]['termKey']
-
-        results = db.sql(''' select nextval('mgi_note_seq') as noteKey ''', 'auto')
-        self.max_note_key = results[0]['noteKey']
-
-        results = db.sql(''' select nextval('mgi_synonym_seq') as synKey ''', 'auto')
-        self.max_synonym_key = results[0]['synKey']
+        # every record is new, so reserve all the keys the file needs
+        self.reserveKeys(self.datafile)
 
         # if this is a simple vocabulary, provide sequence numbers for the terms.  
         # if it isn't simple, the sequence number is null.
@@ -485,6 +626,8 @@ class TermLoad:
            if self.isBCPLoad:
               self.closeBCPFiles()
               self.loadBCPFiles()
+           else:
+              self.flushInserts(INSERT_ORDER)
 
         self.log.writeline(vocloadlib.timestamp('goFull():end'))
 
@@ -501,14 +644,9 @@ class TermLoad:
 
         self.log.writeline(vocloadlib.timestamp('goIncremental():start'))
 
-        # look up the maximum keys for remaining items in VOC_Term and MGI_Synonym.
-        results = db.sql(''' select nextval('voc_term_seq') as termKey ''', 'auto')
-        self.max_term_key = results[0]['termKey']
-
-        self.max_note_key = vocloadlib.getMax('_Note_key', 'MGI_Note')
-
-        results = db.sql(''' select nextval('mgi_synonym_seq') as synKey ''', 'auto')
-        self.max_synonym_key = results[0]['synKey']
+        # open the bcp files if loading through the staging tables
+        if self.isBCPLoad:
+            self.openBCPFiles()
 
         # if this is a simple vocabulary, we provide sequence numbers
         # for the terms.  if it isn't simple, the sequence number is
@@ -532,14 +670,33 @@ class TermLoad:
         primaryTermIDs = vocloadlib.getTermIDs(self.vocab_key)
         secondaryTermIDs = vocloadlib.getSecondaryTermIDs(self.vocab_key)
 
+        # fingerprint the input records; only the existing terms whose
+        # fingerprint differs from the last load (or which have no saved
+        # fingerprint) need to be compared to the database
+        lastFingerprints = self.readFingerprints()
+        changedKeys = self.findChangedTerms(lastFingerprints, primaryTermIDs)
+
+        # only the new and changed records need keys
+        self.reserveKeys([ record for record in self.datafile
+            if record['accID'] not in primaryTermIDs
+            or primaryTermIDs[record['accID']][0] in changedKeys ])
+
         # get the existing terms for the database
         self.log.writeline(vocloadlib.timestamp('goIncremental(): get existing vocabulary terms'))
-        recordSet = vocloadlib.getTerms(self.vocab_key)
+        if lastFingerprints:
+            self.log.writeline('goIncremental(): %d terms changed since the last load' % len(changedKeys))
+            recordSet = vocloadlib.getTerms(self.vocab_key, list(changedKeys))
+        else:
+            recordSet = vocloadlib.getTerms(self.vocab_key)
 
-        self.log.writeline(vocloadlib.timestamp('crossReferenceFileToDB:start'))
-        self.log.writeline(vocloadlib.timestamp('checkForDuplication:start'))
-        self.log.writeline(vocloadlib.timestamp('processRecordChanges:start'))
-        self.log.writeline(vocloadlib.timestamp('processSecondaryTerms:start'))
+        # first pass: compare every input record to the database snapshot and
+        # classify it as new, changed (by field), merged or unchanged.
+        # inserts for new terms are buffered by addTerm(); nothing is sent
+        # to the database until all records have been classified.
+
+        changes = TermChanges()
+
+        self.log.writeline(vocloadlib.timestamp('classifyRecordChanges:start'))
         for record in self.datafile:
 
             # cross reference input file records to database records
@@ -563,6 +720,13 @@ class TermLoad:
 
                [termKey, isObsolete, term, termFound] = primaryTermIDs[record['accID']]
 
+               if lastFingerprints and termKey not in changedKeys:
+                  # same as at the last load; no need to compare it
+                  changes.unchanged = changes.unchanged + 1
+                  changes.fingerprinted = changes.fingerprinted + 1
+                  self.processSecondaryTerms(record, primaryTermIDs, secondaryTermIDs, termKey, changes)
+                  continue
+
                dbRecord = recordSet.find('_Term_key', termKey)
 
                if dbRecord == []:
@@ -570,8 +734,9 @@ class TermLoad:
 
                else: # existing record found in VOC tables.  
                   # check if record changed
-                  recordChanged = self.processRecordChanges(record, dbRecord, termKey)
-                  self.processSecondaryTerms(record, primaryTermIDs, secondaryTermIDs, termKey)
+                  if not self.classifyRecordChanges(record, dbRecord, termKey, changes):
+                      changes.unchanged = changes.unchanged + 1
+                  self.processSecondaryTerms(record, primaryTermIDs, secondaryTermIDs, termKey, changes)
 
             else: # new term
                # in this case, perform full load
@@ -579,12 +744,20 @@ class TermLoad:
                   termSeqNum = termSeqNum + 1
 
                self.addTerm(record, termSeqNum)
-               self.processSecondaryTerms(record, primaryTermIDs, secondaryTermIDs, self.max_term_key)
+               changes.newTerms = changes.newTerms + 1
+               self.processSecondaryTerms(record, primaryTermIDs, secondaryTermIDs, self.max_term_key, changes)
 
-        self.log.writeline(vocloadlib.timestamp('crossReferenceFileToDB:end'))
-        self.log.writeline(vocloadlib.timestamp('checkForDuplication:end'))
-        self.log.writeline(vocloadlib.timestamp('processRecordChanges:end'))
-        self.log.writeline(vocloadlib.timestamp('processSecondaryTerms:end'))
+        self.log.writeline(vocloadlib.timestamp('classifyRecordChanges:end'))
+        self.log.writeline(changes.summary())
+
+        # look up the annotations for the curator report before applying
+        # anything: merges move a term's annotations to the surviving term
+        termAnnotations = self.getCheckedTermAnnotations(changes)
+
+        # second pass: apply each class of change as a set
+        if self.commitTransaction:
+            self.applyChanges(changes)
+        self.reportAnnotationDiscrepancies(changes, termAnnotations)
 
         self.checkForMissingTermsInInputFile(primaryTermIDs, secondaryTermIDs)
 
@@ -592,6 +765,175 @@ class TermLoad:
 
         return
 
+    def reserveKeys(self, records):
+        # Purpose: reserve blocks of keys for VOC_Term, MGI_Note, MGI_Synonym
+        #          and ACC_Accession, sized from 'records' (the input
+        #          records which are to be added or changed)
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: advances the sequences (see vocloadlib.KeyAllocator)
+        # Throws:  propagates any exceptions raised
+
+        counts = { 'VOC_Term' : 0, 'MGI_Note' : 0, 'MGI_Synonym' : 0, 'ACC_Accession' : 0 }
+
+        for record in records:
+            counts['VOC_Term'] = counts['VOC_Term'] + 1
+            if record['comment']:
+                counts['MGI_Note'] = counts['MGI_Note'] + 1
+            for synonym in str.split(record['synonyms'], SYNONYM_DELIMITER):
+                if synonym:
+                    counts['MGI_Synonym'] = counts['MGI_Synonym'] + 1
+            if record['accID']:
+                counts['ACC_Accession'] = counts['ACC_Accession'] + 1
+            for id in str.split(record['otherIDs'], OTHER_ID_DELIMITER):
+                if str.strip(id):
+                    counts['ACC_Accession'] = counts['ACC_Accession'] + 1
+
+        for table in list(counts.keys()):
+            self.keys.reserve(table, counts[table])
+
+        return
+
+    def findChangedTerms(self, lastFingerprints, primaryTermIDs):
+        # Purpose: fingerprint the input records, and find the existing
+        #          terms which may have changed since the last load
+        # Returns: set of the term keys whose record's fingerprint differs
+        #          from 'lastFingerprints' (or is not in it), or whose term
+        #          or status differs from 'primaryTermIDs'
+        # Assumes: 'primaryTermIDs' is from vocloadlib.getTermIDs()
+        # Effects: sets self.fingerprints (accID -> fingerprint)
+        # Throws:  nothing
+
+        self.fingerprints = {}
+        changedKeys = set()
+
+        for record in self.datafile:
+            accID = record['accID']
+            fingerprint = self.getFingerprint(record)
+            self.fingerprints[accID] = fingerprint
+            if accID in primaryTermIDs:
+                [termKey, isObsolete, term, termFound] = primaryTermIDs[accID]
+                if lastFingerprints.get(accID) != fingerprint \
+                        or term != record['term'] \
+                        or isObsolete != self.getIsObsolete(record['status']):
+                    changedKeys.add(termKey)
+
+        return changedKeys
+
+    def getFingerprint(self, record):
+        # Purpose: compute the fingerprint of an input record: a digest
+        #          of the term, definition, comment, status, synonyms (with
+        #          their types) and other IDs, which changes if any of them does
+        # Returns: string (hex digest)
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws:  nothing
+
+        synonyms = str.split(record['synonyms'], SYNONYM_DELIMITER)
+
+        # 8-column files have no synonym types; use "exact" for each
+        # synonym, as addTerm() does
+        if self.useSynonymType:
+            synonymTypes = str.split(record['synonymTypes'], SYNONYM_TYPE_DELIMITER)
+        else:
+            synonymTypes = []
+            for i in range(len(synonyms)):
+                synonymTypes.append("exact")
+        synonyms, synonymTypes = self.sortSynonyms(synonyms, synonymTypes)
+        otherIDs = sorted(str.split(record['otherIDs'], OTHER_ID_DELIMITER))
+
+        content = '\t'.join([ record['term'], record['note'], record['comment'],
+            record['status'], '|'.join(synonyms), '|'.join(synonymTypes),
+            '|'.join(otherIDs) ])
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def readFingerprints(self):
+        # Purpose: read the fingerprints saved by the last successful load
+        # Returns: dictionary mapping accID to fingerprint; empty if there
+        #          is no fingerprint file, or if the terms of the vocabulary
+        #          have been changed (by anything) since it was written
+        # Assumes: nothing
+        # Effects: reads the fingerprint file; queries the database
+        # Throws:  propagates any exceptions raised
+
+        if not self.fingerprintFileName or not os.path.exists(self.fingerprintFileName):
+            return {}
+
+        fp = open(self.fingerprintFileName, 'r')
+        try:
+            header = str.split(fp.readline()[:-1], '\t')
+            if header != [ '#fingerprints', str(self.vocab_key),
+                    vocloadlib.getVocabState(self.vocab_key) ]:
+                self.log.writeline('readFingerprints(): vocabulary changed since %s was written; ignoring it' % \
+                    self.fingerprintFileName)
+                return {}
+
+            fingerprints = {}
+            for line in fp:
+                [ accID, fingerprint ] = str.split(line[:-1], '\t')
+                fingerprints[accID] = fingerprint
+        finally:
+            fp.close()
+
+        return fingerprints
+
+    def updateSession(self):
+        # Purpose: give the load session the IDs of the terms loaded
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: a full load hands self.session the term IDs it
+        #          assigned; an incremental load (which may add, merge
+        #          and obsolete terms) makes it look them up again
+        # Throws:  nothing
+
+        if self.session is None:
+            return
+
+        if self.isIncrementalLoad() or not self.commitTransaction:
+            self.session.forgetTermIDs()
+            return
+
+        termIDs = {}
+        for record in self.datafile:
+            accID = record['accID']
+            if accID in self.id2key:
+                termIDs[accID] = [ self.id2key[accID],
+                    int(self.getIsObsolete(record['status'])), record['term'], 0 ]
+        self.session.setTermIDs(termIDs)
+
+        return
+
+    def saveFingerprints(self):
+        # Purpose: save the fingerprints of the input records, along with
+        #          the state of the vocabulary they describe
+        # Returns: nothing
+        # Assumes: the load has succeeded so far
+        # Effects: writes the fingerprint file's pending copy, which
+        #          vocloadlib.commit() puts in place once the load's
+        #          transaction has committed (so a load which fails later,
+        #          or is rolled back, leaves the last file alone);
+        #          queries the database
+        # Throws:  propagates any exceptions raised
+
+        if not self.fingerprintFileName or vocloadlib.NO_LOAD:
+            return
+
+        if self.fingerprints is None:
+            self.fingerprints = {}
+            for record in self.datafile:
+                self.fingerprints[record['accID']] = self.getFingerprint(record)
+
+        pendingFileName = self.fingerprintFileName + '.pending'
+        fp = open(pendingFileName, 'w')
+        fp.write('#fingerprints\t%d\t%s\n' % (self.vocab_key,
+            vocloadlib.getVocabState(self.vocab_key)))
+        for accID in self.fingerprints:
+            fp.write('%s\t%s\n' % (accID, self.fingerprints[accID]))
+        fp.close()
+        vocloadlib.addPendingFile(pendingFileName, self.fingerprintFileName)
+
+        return
+
 #
 # SECTION 2: BCP & Files method
 #
@@ -654,19 +996,26 @@ class TermLoad:
 
         self.log.writeline(vocloadlib.timestamp('loadBCPFiles():start'))
 
-        if not vocloadlib.NO_LOAD:
+        # notes, synonyms and accession IDs refer to the terms, so they
+        # are loaded (at the same time) once the terms are in
+
+        loader = vocloadlib.BulkLoader(self.log)
+        termTables = []
+
+        if self.loadTermBCP:
+           loader.add('VOC_Term', self.termTermBCPFileName)
+           termTables = [ 'VOC_Term' ]
+
+        if self.loadNoteBCP:
+           loader.add('MGI_Note', self.termNoteBCPFileName, termTables)
+
+        if self.loadSynonymBCP:
+           loader.add('MGI_Synonym', self.termSynonymBCPFileName, termTables)
 
-           if self.loadTermBCP:
-              db.bcp(self.termTermBCPFileName, 'VOC_Term', delimiter='|')
-                                                                   
-           if self.loadNoteBCP:
-              db.bcp(self.termNoteBCPFileName, 'MGI_Note', delimiter='|')
-                                                                   
-           if self.loadSynonymBCP:                                 
-              db.bcp(self.termSynonymBCPFileName, 'MGI_Synonym', delimiter='|')
-                                                                   
-           if self.loadAccessionBCP:                               
-              db.bcp(self.accAccessionBCPFileName, 'ACC_Accession', delimiter='|')
+        if self.loadAccessionBCP:
+           loader.add('ACC_Accession', self.accAccessionBCPFileName, termTables)
+
+        loader.run()
 
         self.log.writeline(vocloadlib.timestamp('loadBCPFiles():end'))
 
@@ -755,7 +1104,7 @@ class TermLoad:
         # turn on for debugging only
         #self.log.writeline(vocloadlib.timestamp('addTerm():start'))
 
-        self.max_term_key = self.max_term_key + 1
+        self.max_term_key = self.keys.next('VOC_Term')
 
         # add record to VOC_Term:
         if self.isBCPLoad:
@@ -773,15 +1122,14 @@ class TermLoad:
 
         else: # asserts self.isIncrementalLoad() or full load with on-line sql:
 
-           vocloadlib.nl_sqlog(INSERT_TERM % \
+           self.pendingInserts['VOC_Term'].append(TERM_VALUES % \
                            (self.max_term_key,
                            self.vocab_key,
                            record['term'].replace('\'','\'\''),
                            record['abbreviation'].replace('\'','\'\''),
                            record['note'].replace('\'','\'\''),
                            termSeqNum,
-                           self.getIsObsolete(record['status'])),
-                           self.log)
+                           self.getIsObsolete(record['status'])))
 
         # add records as needed to MGI_Note:
         self.generateCommentSQL(record['comment'], self.max_term_key)
@@ -829,7 +1177,7 @@ class TermLoad:
         # turn on for debugging only
         #self.log.writeline(vocloadlib.timestamp('addAccID:start'))
 
-        self.max_accession_key = self.max_accession_key + 1
+        self.max_accession_key = self.keys.next('ACC_Accession')
 
         prefixPart, numericPart = accessionlib.split_accnum(accID)
         if numericPart == None:
@@ -854,9 +1202,9 @@ class TermLoad:
             else:
                 xrefs = prefixPart.split(':')
                 findLDB = xrefs[0]
-            results = db.sql('''select _LogicalDB_key from ACC_LogicalDB where name = '%s' ''' % (findLDB), 'auto')
-            if len(results) > 0:
-                useLogicalDBkey = results[0]['_LogicalDB_key']
+            findLDBkey = vocloadlib.getLogicalDBKeyByName(findLDB)
+            if findLDBkey is not None:
+                useLogicalDBkey = findLDBkey
 
         if self.isBCPLoad:
 
@@ -875,7 +1223,7 @@ class TermLoad:
 
         else: # asserts self.isIncrementalLoad() or full load with on-line sql:
 
-           vocloadlib.nl_sqlog(INSERT_ACCESSION % \
+           self.pendingInserts['ACC_Accession'].append(ACCESSION_VALUES % \
                    (self.max_accession_key, 
                    accID,
                    prefixPart,
@@ -884,8 +1232,7 @@ class TermLoad:
                    associatedTermKey,
                    self.mgitype_key,
                    self.isPrivate,
-                   preferred),
-                   self.log)
+                   preferred))
 
         #self.log.writeline(vocloadlib.timestamp('addAccID:end'))
 
@@ -903,7 +1250,7 @@ class TermLoad:
 
        self.log.writeline(vocloadlib.timestamp('generateCommentSQL:start'))
 
-       self.max_note_key = self.max_note_key + 1
+       self.max_note_key = self.keys.next('MGI_Note')
        commentRecord = ''.join([i if ord(i) < 128 else ' ' for i in commentRecord])
 
        if self.isBCPLoad:
@@ -911,13 +1258,12 @@ class TermLoad:
            self.termNoteBCPFile.write(BCP_INSERT_NOTE % (self.max_note_key, 
                termKey, os.environ['MGITYPE'], os.environ['VOCAB_COMMENT_KEY'], commentRecord))
        else:
-           vocloadlib.nl_sqlog(INSERT_NOTE % \
+           self.pendingInserts['MGI_Note'].append(NOTE_VALUES % \
                       (self.max_note_key, 
                        termKey, 
                        os.environ['MGITYPE'], 
                        os.environ['VOCAB_COMMENT_KEY'], 
-                       commentRecord.replace('\'','\'\'')),
-                       self.log)
+                       commentRecord.replace('\'','\'\'')))
 
        self.log.writeline(vocloadlib.timestamp('generateCommentSQL:end'))
 
@@ -937,7 +1283,7 @@ class TermLoad:
 
           if fileSynonyms[i]:
 
-             self.max_synonym_key = self.max_synonym_key + 1
+             self.max_synonym_key = self.keys.next('MGI_Synonym')
              synonymTypeKey = vocloadlib.getSynonymTypeKey(fileSynonymTypes[i])
 
              if self.isBCPLoad:
@@ -954,13 +1300,13 @@ class TermLoad:
              else: # asserts self.isIncrementalLoad() or full load with on-line sql:
                 synonym = fileSynonyms[i]
                 synonym = synonym.replace("'","''")
-                vocloadlib.nl_sqlog(INSERT_SYNONYM % \
+                self.pendingInserts['MGI_Synonym'].append(SYNONYM_VALUES % \
                        (self.max_synonym_key,
                         termKey,
                         self.mgitype_key,
                         synonymTypeKey,
                         self.refs_key,
-                        synonym), self.log)
+                        synonym))
 
        #self.log.writeline(vocloadlib.timestamp('generateSynonymSQL:end'))
 
@@ -1088,13 +1434,14 @@ class TermLoad:
 
         return duplicate
 
-    def processSecondaryTerms(self, record, primaryTermIDs, secondaryTermIDs, associatedTermKey):
+    def processSecondaryTerms(self, record, primaryTermIDs, secondaryTermIDs, associatedTermKey, changes):
         # Purpose: Determines if input records need to be merged with other terms
         #          and if secondary terms should be added to the accession table and does so as necessary
         # Returns: noting
         # Assumes: getTermsIDs only gets Term IDs with the prefered bit set to '1'
         #          i.e., true, because records are only eligible to be merged if they are primary IDs
-        # Effects: Terms are merged and new accession records are added as necessary
+        # Effects: merges are added to 'changes' (TermChanges) and new accession records
+        #          are added as necessary
         # Throws:  propagates any exceptions raised 
 
         otherIDs = str.strip(record['otherIDs'])
@@ -1134,7 +1481,7 @@ class TermLoad:
                     # logicalDBs and both preferred ids
 
                     if oldKey != newKey:
-                        vocloadlib.nl_sqlog((MERGE_TERMS %(oldKey, newKey)), self.log)
+                        changes.merges.append((oldKey, newKey))
 
                 else:
 
@@ -1146,27 +1493,24 @@ class TermLoad:
                        # The secondary term doesn't exist, so add the term to the
                        # database and point it to the primary term
 
-                       if not self.isBCPLoad:
-                          self.max_accession_key = vocloadlib.getMax('_Accession_key', 'ACC_Accession')
-
                        self.addAccID(id, associatedTermKey, 0)
 
         return
 
-    def processRecordChanges(self, record, dbRecord, termKey):
+    def classifyRecordChanges(self, record, dbRecord, termKey, changes):
        # Purpose: Check to see if input file record is different from the database
        #          in terms of the definition, the comments, the synonyms, the 
-       #          isObsolete field, and the term field.  Writes a 
-       #          record to the Curator/Discrepancy Report if there are definition
-       #          differences or the record has been obsoleted AND there
-       #          have been annotations against the record
+       #          isObsolete field, and the term field, and add each difference
+       #          to 'changes' (TermChanges).  Remembers the term for the
+       #          Curator/Discrepancy Report if there are definition
+       #          differences or the record has been obsoleted, so that
+       #          reportAnnotationDiscrepancies() can check for annotations
        # Returns: 1 - true, record has changed, or 0 - false, record has not changed
        # Assumes: Database records for the Term have been retrieved into the dbRecord structure
-       # Effects: Executes upates to the term table/note
-       #          Executes deletes/inserts into the MGI_Synonym table
-       #          Executes updates to the term table (status and terms fields);
-       #          note that, for efficiency, both the status and term fields
-       #          are updated if either or both fields have to be updated
+       # Effects: adds to 'changes'; buffers the new MGI_Note/MGI_Synonym inserts
+       #          for a changed comment or changed synonyms;
+       #          note that only one of the status and term fields is
+       #          updated; if the status changed, the term is left alone
        # Throws:  propagates any exceptions raised 
 
        recordChanged = 0
@@ -1185,15 +1529,8 @@ class TermLoad:
        if recordDefinition == None:
            recordDefinition = ""
 
-       #self.log.writeline('note: ' + str(dbRecord[0]['_term_key']) + ', ' + str(dbRecord[0]['note']))
-       #self.log.writeline('dbDefinition: ' + str(dbDefinition))
-       #self.log.writeline('record: ' + str(record['note']))
-
-       if recordDefinition == None:
-          vocloadlib.nl_sqlog(UPDATE_TERMNOTE % ('null', termKey), self.log)
-          recordChanged = 1
-       elif (recordDefinition != dbDefinition):
-          vocloadlib.nl_sqlog(UPDATE_TERMNOTE % ("'" + record['note'].replace("'", "''") + "'", termKey), self.log)
+       if (recordDefinition != dbDefinition):
+          changes.notes.append((termKey, record['note']))
           recordChanged = 1
           # Now write report record if the DB record is not null or blank and the term has annotations associated with it
           if dbRecord[0]['note'] is not None:
@@ -1203,7 +1540,7 @@ class TermLoad:
        # Check comment
        #
 
-       commentDiscrepancy = obsoleteTermDiscrepancy = 0
+       commentDiscrepancy = 0
 
        # Get dbRecord in sync with file record by converting "None" to blank
 
@@ -1214,10 +1551,9 @@ class TermLoad:
 
        if (str.strip(record['comment']) != str.strip(dbComment)):
 
-          # can't do simple update because of 255 size limit; therefore, do a delete and insert
-          # no longer true...this should be rewritten to use UPDATE
+          # delete the existing comment and insert the new one
 
-          vocloadlib.nl_sqlog(DELETE_NOTE % (termKey, os.environ['VOCAB_COMMENT_KEY']), self.log)
+          changes.comments.append(termKey)
           self.generateCommentSQL(record['comment'], termKey)
           recordChanged = 1
 
@@ -1248,25 +1584,8 @@ class TermLoad:
        dbSynonymTypes = dbRecord[0]['synonymTypes']
 
        # make sure synonyms and synonym types are in the same order
-       for i in range(0,len(dbSynonyms)):
-           for j in range(i+1,len(dbSynonyms)):
-               if dbSynonyms[i] > dbSynonyms[j]:
-                   tmpSynonym = dbSynonyms[i]
-                   dbSynonyms[i] = dbSynonyms[j]
-                   dbSynonyms[j] = tmpSynonym
-                   tmpSynonymType = dbSynonymTypes[i]
-                   dbSynonymTypes[i] = dbSynonymTypes[j]
-                   dbSynonymTypes[j] = tmpSynonymType
-
-       for i in range(0,len(fileSynonyms)):
-           for j in range(i+1,len(fileSynonyms)):
-               if fileSynonyms[i] > fileSynonyms[j]:
-                   tmpSynonym = fileSynonyms[i]
-                   fileSynonyms[i] = fileSynonyms[j]
-                   fileSynonyms[j] = tmpSynonym
-                   tmpSynonymType = fileSynonymTypes[i]
-                   fileSynonymTypes[i] = fileSynonymTypes[j]
-                   fileSynonymTypes[j] = tmpSynonymType
+       dbSynonyms, dbSynonymTypes = self.sortSynonyms(dbSynonyms, dbSynonymTypes)
+       fileSynonyms, fileSynonymTypes = self.sortSynonyms(fileSynonyms, fileSynonymTypes)
 
        if self.useSynonymType and (fileSynonymTypes != dbSynonymTypes):
            changeSynonymTypes = 1
@@ -1277,7 +1596,7 @@ class TermLoad:
           # if there are any differences between the file and
           # the database, simply delete all existing synonyms
           # and reinsert them
-          vocloadlib.nl_sqlog(DELETE_ALL_SYNONYMS % (termKey, self.mgitype_key), self.log)
+          changes.synonyms.append(termKey)
           self.generateSynonymSQL(fileSynonyms, fileSynonymTypes, termKey)
           recordChanged = 1
 
@@ -1292,26 +1611,204 @@ class TermLoad:
 
        if (fileIsObsoleteField != dbRecord[0]['isObsolete']):
 
-          vocloadlib.nl_sqlog(UPDATE_STATUS % (fileIsObsoleteField, termKey), self.log)
+          changes.statuses.append((termKey, fileIsObsoleteField))
           recordChanged = 1
 
           # Now write report record if the term is obsoleted 
           # and the term has annotations associated with it
-          if (fileIsObsoleteField != dbRecord[0]['isObsolete']):
-             obsoleteTermDiscrepancy = 1
+          obsoleteTermDiscrepancy = 1
 
        elif (record['term'] != dbRecord[0]['term']):
-          # double-quote any single-quote values
-          vocloadlib.nl_sqlog(UPDATE_TERM % (record['term'].replace("'", "''"), termKey), self.log)
+          changes.terms.append((termKey, record['term']))
           recordChanged = 1
 
        #
-       # Now write report discrepancy record(s) if necessary
+       # remember the term so its annotations can be checked for the
+       # discrepancy report(s) once all records have been classified
        #
 
        if (definitionDiscrepancy or commentDiscrepancy or obsoleteTermDiscrepancy):
+          changes.annotationChecks.append((record, dbRecord[0], termKey,
+              definitionDiscrepancy, commentDiscrepancy, obsoleteTermDiscrepancy))
+
+       return recordChanged
+
+    def sortSynonyms(self, synonyms, synonymTypes):
+       # Purpose: sort synonyms, keeping each synonym type with its synonym
+       # Returns: tuple of two lists: the sorted synonyms, and their types
+       # Assumes: nothing
+       # Effects: nothing
+       # Throws:  nothing
+
+       if len(synonyms) != len(synonymTypes):
+          # the types do not line up with the synonyms; the comparison
+          # will find them different anyway
+          return sorted(synonyms), list(synonymTypes)
+
+       pairs = sorted(zip(synonyms, synonymTypes))
+       return [ p[0] for p in pairs ], [ p[1] for p in pairs ]
+
+    def applyChanges(self, changes):
+       # Purpose: apply the changes found by classifyRecordChanges() and
+       #          processSecondaryTerms() as a few set-based statements
+       # Returns: nothing
+       # Assumes: all input records have been classified
+       # Effects: inserts new terms, updates VOC_Term, replaces changed
+       #          comments and synonyms, adds accession IDs and merges terms,
+       #          in that order (merges last, as VOC_mergeTerms() expects
+       #          both terms and their IDs to be in place; they run one at
+       #          a time, in file order, as a later one may depend on an
+       #          earlier one)
+       # Throws:  propagates any exceptions raised by vocloadlib's nl_sqlog() function
+
+       self.log.writeline(vocloadlib.timestamp('applyChanges:start'))
+
+       if self.isBCPLoad:
+           self.closeBCPFiles()
+           self.loadStagedBCPFiles([ 'VOC_Term' ])
+           self.updateTermsFromStage(changes)
+       else:
+           self.flushInserts([ 'VOC_Term' ])
+
+           vocloadlib.nl_sqlogBatch(UPDATE_TERM,
+               [ "(%d, '%s')" % (termKey, term.replace("'", "''")) for (termKey, term) in changes.terms ],
+               self.log)
+
+           vocloadlib.nl_sqlogBatch(UPDATE_TERMNOTE,
+               [ "(%d, '%s')" % (termKey, note.replace("'", "''")) for (termKey, note) in changes.notes ],
+               self.log)
+
+           vocloadlib.nl_sqlogBatch(UPDATE_STATUS,
+               [ '(%d, %d)' % (termKey, isObsolete) for (termKey, isObsolete) in changes.statuses ],
+               self.log)
 
-          annotations = vocloadlib.getAnyTermMarkerCrossReferences(termKey, self.ANNOT_TYPE_KEY)
+       for termKeys in vocloadlib.batchList(changes.comments, vocloadlib.SQL_BATCH_SIZE):
+           vocloadlib.nl_sqlog(DELETE_NOTE % (os.environ['VOCAB_COMMENT_KEY'],
+               ','.join(map(str, termKeys))), self.log)
+
+       for termKeys in vocloadlib.batchList(changes.synonyms, vocloadlib.SQL_BATCH_SIZE):
+           vocloadlib.nl_sqlog(DELETE_ALL_SYNONYMS % (self.mgitype_key,
+               ','.join(map(str, termKeys))), self.log)
+
+       if self.isBCPLoad:
+           self.loadStagedBCPFiles([ 'MGI_Note', 'MGI_Synonym', 'ACC_Accession' ])
+       else:
+           self.flushInserts([ 'MGI_Note', 'MGI_Synonym', 'ACC_Accession' ])
+
+       for (oldKey, newKey) in changes.merges:
+           vocloadlib.nl_sqlog(MERGE_TERMS % (oldKey, newKey), self.log)
+
+       self.log.writeline(vocloadlib.timestamp('applyChanges:end'))
+
+       return
+
+    def flushInserts(self, tables):
+       # Purpose: send the buffered on-line sql inserts for each of 'tables'
+       #          as multi-row inserts
+       # Returns: nothing
+       # Assumes: 'tables' are keys of INSERT_SQL, given in foreign key order
+       # Effects: inserts into the database; empties the buffers
+       # Throws:  propagates any exceptions raised by vocloadlib's nl_sqlog() function
+
+       for table in tables:
+           vocloadlib.nl_sqlogBatch(INSERT_SQL[table], self.pendingInserts[table], self.log)
+           self.pendingInserts[table] = []
+
+       return
+
+    def loadStagedBCPFiles(self, tables):
+       # Purpose: load the bcp files for each of 'tables' through staging
+       #          tables (incremental load with bcp)
+       # Returns: nothing
+       # Assumes: bcp files are closed; 'tables' are given in foreign key order
+       # Effects: database is loaded
+       # Throws:  propagates all bcp exceptions
+
+       for table in tables:
+           (loadFlag, bcpFileName) = {
+               'VOC_Term' : (self.loadTermBCP, self.termTermBCPFileName),
+               'MGI_Note' : (self.loadNoteBCP, self.termNoteBCPFileName),
+               'MGI_Synonym' : (self.loadSynonymBCP, self.termSynonymBCPFileName),
+               'ACC_Accession' : (self.loadAccessionBCP, self.accAccessionBCPFileName),
+               }[table]
+           if loadFlag:
+               vocloadlib.bcpStaged(bcpFileName, table, self.log)
+
+       return
+
+    def updateTermsFromStage(self, changes):
+       # Purpose: apply the term, note and status changes in 'changes' to
+       #          VOC_Term from a staging table (incremental load with bcp)
+       # Returns: nothing
+       # Assumes: nothing
+       # Effects: writes the term update bcp file, loads it into a temp
+       #          staging table and updates VOC_Term from it, all in the
+       #          current transaction
+       # Throws:  propagates all exceptions
+
+       if not (changes.terms or changes.notes or changes.statuses):
+           return
+
+       # one row per changed term; the flags say which fields to update
+       # (term, updateTerm, note, updateNote, isObsolete, updateStatus)
+       updates = {}
+       for (termKey, term) in changes.terms:
+           row = updates.setdefault(termKey, [ '', 0, '', 0, 0, 0 ])
+           row[0] = term
+           row[1] = 1
+       for (termKey, note) in changes.notes:
+           row = updates.setdefault(termKey, [ '', 0, '', 0, 0, 0 ])
+           row[2] = note
+           row[3] = 1
+       for (termKey, isObsolete) in changes.statuses:
+           row = updates.setdefault(termKey, [ '', 0, '', 0, 0, 0 ])
+           row[4] = int(isObsolete)
+           row[5] = 1
+
+       bcpFileName = os.environ['TERM_UPDATE_BCP_FILE']
+       fp = open(bcpFileName, 'w')
+       for termKey in updates:
+           fp.write(BCP_UPDATE_TERM % tuple([ termKey ] + updates[termKey]))
+       fp.close()
+
+       vocloadlib.nl_sqlog(CREATE_TERM_UPDATE_STAGE, self.log)
+       vocloadlib.stageFile(bcpFileName, TERM_UPDATE_STAGE, self.log)
+       vocloadlib.nl_sqlog(STAGED_UPDATE_TERM, self.log)
+       vocloadlib.nl_sqlog(STAGED_UPDATE_TERMNOTE, self.log)
+       vocloadlib.nl_sqlog(STAGED_UPDATE_STATUS, self.log)
+       vocloadlib.nl_sqlog('drop table %s' % TERM_UPDATE_STAGE, self.log)
+
+       return
+
+    def getCheckedTermAnnotations(self, changes):
+       # Purpose: get the annotations of the terms in changes.annotationChecks
+       # Returns: dictionary mapping term key to its annotations (see
+       #          vocloadlib.getTermMarkerCrossReferences())
+       # Assumes: called before applyChanges(), so merged and obsoleted
+       #          terms still have their own annotations
+       # Effects: queries the database (once for all of the terms)
+       # Throws:  propagates any exceptions raised
+
+       if not changes.annotationChecks:
+          return {}
+
+       return vocloadlib.getTermMarkerCrossReferences(
+          [ check[2] for check in changes.annotationChecks ], self.ANNOT_TYPE_KEY)
+
+    def reportAnnotationDiscrepancies(self, changes, termAnnotations):
+       # Purpose: write the Curator/Discrepancy Report records for terms whose
+       #          definition or comment changed, or which were obsoleted,
+       #          and which have annotations
+       # Returns: nothing
+       # Assumes: discrepancy file is open and writeable; 'termAnnotations'
+       #          is from getCheckedTermAnnotations()
+       # Effects: report output
+       # Throws:  propagates any exceptions raised 
+
+       for (record, dbRow, termKey, definitionDiscrepancy, commentDiscrepancy,
+               obsoleteTermDiscrepancy) in changes.annotationChecks:
+
+          annotations = termAnnotations.get(termKey, [])
 
           # only write record if annotations exist
           if len (annotations) >= 1:
@@ -1325,14 +1822,14 @@ class TermLoad:
 
              if definitionDiscrepancy:
                 msg = "Definition change for Term with annotations.\n" + \
-                    "Old Definition: %s\n" % (dbRecord[0]['note']) + \
+                    "Old Definition: %s\n" % (dbRow['note']) + \
                     "New Definition: %s\n" % (record['note']) + \
                     "Symbols: %s" % (symbols) 
                 self.writeDiscrepancyFile(record['accID'], record['term'], msg)  
            
              if commentDiscrepancy:
                 msg = "Comment change for Term with annotations.\n" + \
-                    "Old Comment: %s\n" % (dbRecord[0]['comments']) + \
+                    "Old Comment: %s\n" % (dbRow['comments']) + \
                     "New Comment: %s\n" % (record['comment']) + \
                     "Symbols: %s" % (symbols) 
                 self.writeDiscrepancyFile(record['accID'], record['term'], msg)  
@@ -1341,7 +1838,7 @@ class TermLoad:
                 msg = "Term has been obsoleted but has annotations.\n" + "Symbols: %s" % (symbols) 
                 self.writeDiscrepancyFile(record['accID'], record['term'], msg)
 
-       return recordChanged
+       return
      
     ###--- Post Process Hook ---###
     def postProcess(self):
@@ -1395,6 +1892,6 @@ if __name__ == '__main__':
     load = TermLoad(input_file, mode, vocab_key, refs_key, log)
     load.go()
     if load.commitTransaction:
-           db.commit()
+           vocloadlib.commit()
     vocloadlib.unsetupSql()
 
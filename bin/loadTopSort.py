@@ -229,38 +229,13 @@ def sortNode (node):
     global sequenceNum
     global fpBCP
 
-    #  If the node has not been visited yet, write its term key and the
-    #  next available sequence number to the bcp file.  
-    #  Otherwise, this node and all of its children must have been visited already, so skip it.
+    #  Write the term key and the next sequence number of each node, in
+    #  the order of the traversal (see DAG.getSortOrder()).
     #
-    nodeKey = node.getId()
-    if nodeKey not in visitedNodes:
+    for sortedNode in dag.getSortOrder(node):
         sequenceNum = sequenceNum + 1
-        fpBCP.write('%d|%d\n' % (node.getTermKey(),sequenceNum))
-        visitedNodes[nodeKey] = sequenceNum
-    else:
-        return
-
-    #  Get the list of child nodes (if any).
-    #
-    childList = dag.getChildrenOf(node)
-
-    #  Sort the child nodes by their term name.
-    #
-    for i in range(len(childList)):
-        for j in range(i+1,len(childList)):
-            child1, edgeType1 = childList[i]
-            child2, edgeType2 = childList[j]
-            term1 = child1.getLabel()
-            term2 = child2.getLabel()
-            if term1 > term2:
-                childList[i] = child2, None
-                childList[j] = child1, None
-
-    #  Recursively process each child node.
-    #
-    for child, edgeType in childList:
-        sortNode(child)
+        fpBCP.write('%d|%d\n' % (sortedNode.getTermKey(),sequenceNum))
+        visitedNodes[sortedNode.getId()] = sequenceNum
 
     return
 
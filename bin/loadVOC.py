@@ -43,6 +43,7 @@ vocloadpath = os.environ['VOCLOAD'] + '/lib'
 sys.path.insert(0, vocloadpath)
 import vocloadlib   # MGI-written Python libraries
 import loadDAG
+import dagValidation
 
 ###--- Exceptions ---###
 
@@ -114,6 +115,10 @@ class VOCLoad:
         # confirm the sql setup worked by doing simple query
         db.sql ('select count(1) from VOC_Vocab')
 
+        # fetch the reference data (logical DBs, synonym/note types,
+        # labels, vocabularies) once, up front
+        vocloadlib.loadReferenceData ()
+
         self.vocab_name = os.environ['VOCAB_NAME']
         self.isSimple = int(os.environ['IS_SIMPLE'])
         self.isPrivate = int(os.environ['IS_PRIVATE'])
@@ -173,6 +178,9 @@ class VOCLoad:
 
         self.log.writeline(vocloadlib.timestamp('full voc load:start'))
 
+        # check the DAG files before anything is deleted
+        self.validateDAGs ()
+
         # Only delete data if it currently exists in the database
         if self.vocab_key:
             dags = db.sql ('''select _DAG_key
@@ -193,9 +201,14 @@ class VOCLoad:
                     self.refs_key, self.isSimple, self.isPrivate,
                     self.logicalDBkey, self.vocab_name), self.log)
 
+        # the term load tells the session which terms it loaded; the DAG
+        # loads (and later steps) read them from it
+
+        self.session = vocloadlib.LoadSession (self.vocab_key, self.vocab_name)
+
         # load the terms
 
-        termload = loadTerms.TermLoad (self.termfile, self.mode, self.vocab_key, self.refs_key, self.log, self.passwordFileName )
+        termload = loadTerms.TermLoad (self.termfile, self.mode, self.vocab_key, self.refs_key, self.log, self.passwordFileName, self.session )
         termload.go()
 
         # load the DAGs if it is a complex vocabulary
@@ -215,11 +228,22 @@ class VOCLoad:
                 dag['KEY'] = dag_key
                 dag_key = dag_key + 1
 
-        if not self.isSimple:
+        # with DAG_PROCESSES > 1, the DAGs are computed at the same time
+
+        processes = int (os.environ.get ('DAG_PROCESSES', '1'))
+
+        if not self.isSimple and processes > 1 and len(list(self.config.items())) > 1:
+            dagloads = []
             for (key, dag) in list(self.config.items()):
-                dagload = loadDAG.DAGLoad (dag['LOAD_FILE'], self.mode, dag['NAME'], dag['ABBREV'], self.log, self.passwordFileName )
+                dagloads.append (loadDAG.DAGLoad (dag['LOAD_FILE'], self.mode, dag['NAME'], dag['ABBREV'], self.log, self.passwordFileName, self.session ))
+            loadDAG.loadParallel (dagloads, self.log, processes)
+
+        elif not self.isSimple:
+            for (key, dag) in list(self.config.items()):
+                dagload = loadDAG.DAGLoad (dag['LOAD_FILE'], self.mode, dag['NAME'], dag['ABBREV'], self.log, self.passwordFileName, self.session )
                 dagload.go()
 
+        self.session.save (os.environ.get ('LOAD_SESSION_FILE', ''))
         self.log.writeline(vocloadlib.timestamp('full voc load:end'))
 
         return
@@ -238,20 +262,50 @@ class VOCLoad:
         if not self.vocab_key:
             raise error(unknown_vocab % self.vocab_name)
 
+        # check the DAG files before anything is changed
+        self.validateDAGs ()
+
+        self.session = vocloadlib.LoadSession (self.vocab_key, self.vocab_name)
+
         # Now load the terms
-        termload = loadTerms.TermLoad (self.termfile, self.mode, self.vocab_key, self.refs_key, self.log, self.passwordFileName )
+        termload = loadTerms.TermLoad (self.termfile, self.mode, self.vocab_key, self.refs_key, self.log, self.passwordFileName, self.session )
         termload.go()
 
         # load DAGs
         if not self.isSimple:
             for (key, dag) in list(self.config.items()):
-                dagload = loadDAG.DAGLoad (dag['LOAD_FILE'], self.mode, dag['NAME'], dag['ABBREV'], self.log, self.passwordFileName )
+                dagload = loadDAG.DAGLoad (dag['LOAD_FILE'], self.mode, dag['NAME'], dag['ABBREV'], self.log, self.passwordFileName, self.session )
                 dagload.go()
 
+        self.session.save (os.environ.get ('LOAD_SESSION_FILE', ''))
         self.log.writeline(vocloadlib.timestamp('incremental voc load:end'))
 
         return
 
+    def validateDAGs (self):
+        # Purpose: check the DAG files of a complex vocabulary against
+        #   its Termfile and the DAG labels
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: reads the Termfile and DAG files; writes the findings
+        #   to the log
+        # Throws: dagValidation.DAGValidationError if a DAG file has a
+        #   fatal error (a cycle, or no root), or, with
+        #   DAG_VALIDATION_STRICT=1, any error or warning at all
+
+        if self.isSimple:
+            return
+
+        filenames = []
+        for (key, dag) in list(self.config.items()):
+            filenames.append (dag['LOAD_FILE'])
+
+        strict = os.environ.get ('DAG_VALIDATION_STRICT', '0') == '1'
+        dagValidation.validateDAGFiles (filenames,
+            dagValidation.readTermfileIDs (self.termfile),
+            vocloadlib.getLabels (), self.log, strict)
+        return
+
 ###--- Main Program ---###
 
 # needs to be rewritten:
@@ -96,4 +96,4 @@ if __name__ == '__main__':
         wrapper = SimpleVoc_Wrapper (sys.argv[1:])
         wrapper.go()
 
-        db.commit()
+        vocloadlib.commit()
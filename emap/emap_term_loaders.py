@@ -39,7 +39,7 @@ class EMAPALoad(TermLoad):
             [ 'term', 'accID', 'status', 'abbreviation',
             'note', 'comment', 'synonyms', 'synonymTypes',
             'otherIDs', 'start', 'end', 'parent' 
-        ])
+        ], cache = 1)
         
     def postProcess(self):
         """
@@ -122,7 +122,8 @@ class EMAPSLoad(TermLoad):
         self.datafile = vocloadlib.readTabFile(filename,
             [ 'term', 'accID', 'status', 'abbreviation',
             'note', 'comment', 'synonyms', 'synonymTypes',
-            'otherIDs', 'emapa', 'ts', 'parent']
+            'otherIDs', 'emapa', 'ts', 'parent'],
+            cache = 1
         )
         
     def postProcess(self):
@@ -75,6 +75,7 @@ vocloadpath = os.environ['VOCLOAD'] + '/lib'
 sys.path.insert(0, vocloadpath)
 import Ontology
 import loadDAG
+import vocloadlib
 import Log 
 
 from emap_term_loaders import EMAPALoad, EMAPSLoad
@@ -1086,14 +1087,14 @@ def createFiles():
 # end createFiles() -------------------------------------
 
 
-def runDagLoad(file, dag):
+def runDagLoad(file, dag, session=None):
     # Purpose: Runs a DAG load
     # Returns: Nothing
     # Assumes: Nothing
     # Effects: a DAG is loaded into a database
     # Throws: Nothing
 
-    dagload = loadDAG.DAGLoad (file, 'full', dag, "", log, passwordFileName)
+    dagload = loadDAG.DAGLoad (file, 'full', dag, "", log, passwordFileName, session)
     dagload.go()
 
     return
@@ -1203,11 +1204,12 @@ def runLoads():
     # Throws: Nothing
 
     print('running EMAPA term load')
-    termload = EMAPALoad (emapaTermFile, 'incremental', emapaVocabKey, refsKey, log, passwordFileName)
+    emapaSession = vocloadlib.LoadSession(emapaVocabKey)
+    termload = EMAPALoad (emapaTermFile, 'incremental', emapaVocabKey, refsKey, log, passwordFileName, emapaSession)
     termload.go()
     
     print('running EMAPA dag load')
-    runDagLoad(emapaDagFile, 'EMAPA')
+    runDagLoad(emapaDagFile, 'EMAPA', emapaSession)
 
     print('running EMAPS term load')
     
@@ -1218,8 +1220,10 @@ def runLoads():
     os.environ['ACCESSION_BCP_FILE']  = os.environ['ACCESSION_S_BCP_FILE']
     os.environ['DISCREP_FILE'] = os.environ['DISCREP_S_FILE']
     
-    # run the EMAPS load
-    termload = EMAPSLoad (emapsTermFile, 'full', emapsVocabKey, refsKey, log, passwordFileName)
+    # run the EMAPS load; its session gives the term IDs to all of the
+    # EMAPS DAG loads
+    emapsSession = vocloadlib.LoadSession(emapsVocabKey)
+    termload = EMAPSLoad (emapsTermFile, 'full', emapsVocabKey, refsKey, log, passwordFileName, emapsSession)
     termload.go()
 
     print('running EMAPS dag loads')
@@ -1239,7 +1243,7 @@ def runLoads():
         closureFile = os.environ['DAG_CLOSURE_S_BCP_FILE']
         os.environ['DAG_CLOSURE_BCP_FILE'] = closureFile.replace('~', '%s' % ts)
 
-        runDagLoad(tsFile, 'EMAPS%s' % ts)
+        runDagLoad(tsFile, 'EMAPS%s' % ts, emapsSession)
 
     return
 
@@ -1280,6 +1284,6 @@ if liveRun == '1':
     # run the term and DAG loads
     print('calling runLoads')
     runLoads()
-    db.commit()
+    vocloadlib.commit()
 
 sys.exit(0)
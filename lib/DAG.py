@@ -171,8 +171,9 @@ class DAG:
         #    path: list of tuples containing nodes and edge types
         #    along a path
         #  Effects:
-        #    Recursive function that finds all paths in an
-        #    acyclic graph between two nodes - uses backtracking.
+        #    Finds all paths in an acyclic graph between two
+        #    nodes - uses backtracking, following only edges to
+        #    nodes from which end can be reached
         #  Modifies:
         #  Returns:
         #    paths: list of paths; each path is a list of tuples
@@ -182,6 +183,22 @@ class DAG:
 
         if start == None:
             start = (self.getRoot(), None)
+        return self.__pathsTo(end, start, path, self.__nodesReaching(end))
+
+    def __pathsTo(self, end, start, path, reaching):
+        """
+        #  Requires:
+        #    end, start, path: as for getPathsTo()
+        #    reaching: set of ids of the nodes from which end can be
+        #    reached (see __nodesReaching())
+        #  Effects:
+        #    Recursive part of getPathsTo()
+        #  Modifies:
+        #  Returns:
+        #    paths: as for getPathsTo()
+        #  Exceptions:
+        """
+
         path = path + [start]
         node = start[0]
         if node.getId() == end.getId():
@@ -192,11 +209,34 @@ class DAG:
         paths = []
         for edge in self.outEdges[id]:
             newStart = (edge.child, edge.etype)
-            if newStart not in path:
-                newpaths = self.getPathsTo(end, newStart, path)
+            if edge.child.getId() in reaching and newStart not in path:
+                newpaths = self.__pathsTo(end, newStart, path, reaching)
                 for newpath in newpaths:
                     paths.append(newpath)
         return paths
+
+    def __nodesReaching(self, node):
+        """
+        #  Requires:
+        #    node: Node object
+        #  Effects:
+        #    Walks up the in edges from node, without recursion
+        #  Modifies:
+        #  Returns:
+        #    set of ids of node and all its ancestors
+        #  Exceptions:
+        """
+
+        reaching = set([node.getId()])
+        stack = [node.getId()]
+        while stack:
+            id = stack.pop()
+            for edge in self.inEdges.get(id, []):
+                parentId = edge.parent.getId()
+                if parentId not in reaching:
+                    reaching.add(parentId)
+                    stack.append(parentId)
+        return reaching
         
     def getNodesReachableFrom(self, node, etype=None):
         """
@@ -204,31 +244,30 @@ class DAG:
         #    node: Node object
         #    etype: string (edge type)
         #  Effects:
-        #    Depth-first search to find all descendents of a node
+        #    Depth-first search (without recursion) to find all
+        #    descendents of a node, following only edges of type
+        #    etype if it is given
         #  Modifies:
         #  Returns:
-        #    reachableNodes: list of tuples containing nodes and edge types
+        #    reachableNodes: list of tuples containing nodes and edge
+        #    types; each descendent is listed once, with the type of
+        #    the edge by which it was first reached
         #  Exceptions:
         """
 
-        id = node.getId()
-        
-        # use etype to get children
-        if etype == None:
-            children = self.getChildrenOf(node)
-        else:
-            children = []
-            for edge in self.outEdges[id]:
-                if edge.etype == etype:
-                    children.append((edge.child, edge.etype))
-
-        reachableNodes = children[:]
-        # dfs to retrieve all descendents
-        for child in children:
-            node = child[0]
-            id = node.getId()
-            if id in self.outEdges:
-                reachableNodes = reachableNodes + self.getNodesReachableFrom(node, etype)
+        reachableNodes = []
+        visited = set([node.getId()])
+        stack = [node.getId()]
+        while stack:
+            id = stack.pop()
+            for edge in self.outEdges.get(id, []):
+                if etype != None and edge.etype != etype:
+                    continue
+                childId = edge.child.getId()
+                if childId not in visited:
+                    visited.add(childId)
+                    reachableNodes.append((edge.child, edge.etype))
+                    stack.append(childId)
 
         return reachableNodes
 
@@ -268,6 +307,60 @@ class DAG:
         
         return closure
 
+    def getSortOrder(self, node):
+        """
+        #  Requires:
+        #    node: Node object (where to start; normally the root)
+        #  Effects:
+        #    Depth-first walk from node, taking the children of each
+        #    node in order of their labels; each node is listed the
+        #    first time it is reached (see loadTopSort.py)
+        #  Modifies:
+        #  Returns:
+        #    order: list of Node objects
+        #  Exceptions:
+        """
+
+        order = []
+        self.__sortNode(node, order, {})
+        return order
+
+    def __sortNode(self, node, order, visited):
+        """
+        #  Requires:
+        #    node: Node object
+        #    order: list of Node objects listed so far
+        #    visited: dictionary of ids of the nodes in order
+        #  Effects:
+        #    Recursive step of getSortOrder()
+        #  Modifies:
+        #    order, visited
+        #  Returns:
+        #  Exceptions:
+        """
+
+        #  If the node has been visited, so have all of its children.
+        #
+        nodeId = node.getId()
+        if nodeId in visited:
+            return
+        order.append(node)
+        visited[nodeId] = 1
+
+        #  Sort the child nodes by their labels.
+        #
+        childList = self.getChildrenOf(node)
+        for i in range(len(childList)):
+            for j in range(i+1,len(childList)):
+                child1, edgeType1 = childList[i]
+                child2, edgeType2 = childList[j]
+                if child1.getLabel() > child2.getLabel():
+                    childList[i] = child2, None
+                    childList[j] = child1, None
+
+        for child, edgeType in childList:
+            self.__sortNode(child, order, visited)
+
 #
 # Warranty Disclaimer and Copyright Notice
 # 
@@ -6,6 +6,13 @@
 #	OboParser
 #	OboLoader
 
+# Oct 17, 2026
+# Added a checkCycles option to OboLoader.loadFile(), which rejects a
+# relationship that would make a cycle as it is added (see the ordering kept
+# by vocloadDAG.DAG.addEdge()).
+# Added OboOntology.getReachabilityIndex(), getAncestors() and
+# getDescendants(), which answer from a cached vocloadDAG.ReachabilityIndex.
+#
 # Oct 2?, 2013 (jak)
 # Changed OboOntology to support dynamic changes to the ontology after
 # reading/parsing the ontology from a file.
@@ -84,6 +91,8 @@ An OboOntology keeps track of various things about the ontology:
     relationshipTypes - dict: relationshiptype -> 0 (value not used)
     nsRoots	      - dict: namespace (string) -> list of root OboTerms in
                                                    that namespace
+    reachIndex	      - vocloadDAG.ReachabilityIndex of the ontology, built
+                        when first needed (None until then)
         Note the concept of "root" here:
         a term/node is a root if it has no parents in any namespace.
         One could imagine the concept of "root relative to a namespace"
@@ -112,6 +121,7 @@ class OboOntology(vocloadDAG.DAG):
                                 # (header info from the OBO file)
 
         self.nsRoots = {}	# namespace (string) -> [ root OboTerms ]
+        self.reachIndex = None	# vocloadDAG.ReachabilityIndex, or None
         self.nodeType = nodeType  # type of term objects to instantiate
 
     def getNamespaces(self):
@@ -149,6 +159,7 @@ class OboOntology(vocloadDAG.DAG):
             if name is not None:
                 t.name = name
         self.nsRoots.clear()	# clear roots cache
+        self.reachIndex = None	# and the reachability index
         return t
 
     def removeTerm(self, term):
@@ -171,6 +182,7 @@ class OboOntology(vocloadDAG.DAG):
         self.removeNode( term)
         self.id2term.pop( id)
         self.nsRoots.clear()	# clear roots cache
+        self.reachIndex = None	# and the reachability index
 
     def hasTerm(self, id):
     # Return True if we have a term w/ the specified ID (string)
@@ -198,10 +210,12 @@ class OboOntology(vocloadDAG.DAG):
 
         setattr(term,attr,value)
 
-    def addRelationship(self, child, rel, parent):
+    def addRelationship(self, child, rel, parent, checkCycles=False):
     # Add the specified relationship to the ontology.
     # rel (string) is the relationship type
     # parent and child can be either IDs (string)) or OboTerms themselves
+    # checkCycles - if true, raise vocloadDAG.CycleError (and do not add
+    #		 the relationship) if it would make a cycle
     # Assumes child and parent refer to existing OboTerms in the ontology.
         if type(parent) is str:	# if parent is ID
             parent = self.getTerm(parent)
@@ -209,8 +223,9 @@ class OboOntology(vocloadDAG.DAG):
             child = self.getTerm(child)
 
         self.relationshipTypes[rel] = 0
-        self.addEdge(parent, child, rel, checkCycles=False)
+        self.addEdge(parent, child, rel, checkCycles=checkCycles)
         self.nsRoots.clear()	# clear roots cache
+        self.reachIndex = None	# and the reachability index
 
     def removeRelationship(self, parent, child):
     # Remove the specified relationship from the ontology.
@@ -222,6 +237,30 @@ class OboOntology(vocloadDAG.DAG):
 
         self.removeEdge(parent, child)
         self.nsRoots.clear()	# clear roots cache
+        self.reachIndex = None	# and the reachability index
+
+    def getReachabilityIndex(self):
+    # Return a vocloadDAG.ReachabilityIndex of the ontology, for constant
+    #   time ancestor/descendant queries. It is built on the first call
+    #   and kept until the ontology changes.
+    # Raises vocloadDAG.CycleError if the ontology has a cycle.
+        if self.reachIndex is None:
+            self.reachIndex = self.reachabilityIndex()
+        return self.reachIndex
+
+    def getAncestors(self, term):
+    # Return a list of the ancestors [OboTerms] of the specified term
+    # term can be an ID (string) or an OboTerm object itself
+        if type(term) is str:	# if term is ID
+            term = self.getTerm(term)
+        return self.getReachabilityIndex().getAncestors(term)
+
+    def getDescendants(self, term):
+    # Return a list of the descendants [OboTerms] of the specified term
+    # term can be an ID (string) or an OboTerm object itself
+        if type(term) is str:	# if term is ID
+            term = self.getTerm(term)
+        return self.getReachabilityIndex().getDescendants(term)
 
     def getRoots(self, ns=None):
     # Return a list of root nodes [OboTerms]
@@ -377,8 +416,9 @@ class OboLoader(object):
         self.defaultNamespace = "ontology." + str(id(self))
         self.nodeType = None
         self.cullCrossEdges = True
+        self.checkCycles = False
 
-    def loadFile(self, file, cullObsolete=False, loadMinimal=False, config=None, nodeType=OboTerm, cullCrossEdges=True, termCallBack=None):
+    def loadFile(self, file, cullObsolete=False, loadMinimal=False, config=None, nodeType=OboTerm, cullCrossEdges=True, termCallBack=None, checkCycles=False):
     # Return a new Ontology object representing the OBO file
     # file - either a filename (string) or an file descriptor open for reading.
     # cullObsolete - if true obsolete terms are skipped & not represented
@@ -389,6 +429,9 @@ class OboLoader(object):
     #		 This needs to be a subclass of OboTerm.
     # cullCrossEdges - if true, any edges between terms in different namespaces
     #		 are omitted.
+    # checkCycles - if true, each relationship is checked as it is added,
+    #		 and vocloadDAG.CycleError is raised (naming the terms)
+    #		 for the first one which would make a cycle.
     # termCallBack is optional function to finalize a term from a term stanza
     #     in the OBO file. The function is passed the term object (nodeType)
     #     and a dict representing the stanza (see OboParser for dict details)
@@ -400,6 +443,7 @@ class OboLoader(object):
         self.ontology = OboOntology(nodeType=self.nodeType)
         self.ontology.config = config
         self.cullCrossEdges = cullCrossEdges
+        self.checkCycles = checkCycles
         self.termCallBack = termCallBack
 
         self.parser.parseFile(file)
@@ -444,7 +488,7 @@ class OboLoader(object):
         for isa in stanza.get("is_a", []):
             id2 = isa.strip()
             self.ontology.addTerm(id2)		# don't know the term's name
-            self.ontology.addRelationship(id, "is_a", id2)
+            self.addRelationship(id, "is_a", id2)
 
         for reln in stanza.get("relationship", []):
             tokens = reln.split()		# should be edge-type parentID
@@ -452,7 +496,7 @@ class OboLoader(object):
                 raise Exception("Unexpected relationship specification: " + str(tokens))
             (rel,id2) = list(map(str.strip, tokens))
             self.ontology.addTerm(id2)		# don't know term's name
-            self.ontology.addRelationship(id, rel, id2)
+            self.addRelationship(id, rel, id2)
 
         if self.loadMinimal:
             return
@@ -465,6 +509,12 @@ class OboLoader(object):
         # call back for any custom stanza processing (if any)
         self.termCallBack and self.termCallBack(t, stanza)
 
+    def addRelationship(self, id, rel, id2):
+        try:
+            self.ontology.addRelationship(id, rel, id2, checkCycles=self.checkCycles)
+        except vocloadDAG.CycleError:
+            raise vocloadDAG.CycleError("%s %s %s would create cycle." % (id, rel, id2))
+
 #------------------------------------
 #
 # Example subclass of OboTerm
@@ -0,0 +1,311 @@
+
+# Name: dagClosure.py
+#
+# Purpose: computes the transitive closure of a DAG (every ancestor /
+#   descendant pair) for the DAG_Closure table
+#
+# Implementation:
+#   The nodes are numbered 0..n-1, and the descendants of each node are
+#   kept as a bitset in a Python int (bit i set = node i is a descendant).
+#   Nodes are visited leaves first (reverse topological order, found
+#   without recursion), so each node's set is just the union of its
+#   children and their sets.  A node's set is dropped as soon as all of
+#   its parents have used it, and its pairs are handed to the caller as
+#   soon as it is computed, so the whole closure is never held in memory.
+#
+#   Nothing here touches the database.
+#
+
+###--- Exceptions ---###
+
+class DAGClosureError(Exception):
+    """
+    Raised when the closure cannot be computed (the graph has a cycle)
+    """
+
+cycle_found = 'cannot compute closure; graph has a cycle through %d nodes, including %s'
+
+###--- Functions ---###
+
+def closurePairs (
+    childrenOf,     # dict; childrenOf[node] = list of children of node
+    nodes = []      # list of nodes to include even if they have no edges
+    ):
+    # Purpose: generate the (ancestor, descendant) pairs of the
+    #   transitive closure of the DAG described by 'childrenOf'
+    # Returns: generator of (ancestor, descendant) tuples; each pair
+    #   appears once, and all of a node's pairs appear together
+    # Assumes: nodes are hashable
+    # Effects: nothing
+    # Throws: DAGClosureError if the graph has a cycle (raised before
+    #   any pair of the nodes on or above the cycle is generated)
+    # Example:
+    #   childrenOf = { 2 : [ 1, 4 ], 4 : [ 3 ] }          2
+    #   closurePairs (childrenOf) yields:                / \
+    #       (4, 3), (2, 1), (2, 4), (2, 3)              1   4
+    #   (in some order)                                     |
+    #                                                       3
+
+    # number the nodes densely
+
+    index = {}          # node -> number
+    names = []          # number -> node
+    for node in nodes:
+        if node not in index:
+            index[node] = len(names)
+            names.append (node)
+    for (parent, children) in childrenOf.items():
+        for node in [ parent ] + list(children):
+            if node not in index:
+                index[node] = len(names)
+                names.append (node)
+
+    children = [ [] for i in range(len(names)) ]  # number -> children's numbers
+    for (parent, kids) in childrenOf.items():
+        p = index[parent]
+        for kid in kids:
+            children[p].append (index[kid])
+
+    for (i, j) in indexedClosurePairs (children, names):
+        yield (names[i], names[j])
+    return
+
+def indexedClosurePairs (
+    children,       # list; children[i] = list of numbers of children of
+                    #   node i, for nodes numbered 0..len(children)-1
+    names = None    # list; names[i] = node i, for error messages only
+    ):
+    # Purpose: generate the (ancestor, descendant) pairs of the
+    #   transitive closure of a DAG whose nodes are numbered densely
+    # Returns: generator of (ancestor number, descendant number) tuples;
+    #   each pair appears once, and all of a node's pairs appear together
+    # Assumes: nothing
+    # Effects: nothing
+    # Throws: DAGClosureError if the graph has a cycle (raised before
+    #   any pair of the nodes on or above the cycle is generated)
+    # Notes: For callers which already keep their nodes numbered 0..n-1;
+    #   closurePairs() numbers the nodes and calls this.
+
+    for (i, bits) in descendantBits (children, names):
+        for j in bitIndexes (bits):
+            yield (i, j)
+    return
+
+def descendantSets (
+    children,       # list; children[i] = list of numbers of children of
+                    #   node i, for nodes numbered 0..len(children)-1
+    wanted,         # list of numbers of the nodes whose sets we want
+    names = None    # list; names[i] = node i, for error messages only
+    ):
+    # Purpose: get the descendants of some of the nodes of a DAG whose
+    #   nodes are numbered densely
+    # Returns: dict; d[i] = bitset (int) of the numbers of the
+    #   descendants of node i, for each i in 'wanted'
+    # Assumes: nothing
+    # Effects: nothing
+    # Throws: DAGClosureError if the graph has a cycle
+    # Notes: Only the sets in 'wanted' are kept, so comparing two
+    #   versions of a DAG around a few changed nodes stays cheap.
+
+    wanted = set(wanted)
+    sets = {}
+    for (i, bits) in descendantBits (children, names):
+        if i in wanted:
+            sets[i] = bits
+    return sets
+
+def descendantBits (
+    children,       # list; children[i] = list of numbers of children of
+                    #   node i, for nodes numbered 0..len(children)-1
+    names = None    # list; names[i] = node i, for error messages only
+    ):
+    # Purpose: generate the descendants of each node of a DAG whose
+    #   nodes are numbered densely, leaves first
+    # Returns: generator of (node number, bitset of its descendants'
+    #   numbers) tuples, one for each node
+    # Assumes: nothing
+    # Effects: nothing
+    # Throws: DAGClosureError if the graph has a cycle (raised after
+    #   every node not on or above the cycle has been generated)
+
+    count = len(children)
+    parents = [ [] for i in range(count) ]      # number -> parents' numbers
+    for p in range(count):
+        for c in children[p]:
+            parents[c].append (p)
+
+    # childrenLeft[i] = number of children of i whose sets are not done
+    # parentsLeft[i] = number of parents of i which have not used its set
+
+    childrenLeft = [ len(kids) for kids in children ]
+    parentsLeft = [ len(ps) for ps in parents ]
+
+    ready = [ i for i in range(count) if childrenLeft[i] == 0 ]
+    descendants = {}    # number -> bitset of descendants' numbers
+    done = 0
+
+    while ready:
+        i = ready.pop()
+        done = done + 1
+
+        bits = 0
+        for c in children[i]:
+            bits = bits | (1 << c) | descendants[c]
+
+            # the child's set is no longer needed once all its parents
+            # have used it
+            parentsLeft[c] = parentsLeft[c] - 1
+            if parentsLeft[c] == 0:
+                del descendants[c]
+
+        if parentsLeft[i]:
+            descendants[i] = bits
+
+        yield (i, bits)
+
+        for p in parents[i]:
+            childrenLeft[p] = childrenLeft[p] - 1
+            if childrenLeft[p] == 0:
+                ready.append (p)
+
+    if done < count:
+        stuck = [ i for i in range(count) if childrenLeft[i] > 0 ]
+        if names is not None:
+            stuck = [ names[i] for i in stuck ]
+        raise DAGClosureError(cycle_found % (len(stuck), stuck[:5]))
+    return
+
+def closureSize (
+    children,       # list; children[i] = list of numbers of children of
+                    #   node i, for nodes numbered 0..len(children)-1
+    ):
+    # Purpose: count the pairs in the transitive closure of a DAG whose
+    #   nodes are numbered densely, without generating them
+    # Returns: integer
+    # Assumes: nothing
+    # Effects: nothing
+    # Throws: DAGClosureError if the graph has a cycle
+
+    size = 0
+    for (i, bits) in descendantBits (children):
+        size = size + bin(bits).count ('1')
+    return size
+
+def checkAcyclic (
+    children,       # list; children[i] = list of numbers of children of
+                    #   node i, for nodes numbered 0..len(children)-1
+    names = None    # list; names[i] = node i, for error messages only
+    ):
+    # Purpose: check that a DAG whose nodes are numbered densely has no
+    #   cycle, without computing any closure
+    # Returns: nothing
+    # Assumes: nothing
+    # Effects: nothing
+    # Throws: DAGClosureError if the graph has a cycle
+    # Notes: For callers which hand the closure pairs on lazily and so
+    #   want a cycle found before anything is written.
+
+    count = len(children)
+    parentsLeft = [ 0 ] * count     # number -> parents not yet removed
+    for p in range(count):
+        for c in children[p]:
+            parentsLeft[c] = parentsLeft[c] + 1
+
+    ready = [ i for i in range(count) if parentsLeft[i] == 0 ]
+    done = 0
+    while ready:
+        i = ready.pop()
+        done = done + 1
+        for c in children[i]:
+            parentsLeft[c] = parentsLeft[c] - 1
+            if parentsLeft[c] == 0:
+                ready.append (c)
+
+    if done < count:
+        stuck = [ i for i in range(count) if parentsLeft[i] > 0 ]
+        if names is not None:
+            stuck = [ names[i] for i in stuck ]
+        raise DAGClosureError(cycle_found % (len(stuck), stuck[:5]))
+    return
+
+def bitIndexes (
+    bits        # int; a bitset
+    ):
+    # Purpose: list the numbers of the bits set in 'bits'
+    # Returns: generator of integers, in increasing order
+    # Assumes: nothing
+    # Effects: nothing
+    # Throws: nothing
+    # Notes: Scans the binary string of 'bits' for '1's, which is much
+    #   faster than taking bits off a large int one at a time.
+
+    if not bits:
+        return
+    binary = format (bits, 'b')[::-1]      # bit i is binary[i]
+    i = binary.find ('1')
+    while i >= 0:
+        yield i
+        i = binary.find ('1', i + 1)
+    return
+
+def getClosure (
+    childrenOf,     # dict; childrenOf[node] = list of children of node
+    nodes = []      # list of nodes to include even if they have no edges
+    ):
+    # Purpose: compute the transitive closure of the DAG described by
+    #   'childrenOf'
+    # Returns: dict; d[node] = list of all descendants of node (for every
+    #   node, including those with no descendants)
+    # Assumes: nodes are hashable
+    # Effects: nothing
+    # Throws: DAGClosureError if the graph has a cycle
+    # Notes: This holds the whole closure in memory; when the pairs can be
+    #   used one at a time, use closurePairs() instead.
+
+    closure = {}
+    for node in nodes:
+        closure[node] = []
+    for (parent, children) in childrenOf.items():
+        closure.setdefault (parent, [])
+        for child in children:
+            closure.setdefault (child, [])
+
+    for (ancestor, descendant) in closurePairs (childrenOf, nodes):
+        closure[ancestor].append (descendant)
+    return closure
+
+###--- Main Program ---###
+
+if __name__ == '__main__':
+    # self test: the example above, plus a chain far deeper than the
+    # recursion limit, plus a cycle
+
+    closure = getClosure ({ 2 : [ 1, 4 ], 4 : [ 3 ] })
+    for node in closure:
+        closure[node].sort()
+    assert closure == { 1 : [], 2 : [ 1, 3, 4 ], 3 : [], 4 : [ 3 ] }, closure
+
+    depth = 2000
+    chain = {}
+    for i in range(depth):
+        chain[i] = [ i + 1 ]
+    pairs = 0
+    for pair in closurePairs (chain):
+        pairs = pairs + 1
+    assert pairs == depth * (depth + 1) // 2, pairs
+
+    try:
+        list(closurePairs ({ 1 : [ 2 ], 2 : [ 3 ], 3 : [ 1 ], 0 : [ 1 ] }))
+        raise AssertionError('cycle not found')
+    except DAGClosureError:
+        pass
+
+    checkAcyclic ([ [ 1, 2 ], [ 2 ], [] ])
+    assert closureSize ([ [ 1, 2 ], [ 2 ], [] ]) == 3
+    try:
+        checkAcyclic ([ [ 1 ], [ 2 ], [ 1 ] ])
+        raise AssertionError('cycle not found')
+    except DAGClosureError:
+        pass
+
+    print('dagClosure: ok')
@@ -0,0 +1,256 @@
+
+# Name: dagValidation.py
+#
+# Purpose: checks the DAG files of a vocabulary before anything is
+#   deleted from the database, so a bad file stops the load while the
+#   database is still untouched
+#
+# Implementation:
+#   Each DAG file is read once.  The IDs and labels on each line are
+#   checked against the terms of the Termfile and the DAG labels, and
+#   duplicate edges are found by set lookups.  The edges of the good
+#   lines then make a graph, which is checked for cycles (see
+#   dagClosure.checkAcyclic), for more than one root, and for nodes
+#   which cannot be reached from a root.
+#
+#   Findings are of three kinds:
+#       line errors - the line will be skipped by the DAG load (and
+#           written to its discrepancy report)
+#       fatal errors - the DAG cannot be loaded (a cycle, or no root)
+#       warnings - the DAG can be loaded, but is probably not as meant
+#   Fatal errors always stop the load; in strict mode, every finding
+#   does.
+#
+#   Nothing here touches the database.
+#
+
+import vocloadlib
+import dagClosure
+
+###--- Exceptions ---###
+
+class DAGValidationError(Exception):
+    """
+    Raised when the DAG files of a vocabulary fail validation
+    """
+
+validation_failed = 'DAG validation failed: %s'
+
+###--- Globals ---###
+
+DAG_FIELDS = [ 'childID', 'node_label', 'edge_label', 'parentID' ]
+
+SHOW = 5        # number of examples given in a summary line
+
+###--- Classes ---###
+
+class DAGReport:
+    # IS: the findings of validating one DAG file
+    # HAS: the file name, its line errors, fatal errors and warnings,
+    #   and counts of its nodes and edges
+    # DOES: summarizes the findings for the log
+
+    def __init__ (self,
+        filename    # str. path to the DAG file
+        ):
+        # Purpose: constructor
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        self.filename = filename
+        self.lineErrors = []    # (line number, child ID, message)
+        self.fatal = []         # messages
+        self.warnings = []      # messages
+        self.nodes = 0
+        self.edges = 0
+        return
+
+    def isClean (self):
+        # Purpose: tell whether the file has no findings at all
+        # Returns: boolean (0/1)
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        return not (self.lineErrors or self.fatal or self.warnings)
+
+    def summary (self):
+        # Purpose: describe the findings
+        # Returns: list of str.; one line each
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        lines = [ '%s: %d nodes, %d edges, %d line errors, %d fatal errors, %d warnings' % \
+            (self.filename, self.nodes, self.edges, len(self.lineErrors),
+            len(self.fatal), len(self.warnings)) ]
+        for (lineNum, childID, message) in self.lineErrors[:SHOW]:
+            lines.append ('    line %d (%s): %s' % (lineNum, childID, message))
+        if len(self.lineErrors) > SHOW:
+            lines.append ('    ... and %d more line errors' % (len(self.lineErrors) - SHOW))
+        for message in self.fatal:
+            lines.append ('    FATAL: %s' % message)
+        for message in self.warnings:
+            lines.append ('    warning: %s' % message)
+        return lines
+
+###--- Functions ---###
+
+def readTermfileIDs (
+    filename    # str. path to a Termfile
+    ):
+    # Purpose: get the primary IDs of the terms in a Termfile
+    # Returns: set of str.
+    # Assumes: the ID is the second field of each line (as it is in
+    #   every Termfile format)
+    # Effects: reads 'filename'
+    # Throws: IOError if 'filename' cannot be read
+
+    accIDs = set()
+    fp = open (filename, 'r')
+    try:
+        for line in fp:
+            fields = line.split ('\t', 2)
+            if len(fields) > 1 and fields[1]:
+                accIDs.add (fields[1])
+    finally:
+        fp.close()
+    return accIDs
+
+def validateDAGFile (
+    filename,   # str. path to a DAG file
+    termIDs,    # set (or dict) of the IDs the DAG's nodes may have
+    labels      # dict (or set) of the known DAG labels
+    ):
+    # Purpose: check one DAG file
+    # Returns: DAGReport
+    # Assumes: nothing
+    # Effects: reads 'filename'
+    # Throws: propagates any exception from vocloadlib.readTabFile()
+    #   (such as a line with the wrong number of fields)
+
+    report = DAGReport (filename)
+
+    index = {}          # ID -> number, for the nodes of the good lines
+    names = []          # number -> ID
+    children = []       # number -> children's numbers
+    hasLine = set()     # numbers of nodes with a line of their own
+    roots = []          # numbers of nodes with a line with no parent
+    hasParent = set()   # numbers of nodes with a parent
+    edgesSeen = set()   # (parent ID, child ID)
+
+    lineNum = 0
+    for record in vocloadlib.readTabFile (filename, DAG_FIELDS):
+        lineNum = lineNum + 1
+        childID = record['childID']
+        parentID = str.rstrip (record['parentID'])
+
+        errors = []
+        if not childID:
+            errors.append ('Child ID is required')
+        elif childID not in termIDs:
+            errors.append ('Unknown child ID %s' % childID)
+        if parentID and parentID not in termIDs:
+            errors.append ('Unknown parent ID %s' % parentID)
+        if record['node_label'] and record['node_label'] not in labels:
+            errors.append ('Unknown node label "%s"' % record['node_label'])
+        if record['edge_label'] and record['edge_label'] not in labels:
+            errors.append ('Unknown edge label "%s"' % record['edge_label'])
+        if parentID and (parentID, childID) in edgesSeen:
+            errors.append ('Parent has duplicate child')
+
+        if errors:
+            report.lineErrors.append ( (lineNum, childID, ' '.join (errors)) )
+            continue
+
+        for accID in [ childID, parentID ]:
+            if accID and accID not in index:
+                index[accID] = len(names)
+                names.append (accID)
+                children.append ([])
+        child = index[childID]
+        hasLine.add (child)
+
+        if parentID:
+            edgesSeen.add ( (parentID, childID) )
+            children[index[parentID]].append (child)
+            hasParent.add (child)
+        elif child not in roots:
+            roots.append (child)
+
+    report.nodes = len(names)
+    report.edges = len(edgesSeen)
+
+    if not names:
+        return report
+
+    try:
+        dagClosure.checkAcyclic (children, names)
+    except dagClosure.DAGClosureError as message:
+        report.fatal.append (str(message))
+
+    if not roots:
+        report.fatal.append ('no root (no line without a parent ID)')
+    elif len(roots) > 1:
+        report.warnings.append ('%d roots: %s' % (len(roots),
+            ', '.join ([ names[i] for i in roots[:SHOW] ])))
+
+    rootsWithParents = [ names[i] for i in roots if i in hasParent ]
+    if rootsWithParents:
+        report.warnings.append ('%d roots also have parents: %s' % \
+            (len(rootsWithParents), ', '.join (rootsWithParents[:SHOW])))
+
+    noLine = [ names[i] for i in range(0, len(names)) if i not in hasLine ]
+    if noLine:
+        report.warnings.append ('%d parents have no line of their own: %s' % \
+            (len(noLine), ', '.join (noLine[:SHOW])))
+
+    # every node should be reachable from a root
+
+    reached = set(roots)
+    stack = list(roots)
+    while stack:
+        for child in children[stack.pop()]:
+            if child not in reached:
+                reached.add (child)
+                stack.append (child)
+    if len(reached) < len(names):
+        unreached = [ names[i] for i in range(0, len(names)) if i not in reached ]
+        report.warnings.append ('%d nodes cannot be reached from a root: %s' % \
+            (len(unreached), ', '.join (unreached[:SHOW])))
+
+    return report
+
+def validateDAGFiles (
+    filenames,  # list of str.; paths to the DAG files of a vocabulary
+    termIDs,    # set (or dict) of the IDs the DAGs' nodes may have
+    labels,     # dict (or set) of the known DAG labels
+    log,        # Log.Log object; where to write the findings
+    strict = 0  # boolean (0/1); fail on any finding, not just fatal ones?
+    ):
+    # Purpose: check all of the DAG files of a vocabulary
+    # Returns: list of DAGReports, one per file
+    # Assumes: nothing
+    # Effects: reads the files; writes the findings to 'log'
+    # Throws: DAGValidationError if any file has a fatal error (or, if
+    #   'strict', any finding at all)
+
+    log.writeline (vocloadlib.timestamp ('DAG validation start: %d files' % len(filenames)))
+
+    reports = []
+    failed = []
+    for filename in filenames:
+        report = validateDAGFile (filename, termIDs, labels)
+        reports.append (report)
+        for line in report.summary():
+            log.writeline (line)
+        if report.fatal or (strict and not report.isClean()):
+            failed.append (filename)
+
+    log.writeline (vocloadlib.timestamp ('DAG validation stop'))
+
+    if failed:
+        raise DAGValidationError(validation_failed % ', '.join (failed))
+    return reports
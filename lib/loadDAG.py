@@ -54,9 +54,14 @@ import sys      # standard Python libraries
 import types
 import getopt
 import os
+import time
+import json
+import multiprocessing
+import concurrent.futures
 
 import Log      # MGI-written Python libraries
 import vocloadlib
+import dagClosure
 import voc_html
 import mgi_utils
 import db
@@ -81,12 +86,21 @@ USAGE = '''Usage: %s [-f|-i][-l <file>] <server> <db> <user> <pwd> <key> <input>
 error = 'DAGLoad.error'
 
 unknown_mode = 'unknown load mode: %s'
+unknown_backend = 'unknown CLOSURE_BACKEND "%s"; expected one of %s'
+closure_mismatch = 'closure backends disagree for DAG %d: %d rows only from python, %d only from the database'
 
 # constant for today's date, to be used in BCP files
 CDATE = mgi_utils.date("%m/%d/%Y")
 # constant for _createdby_key, to be used in BCP files
 CREATEDBY_KEY = 1001
 
+# label given to the nodes of the terms listed in HEADER_FILE
+HEADER_LABEL = 'Header'
+
+# DAGLoads being computed by loadParallel(); the worker processes find
+# theirs here (by index), as forked copies
+PARALLEL_LOADS = []
+
 ###--- SQL INSERT Statements ---###
 
     # templates placed here for readability of the code, and formatted for
@@ -104,6 +118,73 @@ INSERT_CLOSURE = '''insert DAG_Closure (_DAG_key, _MGIType_key, _Ancestor_key, _
 
 BCP_INSERT_CLOSURE = '''%%d|%%s|%%d|%%d|%%d|%%d|%%d|%%d|%s|%s\n''' % (CDATE, CDATE)
 
+###--- Closure Backends ---###
+
+    # a full load can compute DAG_Closure in python (and bcp or stream the
+    # rows) or in the database (from the loaded DAG_Edge rows); see
+    # DAGLoad.chooseClosureBackend()
+
+CLOSURE_BACKENDS = [ 'python', 'database', 'auto', 'compare' ]
+CLOSURE_BACKEND = 'python'      # default; CLOSURE_BACKEND in the environment
+
+# the closure of one DAG, from its edges; %d is the _DAG_key (twice)
+CLOSURE_CTE = '''with recursive closure (a, d) as (
+        select _Parent_key, _Child_key from DAG_Edge where _DAG_key = %d
+        union
+        select c.a, e._Child_key from closure c, DAG_Edge e
+        where e._DAG_key = %d and e._Parent_key = c.d
+    )
+    select c.a as anc, c.d as des, an._Object_key as ancObj, dn._Object_key as desObj, an._Label_key as ancLabel, dn._Label_key as desLabel
+    from closure c, DAG_Node an, DAG_Node dn
+    where an._Node_key = c.a and dn._Node_key = c.d'''
+
+INSERT_CLOSURE_CTE = '''insert into DAG_Closure (_DAG_key, _MGIType_key, _Ancestor_key, _Descendent_key, _AncestorObject_key, _DescendentObject_key, _AncestorLabel_key, _DescendentLabel_key)
+    select %d, %s, x.anc, x.des, x.ancObj, x.desObj, x.ancLabel, x.desLabel from (%s) x'''
+
+CLOSURE_LOADED = '''select _Ancestor_key, _Descendent_key, _AncestorObject_key, _DescendentObject_key, _AncestorLabel_key, _DescendentLabel_key
+    from DAG_Closure where _DAG_key = %d'''
+
+# a 'compare' load keeps the python rows aside while it times the database
+CREATE_CLOSURE_CHECK = '''create temp table closure_check as %s''' % CLOSURE_LOADED
+
+CLOSURE_CHECKED = '''select _Ancestor_key, _Descendent_key, _AncestorObject_key, _DescendentObject_key, _AncestorLabel_key, _DescendentLabel_key
+    from closure_check'''
+
+DELETE_CLOSURE = '''delete from DAG_Closure where _DAG_key = %d'''
+
+# rows of the first query which are not in the second
+CLOSURE_EXCEPT = '''select count(*) as ct from (%s except %s) x'''
+
+###--- SQL for Incremental Loads ---###
+
+    # an incremental load changes only the affected rows, by sending
+    # batches of rows (see vocloadlib.nl_sqlogBatch) in the load's own
+    # transaction; the %%s in each template is filled by a list of rows
+
+SELECT_NODES = '''select _Node_key, _Object_key, _Label_key from DAG_Node where _DAG_key = %d'''
+
+SELECT_EDGES = '''select _Edge_key, _Parent_key, _Child_key, _Label_key, sequenceNum from DAG_Edge where _DAG_key = %d'''
+
+DELETE_EDGES = '''delete from DAG_Edge where _Edge_key in (%s)'''
+
+DELETE_CLOSURE_PAIRS = '''delete from DAG_Closure c using (values %%s) as v(a, d) where c._DAG_key = %d and c._Ancestor_key = v.a and c._Descendent_key = v.d'''
+
+DELETE_NODES = '''delete from DAG_Node where _Node_key in (%s)'''
+
+UPDATE_NODE_LABELS = '''update DAG_Node n set _Label_key = v.l, modification_date = now() from (values %s) as v(k, l) where n._Node_key = v.k'''
+
+UPDATE_EDGES = '''update DAG_Edge e set _Label_key = v.l, sequenceNum = v.s, modification_date = now() from (values %s) as v(k, l, s) where e._Edge_key = v.k'''
+
+UPDATE_ANCESTOR_LABELS = '''update DAG_Closure c set _AncestorLabel_key = v.l from (values %%s) as v(k, l) where c._DAG_key = %d and c._Ancestor_key = v.k'''
+
+UPDATE_DESCENDENT_LABELS = '''update DAG_Closure c set _DescendentLabel_key = v.l from (values %%s) as v(k, l) where c._DAG_key = %d and c._Descendent_key = v.k'''
+
+INSERT_NODES = '''insert into DAG_Node (_Node_key, _DAG_key, _Object_key, _Label_key) values %s'''
+
+INSERT_EDGES = '''insert into DAG_Edge (_Edge_key, _DAG_key, _Parent_key, _Child_key, _Label_key, sequenceNum) values %s'''
+
+INSERT_CLOSURES = '''insert into DAG_Closure (_DAG_key, _MGIType_key, _Ancestor_key, _Descendent_key, _AncestorObject_key, _DescendentObject_key, _AncestorLabel_key, _DescendentLabel_key) values %s'''
+
 ###--- Classes ---###
 
 class DAGLoad:
@@ -128,7 +209,9 @@ class DAGLoad:
         dag,        # str.dag name or integer dag key; the DAG to be loaded
         abbrev,     # str.abbrev ; used to create unique name of DAG bcp file; can be empty/blank ("")
         log,        # log.Log object; what to use for logging
-        passwordFile
+        passwordFile,
+        session = None  # vocloadlib.LoadSession shared with the other
+                        #   steps of the load, or None for one of our own
         ):
         # Purpose: constructor
         # Returns: nothing
@@ -142,10 +225,11 @@ class DAGLoad:
         #   mode
         #   filename, datafile
         #   mgitype_key
-        #   objToNode
-        #   childrenOf
+        #   objIndex, objKeys, nodeKeys, nodeLabels, children, roots, edges
         #   max_node_key
         #   max_edge_key
+        #   session
+        #   headerIDs
 
         # remember the log
 
@@ -169,6 +253,18 @@ class DAGLoad:
         self.loadNodeBCP=0
         self.loadClosureBCP=0
 
+        # how the closure is loaded; unless BULK_LOAD_MODE is 'file', its
+        # rows are computed as they are streamed into DAG_Closure
+        self.bulkMode = vocloadlib.bulkLoadMode()
+        self.closureRows = None     # generator of closure bcp lines, if streamed
+        self.closureCount = 0       # closure rows generated in python
+        self.closureSeconds = 0.0   # time spent generating them
+
+        # where the closure is computed (see self.chooseClosureBackend())
+        self.closureBackend = os.environ.get ('CLOSURE_BACKEND', CLOSURE_BACKEND) or CLOSURE_BACKEND
+        if self.closureBackend not in CLOSURE_BACKENDS:
+            raise error(unknown_backend % (self.closureBackend, CLOSURE_BACKENDS))
+
         # find DAG key and name (propagate error if invalid)
 
         if type(dag) == str:
@@ -187,6 +283,13 @@ class DAGLoad:
         self.vocab_key = result[0]['_Vocab_key']
         self.vocab_name = result[0]['name']
 
+        # the term IDs and highest keys come from the load session
+        # (looked up once for all the DAGs of the vocabulary)
+
+        if session is None:
+            session = vocloadlib.LoadSession (self.vocab_key, self.vocab_name)
+        self.session = session
+
         # write log header
 
         self.log.writeline ('=' * 40)
@@ -204,12 +307,26 @@ class DAGLoad:
         self.filename = filename
         self.datafile = vocloadlib.readTabFile (filename, [ 'childID', 'node_label', 'edge_label', 'parentID' ])
 
+        # the IDs of the header terms, whose nodes get the Header label
+        # (which bin/loadHeader.py then only has to verify)
+
+        self.headerIDs = readHeaderIDs (os.environ.get ('HEADER_FILE'))
+
         # remember the MGI Type (for DAG_DAG)
 
         self.mgitype_key = vocloadlib.VOCABULARY_TERM_TYPE
-        self.objToNode = {} # object key -> node key
-        self.nodeLabel = {} # node key -> label key
-        self.childrenOf = {}    # parent key -> [ children's keys ]
+
+        # the nodes of this DAG are numbered 0..n-1 (their index), in the
+        # order they are first seen; the lists below are all by index, so
+        # they grow with the DAG being loaded, not with DAG_Node
+
+        self.objIndex = {}  # object key -> index
+        self.objKeys = []   # index -> object key
+        self.nodeKeys = []  # index -> node key
+        self.nodeLabels = []    # index -> label key (None until the node is added)
+        self.children = []  # index -> [ children's indexes ]
+        self.roots = []     # indexes of parent-less nodes
+        self.edges = []     # (parent index, child index, label key, sequenceNum), in file order
         self.max_node_key = None    # max assigned _Node_key
         self.max_edge_key = None    # max assigned _Edge_key
 
@@ -237,7 +354,9 @@ class DAGLoad:
 
         return
 
-    def openDiscrepancyFile ( self ):
+    def openDiscrepancyFile ( self,
+        suffix = ''     # str. added to the file name (for DAGs loaded at the same time)
+        ):
         # Purpose: opens discrepancy file, and begins writing the HTML tags for the report content
         # Returns: nothing
         # Assumes: user executing program has write access in output directory;
@@ -245,7 +364,7 @@ class DAGLoad:
         # Throws:  propagates all exceptions opening files
 
         # open the discrepancy file
-        self.dagDiscrepFileName = os.environ['DAG_DISCREP_FILE']
+        self.dagDiscrepFileName = os.environ['DAG_DISCREP_FILE'] + suffix
         self.dagDiscrepFile     = open( self.dagDiscrepFileName     , 'w')
 
         # now write HTML header information
@@ -290,15 +409,33 @@ class DAGLoad:
         bcpLogFile   = os.environ['BCP_LOG_FILE']
         bcpErrorFile = os.environ['BCP_ERROR_FILE']
 
-        if not vocloadlib.NO_LOAD:
-           if self.loadNodeBCP:
-              db.bcp(self.dagNodeBCPFileName, 'DAG_Node', delimiter='|')
+        # edges and closure rows refer to the nodes, so they are loaded
+        # (at the same time) once the nodes are in
+
+        loader = vocloadlib.BulkLoader (self.log)
+        nodeTables = []
+
+        if self.loadNodeBCP:
+           loader.add ('DAG_Node', self.dagNodeBCPFileName)
+           nodeTables = [ 'DAG_Node' ]
+
+        if self.loadEdgeBCP:
+           loader.add ('DAG_Edge', self.dagEdgeBCPFileName, nodeTables)
+
+        if self.loadClosureBCP:
+           loader.add ('DAG_Closure', self.dagClosureBCPFileName, nodeTables,
+               self.closureRows)
 
-           if self.loadEdgeBCP:
-              db.bcp(self.dagEdgeBCPFileName, 'DAG_Edge', delimiter='|')
+        loader.run ()
 
-           if self.loadClosureBCP:
-              db.bcp(self.dagClosureBCPFileName, 'DAG_Closure', delimiter='|')
+        # in a full load, the closure may be computed from the edges just
+        # loaded (an incremental load keeps to python)
+
+        if self.mode == 'full' and self.closureBackend == 'database':
+            self.insertClosureFromEdges ()
+        elif self.mode == 'full' and self.closureBackend == 'compare' \
+                and not vocloadlib.NO_LOAD:
+            self.compareClosure (self.closureSeconds + loader.seconds.get ('DAG_Closure', 0.0))
 
     def closeBCPFiles ( self ):
         # Purpose: closes BCP files
@@ -319,42 +456,135 @@ class DAGLoad:
         # Assumes: nothing
         # Effects: does a complete delete-and-reload of data for this DAG from the MGI database
         # Throws: nothing
-        # Notes: At this point, we do everything directly in SQL.
-        #   Given time, it probably would be worthwhile to convert
-        #   this over to use BCP files, thus improving efficiency.
 
         self.log.writeline (vocloadlib.timestamp ( 'Full DAG Load Start:'))
 
-        # delete existing information for the structure of this DAG.
+        self.startFull ()
+
+        # now that we're ready to add DAG elements, we need to see
+        # what the highest remaining primary keys are in the node
+        # and edge tables (as the session knows them).
+
+        self.max_node_key = self.session.getMax ('_Node_key', 'DAG_Node')
+        self.max_edge_key = self.session.getMax ('_Edge_key', 'DAG_Edge')
+
+        self.computeFull ()
+        self.saveMaxKeys ()
+        self.log.writeline (vocloadlib.timestamp ('Full DAG Load Stop:'))
+        return
+
+    def startFull (self):
+        # PRIVATE METHOD - used by self.goFull() and loadParallel()
+        #
+        # Purpose: delete the existing structure of this DAG
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: deletes this DAG's nodes (and so its edges) and closure
+        # Throws: propagates any exceptions from vocloadlib.nl_sqlog()
+
         count = vocloadlib.countNodes (self.dag_key)
         vocloadlib.deleteDagComponents (self.dag_key, self.log)
         self.log.writeline (vocloadlib.timestamp('deleted all (%d) remaining nodes' % count))
+        vocloadlib.nl_sqlog ('delete from DAG_Closure where _DAG_key=%d' % self.dag_key, self.log)
+        return
+
+    def computeFull (self,
+        ids = None,     # dict; see vocloadlib.getTermIDs(); None to look it up
+        labels = None   # dict; see vocloadlib.getLabels(); None to look them up
+        ):
+        # PRIVATE METHOD - used by self.goFull() and loadParallel()
+        #
+        # Purpose: read the data file and write the bcp files for the
+        #   nodes, edges and closure of this DAG
+        # Returns: nothing
+        # Assumes: self.max_node_key and self.max_edge_key are the highest
+        #   keys in use (or reserved before a range set aside for this DAG)
+        # Effects: writes the bcp files (or, when streaming, sets
+        #   self.closureRows); touches the database only if 'ids' or
+        #   'labels' is None
+        # Throws: dagClosure.DAGClosureError if the DAG has a cycle
+
+        self.readDAGFile (ids, labels)
+        self.assignNodeKeys ({})
+
+        # add a node record for each child, and the edges between them
+
+        for i in range(0, len(self.objKeys)):
+            if self.nodeLabels[i] is not None:
+                self.addNode (self.nodeKeys[i], self.objKeys[i], self.nodeLabels[i])
+
+        for (parent, child, label_key, seqNum) in self.edges:
+            self.addEdge (self.nodeKeys[parent], self.nodeKeys[child], label_key, seqNum)
+
+        # and, after all the nodes and edges have been loaded, it's time to recompute the full transitive closure of the DAG and update the database accordingly.
+
+        self.updateClosure()
+        return
+
+    def saveMaxKeys (self):
+        # PRIVATE METHOD - used by self.goFull() and self.goIncremental()
+        #
+        # Purpose: tell the session the highest node and edge keys used
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: updates self.session
+        # Throws: nothing
+
+        self.session.setMax ('_Node_key', 'DAG_Node', self.max_node_key)
+        self.session.setMax ('_Edge_key', 'DAG_Edge', self.max_edge_key)
+        return
+
+    def countFile (self):
+        # PRIVATE METHOD - used by loadParallel()
+        #
+        # Purpose: find how many node and edge keys this DAG can need
+        # Returns: tuple; (most nodes, most edges)
+        # Assumes: nothing
+        # Effects: reads the data file
+        # Throws: nothing
+        # Notes: Every distinct ID in the file may become a node, and
+        #   every line with a parent an edge; lines skipped for errors
+        #   leave their keys unused.
+
+        accIDs = set()
+        edges = 0
+        for record in self.datafile:
+            accIDs.add (record['childID'])
+            parentID = str.rstrip(record['parentID'])
+            if parentID:
+                accIDs.add (parentID)
+                edges = edges + 1
+        return (len(accIDs), edges)
+
+    def readDAGFile (self,
+        ids = None,     # dict; see vocloadlib.getTermIDs(); None to look it up
+        labels = None   # dict; see vocloadlib.getLabels(); None to look them up
+        ):
+        # PRIVATE METHOD - used by self.computeFull() and self.goIncremental()
+        #
+        # Purpose: read the DAG from the data file, checking its IDs and labels
+        # Returns: nothing
+        # Assumes: the terms of the DAG have been loaded
+        # Effects: numbers the nodes of the DAG (see self.getIndex()) and
+        #   fills self.nodeLabels, self.children, self.roots and self.edges;
+        #   gives header nodes the Header label; writes skipped lines to
+        #   the discrepancy file and log
+        # Throws: nothing
 
         # load dictionaries of labels and term IDs for the vocab which
         # contains this DAG.  (for efficiency, rather than looking
         # them up individually from the db)
 
-        labels = vocloadlib.getLabels()     # label -> label key
+        if labels is None:
+            labels = self.session.getLabels()   # label -> label key
 
         # ids[primary accID] -> object key
-        ids = vocloadlib.getTermIDs(self.vocab_key)
-
-        self.objToNode = {}
-        self.childrenOf = {}
-        self.roots = []
-
-        # now that we're ready to add DAG elements, we need to see
-        # what the highest remaining primary keys are in the node
-        # and edge tables.  We use the max() function to ensure that
-        # we start with 0 if getMax() returns None.
-
-        self.max_node_key = max(0, vocloadlib.getMax ('_Node_key', 'DAG_Node'))
-        self.max_edge_key = max(0, vocloadlib.getMax ('_Edge_key', 'DAG_Edge'))
+        if ids is None:
+            ids = self.session.getTermIDs()
 
-        # We need to keep track of which nodes we've added to DAG_Node
-        # so we'll use a dictionary to remember which keys we add:
+        rootKeys = {}       # object key -> 1, for parent-less nodes
+        edgesSeen = {}      # (parent object key, child object key) -> 1
 
-        nodesAdded = {}     # dict; node_key -> 1, if added
         lineNum = 0         # line number in data file
 
         for record in self.datafile:
@@ -386,8 +616,6 @@ class DAGLoad:
 
             if not parentID:
                 parent_key = None
-                if child_key not in self.roots:
-                    self.roots.append (child_key)
             elif parentID not in ids:
                 parent_key = None
                 errors.append ('Unknown parent ID %s' % parentID)
@@ -417,9 +645,8 @@ class DAGLoad:
             # now, if this (child) node has a parent, we need to verify that it isn't a duplicate record.  
             # To do this, we examine the list of children for the given parent key.
 
-            if parent_key and parent_key in self.childrenOf:
-                if child_key in self.childrenOf[parent_key]:
-                    errors.append ( 'Parent has duplicate child')
+            if parent_key and (parent_key, child_key) in edgesSeen:
+                errors.append ( 'Parent has duplicate child')
 
             # now if we've turned up any errors with this record,
             # we will report them in the log.  We will simply skip
@@ -433,119 +660,289 @@ class DAGLoad:
                 self.log.writeline ( vocloadlib.timestamp(msg))
                 continue    # to next line
 
-            # now, remember that this child node is a child of
-            # its parent, if it has one
+            # We now need to convert the _Object_keys for the child and parent to their indexes.  
+            # If either (or both) is new, it is numbered now.
 
+            child = self.getIndex (child_key)
             if parent_key:
-                if parent_key not in self.childrenOf:
-                    self.childrenOf[parent_key] = []
-                self.childrenOf[parent_key].append (child_key)
+                parent = self.getIndex (parent_key)
+            elif child_key not in rootKeys:
+                rootKeys[child_key] = 1
+                self.roots.append (child)
 
-            # We now need to convert the _Object_keys for the child and parent to be their corresponding node keys.  
-            # If either (or both) have no node key, then we must allocate a new one.
+            # the first line for a child gives the label of its node
+            if self.nodeLabels[child] is None:
+                self.nodeLabels[child] = node_label_key
 
-            if child_key not in self.objToNode:
-                self.max_node_key = self.max_node_key + 1
-                self.objToNode [child_key] = self.max_node_key
-
-            if parent_key and parent_key not in self.objToNode:
-                self.max_node_key = self.max_node_key + 1
-                self.objToNode [parent_key] = self.max_node_key
+            # finally, if this child has a parent then remember that this
+            # child node is a child of its parent, and the edge between them
+            if parent_key:
+                edgesSeen[(parent_key, child_key)] = 1
+                self.children[parent].append (child)
+                self.edges.append ( (parent, child, edge_label_key,
+                    len(self.children[parent])) )
 
-            # if we haven't already added a node record for this child, then we need to add one now
-            child_node_key = self.objToNode [child_key]
-            if child_node_key not in nodesAdded:
-                self.addNode (child_node_key, child_key, node_label_key)
-                nodesAdded[child_node_key] = 1
-                self.nodeLabel [child_node_key] = node_label_key
+        self.applyHeaderLabels (ids, labels)
+        return
 
-            # finally, if this child has a parent then we need to add the edge between them
-            if parent_key:
-                self.addEdge (self.objToNode[parent_key],
-                    child_node_key, edge_label_key,
-                    len(self.childrenOf[parent_key]))
+    def applyHeaderLabels (self,
+        ids,        # dict; see vocloadlib.getTermIDs()
+        labels      # dict; see vocloadlib.getLabels()
+        ):
+        # PRIVATE METHOD - used by self.readDAGFile()
+        #
+        # Purpose: give the nodes of the header terms the Header label
+        # Returns: nothing
+        # Assumes: the nodes of the DAG have been read
+        # Effects: updates self.nodeLabels; writes a line to the log
+        # Throws: nothing
+        # Notes: The node and closure rows are then written with the
+        #   Header label in the first place, rather than written and
+        #   updated afterward by bin/loadHeader.py.
+
+        if not self.headerIDs:
+            return
+        if HEADER_LABEL not in labels:
+            self.log.writeline (vocloadlib.timestamp ('No "%s" DAG label; header nodes left as they are' % HEADER_LABEL))
+            return
+
+        header_label_key = labels[HEADER_LABEL]
+        count = 0
+        for accID in self.headerIDs:
+            if accID not in ids:
+                continue
+            object_key = ids[accID][0]
+            if object_key in self.objIndex:
+                i = self.objIndex[object_key]
+                if self.nodeLabels[i] is not None:
+                    self.nodeLabels[i] = header_label_key
+                    count = count + 1
+
+        self.log.writeline (vocloadlib.timestamp ('Header nodes labeled: %d of %d header IDs' % \
+            (count, len(self.headerIDs))))
+        return
 
-        # and, after all the nodes and edges have been loaded, it's time to recompute the full transitive closure of the DAG and update the database accordingly.
+    def assignNodeKeys (self,
+        existing    # dict; object key -> node key, for nodes already in DAG_Node
+        ):
+        # PRIVATE METHOD - used by self.goFull() and self.goIncremental()
+        #
+        # Purpose: give each node its node key: its existing one, if it
+        #   has one, or a new one
+        # Returns: nothing
+        # Assumes: self.max_node_key is the highest node key in use
+        # Effects: fills self.nodeKeys; increments self.max_node_key
+        # Throws: nothing
 
-        self.updateClosure()
-        self.log.writeline (vocloadlib.timestamp ('Full DAG Load Stop:'))
+        for i in range(0, len(self.objKeys)):
+            if self.objKeys[i] in existing:
+                self.nodeKeys[i] = existing[self.objKeys[i]]
+            else:
+                self.max_node_key = self.max_node_key + 1
+                self.nodeKeys[i] = self.max_node_key
         return
 
     def getNodeKey (self,
         object_key  # integer; what object's node key do we want?
         ):
-        # PRIVATE METHOD - used for convenience in the
-        #   self.updateClosure() method.
+        # PRIVATE METHOD - used for convenience
         #
         # Purpose: find the node key which corresponds to the given 'object_key'
-        # Returns: integer, or None if object_key is None
-        # Assumes: self.objToNode.has_key (object_key)
+        # Returns: integer
+        # Assumes: self.objIndex.has_key (object_key)
         # Effects: nothing
         # Throws: nothing
 
-        return self.objToNode [object_key]
+        return self.nodeKeys [self.objIndex [object_key]]
 
-    def updateClosure (self):
-        # PRIVATE METHOD - used by self.goFull() and
-        #   self.goIncremental() methods
+    def getIndex (self,
+        object_key  # integer; object key of a node of this DAG
+        ):
+        # PRIVATE METHOD - used by self.readDAGFile() and self.goIncremental()
         #
-        # Purpose: recompute the transitive closure for this DAG and adjust the DAG_Closure table accordingly
-        # Returns: nothing
+        # Purpose: find the index of the node for 'object_key', numbering
+        #   it if it is new
+        # Returns: integer
         # Assumes: nothing
-        # Effects: alters DAG_Closure, currently by doing a delete-and-reload on the table for this particulary DAG
+        # Effects: may add a node to the index lists (its node key is set
+        #   later, by self.assignNodeKeys())
         # Throws: nothing
-        # Notes: This function uses the following interesting attributes of self:
-        #       self.roots: list of parent-less object keys
-        #       self.childrenOf: dict[parent object key] = [ child object keys ]
-        #   At some point in the future, we should revise this
-        #   a bit, as 'dag' is unnecessarily large because we're
-        #   using the node keys directly.  It would be better to
-        #   map the node keys onto 1..n when building 'dag', then
-        #   compute the closure, and map them back from 1..n to
-        #   the node keys.
+
+        if object_key not in self.objIndex:
+            self.objIndex [object_key] = len(self.objKeys)
+            self.objKeys.append (object_key)
+            self.nodeKeys.append (None)
+            self.nodeLabels.append (None)
+            self.children.append ([])
+        return self.objIndex [object_key]
+
+    def updateClosure (self):
+        # PRIVATE METHOD - used by self.computeFull()
+        #
+        # Purpose: recompute the transitive closure for this DAG, to reload DAG_Closure
+        # Returns: nothing
+        # Assumes: the existing closure has been deleted (see self.startFull())
+        # Effects: writes the closure bcp file, or (when streaming) sets self.closureRows
+        # Throws: dagClosure.DAGClosureError if the DAG has a cycle
+        # Notes: When streaming (see vocloadlib.bulkLoadMode()), the
+        #   closure is not computed here but as DAG_Closure is loaded,
+        #   so the DAG is first checked for a cycle.
 
         self.log.writeline (vocloadlib.timestamp ('Closure start:'))
 
-        # first, delete the existing closure for this DAG:
-        vocloadlib.nl_sqlog ('delete from DAG_Closure where _DAG_key=%d' % self.dag_key, self.log)
+        self.closureBackend = self.chooseClosureBackend ()
+        if self.closureBackend == 'database':
+            # computed once the edges are loaded (see self.loadBCPFiles())
+            dagClosure.checkAcyclic (self.children, self.objKeys)
+            self.log.writeline (vocloadlib.timestamp ('Closure will be computed in the database'))
+            self.log.writeline (vocloadlib.timestamp ('Closure stop:'))
+            return
+
+        self.loadClosureBCP=1
+        if self.bulkMode == 'file':
+            self.log.writeline (vocloadlib.timestamp ('Start Closure Computation: '))
+            start = time.time()
+            self.dagClosureBCPFile.writelines (self.closureLines())
+            self.closureSeconds = time.time() - start
+            self.log.writeline (vocloadlib.timestamp ('Stop Closure Computation: '))
+        else:
+            dagClosure.checkAcyclic (self.children, self.objKeys)
+            self.closureRows = self.closureLines()
+            self.log.writeline (vocloadlib.timestamp ('Closure will be computed as it is streamed'))
 
-        # build the dag as a list of lists where:
-        #   dag[0] = list of parent-less term keys
-        #   dag[n] = list of child terms of term n, for n>0
-        dag = [self.roots]
-        #self.log.writeline (vocloadlib.timestamp ('dag = [self.roots] %s' % dag))
-        dag = dag + [ [] ] * self.max_node_key
-        #self.log.writeline(vocloadlib.timestamp ('DAG before:'))
-        #self.log.writeline(vocloadlib.timestamp (dag))
-        #self.log.writeline(vocloadlib.timestamp (self.childrenOf.items() ))
-        #self.log.writeline(vocloadlib.timestamp ('ITERATE THRU childrenof.items()'))
-        for (object_key, children) in list(self.childrenOf.items()):
-            #self.log.writeline(vocloadlib.timestamp ('objectKey: %s, children %s' % (object_key, children)))
-            if object_key:
-                dag[object_key] = children
-        #self.log.writeline(vocloadlib.timestamp ('DAG after:'))
-        #self.log.writeline(vocloadlib.timestamp (dag))
-        # now actually compute the closure...
-
-        self.log.writeline (vocloadlib.timestamp ('Start Closure Computation: '))
-        closure = getClosure (dag, self.log)
-        self.log.writeline (vocloadlib.timestamp ('Stop Closure Computation: '))
-
-        # and add each ancestor-descendant edge to the database.
-        # we store both the _Node_key and the _Term_key for the Ancestor and Descendent in the DAG_Closure table
-        # so, we need to translate each _Term_key to its appropriate _Node_key
-        for (node, children) in list(closure.items()):
+        self.log.writeline (vocloadlib.timestamp ('Closure stop:'))
+        return
+
+    def closureLines (self):
+        # PRIVATE METHOD - used by self.updateClosure()
+        #
+        # Purpose: compute the transitive closure for this DAG
+        # Returns: generator of DAG_Closure bcp lines
+        # Assumes: the node keys have been assigned
+        # Effects: nothing
+        # Throws: dagClosure.DAGClosureError if the DAG has a cycle
+        # Notes: This function uses the following interesting attributes of self:
+        #       self.children: list[parent index] = [ children's indexes ]
+        #       self.objKeys, self.nodeKeys, self.nodeLabels: by index
+        #   The closure is computed by dagClosure, which hands back the
+        #   (ancestor, descendant) pairs one node at a time; each becomes
+        #   a line as it comes.
+
+        # we store both the _Node_key and the _Term_key for the Ancestor and Descendent in the DAG_Closure table,
+        # both of which we have by index
+
+        objKeys = self.objKeys
+        nodeKeys = self.nodeKeys
+        nodeLabels = self.nodeLabels
+
+        for (node, child) in dagClosure.indexedClosurePairs (self.children, objKeys):
             if DEBUG:
-                self.log.writeline(vocloadlib.timestamp ('Node: %s Children %s' % (node, children)))
-            if node > 0:
-               for child in children:
-                   # write the BCP file 
-                   self.loadClosureBCP=1
-                   self.dagClosureBCPFile.write (BCP_INSERT_CLOSURE % (self.dag_key, mgiType, self.getNodeKey(node), self.getNodeKey(child), node, child, self.nodeLabel[self.getNodeKey(node)], self.nodeLabel[self.getNodeKey(child)]) )
+                self.log.writeline(vocloadlib.timestamp ('Node: %s Child %s' % (objKeys[node], objKeys[child])))
+            # a term which only appears as a parent has no DAG_Node record
+            if nodeLabels[node] is None or nodeLabels[child] is None:
+                continue
+            self.closureCount = self.closureCount + 1
+            yield BCP_INSERT_CLOSURE % (self.dag_key, mgiType, nodeKeys[node], nodeKeys[child], objKeys[node], objKeys[child], nodeLabels[node], nodeLabels[child])
+        return
 
-        self.log.writeline (vocloadlib.timestamp ('Closure stop:'))
+    def chooseClosureBackend (self):
+        # PRIVATE METHOD - used by self.updateClosure()
+        #
+        # Purpose: decide where to compute the closure of this DAG
+        # Returns: str.; 'python', 'database' or 'compare'
+        # Assumes: the DAG has been read
+        # Effects: for 'auto', reads CLOSURE_CALIBRATION_FILE and writes
+        #   the decision to the log
+        # Throws: dagClosure.DAGClosureError if the DAG has a cycle (for
+        #   'auto' only)
+        # Notes: 'auto' estimates each backend's time as seconds per
+        #   closure row (measured by a 'compare' load, see
+        #   self.compareClosure()) times the number of closure rows,
+        #   which is counted without generating them.  With no
+        #   calibration, it keeps to python.
+
+        if self.closureBackend != 'auto':
+            return self.closureBackend
+
+        nodes = len(self.objKeys)
+        edges = len(self.edges)
+        calibration = readCalibration ()
+        if not calibration:
+            self.log.writeline ('Closure backend: python (%d nodes, %d edges; no calibration)' % (nodes, edges))
+            return 'python'
+
+        rows = dagClosure.closureSize (self.children)
+        estimates = {}
+        for backend in [ 'python', 'database' ]:
+            estimates[backend] = calibration[backend] * rows
+        if estimates['database'] < estimates['python']:
+            backend = 'database'
+        else:
+            backend = 'python'
+        self.log.writeline ('Closure backend: %s (%d nodes, %d edges, %d closure rows; estimated %.1f seconds in python, %.1f in the database)' % \
+            (backend, nodes, edges, rows, estimates['python'], estimates['database']))
+        return backend
+
+    def insertClosureFromEdges (self):
+        # PRIVATE METHOD - used by self.loadBCPFiles()
+        #
+        # Purpose: compute this DAG's closure in the database
+        # Returns: nothing
+        # Assumes: the nodes and edges of this DAG are loaded
+        # Effects: adds this DAG's rows to DAG_Closure
+        # Throws: propagates any exceptions from vocloadlib.nl_sqlog()
+
+        start = time.time()
+        vocloadlib.nl_sqlog (INSERT_CLOSURE_CTE % (self.dag_key, mgiType,
+            CLOSURE_CTE % (self.dag_key, self.dag_key)), self.log)
+        self.log.writeline (vocloadlib.timestamp ('Closure computed in the database in %.1f seconds' % \
+            (time.time() - start)))
+        return
+
+    def compareClosure (self,
+        pythonSeconds   # float; seconds taken to compute and load the python rows
+        ):
+        # PRIVATE METHOD - used by self.loadBCPFiles()
+        #
+        # Purpose: check the closure loaded from python against the one
+        #   the database computes, and time the database
+        # Returns: nothing
+        # Assumes: the nodes, edges and closure of this DAG are loaded
+        # Effects: queries the database (using a temp table); writes the
+        #   timings to CLOSURE_CALIBRATION_FILE; leaves the python rows
+        #   in DAG_Closure
+        # Throws: error if the two closures differ
+        # Notes: Both timings are end to end: 'pythonSeconds' covers
+        #   computing and loading the rows, and the database is timed
+        #   inserting its rows into DAG_Closure (as
+        #   self.insertClosureFromEdges() does), in place of the python
+        #   rows, inside a savepoint which is then rolled back.
+
+        db.sql (CREATE_CLOSURE_CHECK % self.dag_key, None)
+        db.sql ('savepoint closure_compare', None)
+        db.sql (DELETE_CLOSURE % self.dag_key, None)
+
+        start = time.time()
+        db.sql (INSERT_CLOSURE_CTE % (self.dag_key, mgiType,
+            CLOSURE_CTE % (self.dag_key, self.dag_key)), None)
+        dbSeconds = time.time() - start
+
+        loaded = CLOSURE_LOADED % self.dag_key
+        onlyPython = db.sql (CLOSURE_EXCEPT % (CLOSURE_CHECKED, loaded), 'auto')[0]['ct']
+        onlyDatabase = db.sql (CLOSURE_EXCEPT % (loaded, CLOSURE_CHECKED), 'auto')[0]['ct']
+
+        db.sql ('rollback to savepoint closure_compare', None)
+        db.sql ('release savepoint closure_compare', None)
+        db.sql ('drop table closure_check', None)
+
+        self.log.writeline ('Closure compared: %d rows; python %.1f seconds, database %.1f seconds' % \
+            (self.closureCount, pythonSeconds, dbSeconds))
+        if onlyPython or onlyDatabase:
+            raise error(closure_mismatch % (self.dag_key, onlyPython, onlyDatabase))
+
+        saveCalibration (self.closureCount, pythonSeconds, dbSeconds)
         return
-        
+
     def addNode (self,
         node_key,   # integer; primary key for this node
         object_key, # integer; object key assoc. with this node
@@ -593,13 +990,382 @@ class DAGLoad:
 
     def goIncremental (self):
         # PRIVATE METHOD - called only by self.go()
-        # For now, call goFull() since we are going to
-        # try always doing delete/inserts
-        self.goFull()
+        #
+        # Purpose: run an incremental load (compare the data file with
+        #   the DAG in the database and apply only the differences)
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: adds, deletes, and updates the changed rows of DAG_Node,
+        #   DAG_Edge, and DAG_Closure for this DAG
+        # Throws: dagClosure.DAGClosureError if the new DAG has a cycle
+        #   (found before the database is changed); propagates any
+        #   exceptions from vocloadlib.nl_sqlogBatch()
+        # Notes: Only the closure of the nodes at or above a changed edge
+        #   (or an added or deleted node) can change, so only their
+        #   descendants are compared, old vs. new.  Nodes keep their
+        #   node keys; deleting a node lets the database remove its
+        #   edges and closure rows.
+
+        self.log.writeline (vocloadlib.timestamp ('Incremental DAG Load Start:'))
+
+        self.readDAGFile ()
+
+        self.max_node_key = self.session.getMax ('_Node_key', 'DAG_Node')
+        self.max_edge_key = self.session.getMax ('_Edge_key', 'DAG_Edge')
+
+        # the DAG as it is now in the database.  Nodes which are no
+        # longer in the data file are numbered too (with no label).
+
+        existing = {}       # object key -> node key
+        nodeIndex = {}      # node key -> index
+        oldLabels = {}      # index -> label key
+        for row in db.sql (SELECT_NODES % self.dag_key, 'auto'):
+            i = self.getIndex (row['_Object_key'])
+            existing[row['_Object_key']] = row['_Node_key']
+            nodeIndex[row['_Node_key']] = i
+            oldLabels[i] = row['_Label_key']
+
+        oldEdges = {}       # (parent index, child index) -> (edge key, label key, sequenceNum)
+        for row in db.sql (SELECT_EDGES % self.dag_key, 'auto'):
+            oldEdges[(nodeIndex[row['_Parent_key']], nodeIndex[row['_Child_key']])] = \
+                (row['_Edge_key'], row['_Label_key'], row['sequenceNum'])
+
+        self.assignNodeKeys (existing)
+
+        count = len(self.objKeys)
+        objKeys = self.objKeys
+        nodeKeys = self.nodeKeys
+        nodeLabels = self.nodeLabels
+
+        # differences in the nodes
+
+        addedNodes = [ i for i in range(0, count) if nodeLabels[i] is not None and i not in oldLabels ]
+        deletedNodes = [ i for i in oldLabels if nodeLabels[i] is None ]
+        relabeledNodes = [ i for i in oldLabels if nodeLabels[i] is not None and nodeLabels[i] != oldLabels[i] ]
+
+        # differences in the edges
+
+        newEdges = {}       # (parent index, child index) -> (label key, sequenceNum)
+        for (parent, child, label_key, seqNum) in self.edges:
+            newEdges[(parent, child)] = (label_key, seqNum)
+
+        addedEdges = [ edge for edge in newEdges if edge not in oldEdges ]
+        removedEdges = [ edge for edge in oldEdges if edge not in newEdges ]
+        changedEdges = [ edge for edge in newEdges if edge in oldEdges and newEdges[edge] != oldEdges[edge][1:] ]
+
+        # the nodes whose closure may have changed: those at or above a
+        # changed edge or an added or deleted node, in either version
+
+        oldChildren = [ [] for i in range(0, count) ]
+        parents = [ [] for i in range(0, count) ]
+        for (parent, child) in oldEdges:
+            oldChildren[parent].append (child)
+            parents[child].append (parent)
+        for (parent, child) in addedEdges:
+            parents[child].append (parent)
+
+        affected = set()
+        stack = [ parent for (parent, child) in addedEdges + removedEdges ] + addedNodes + deletedNodes
+        while stack:
+            i = stack.pop()
+            if i not in affected:
+                affected.add (i)
+                stack.extend (parents[i])
+
+        # compare the old and new descendants of those nodes, counting
+        # only the nodes with a DAG_Node record in each version.  This
+        # is done before any change to the database, so a cycle stops
+        # the load with the database untouched.
+
+        oldSets = dagClosure.descendantSets (oldChildren, affected, objKeys)
+        newSets = dagClosure.descendantSets (self.children, affected, objKeys)
+
+        oldPresent = 0      # bitset of indexes of nodes in DAG_Node now
+        for i in oldLabels:
+            oldPresent = oldPresent | (1 << i)
+        newPresent = 0      # bitset of indexes of nodes in the data file
+        for i in range(0, count):
+            if nodeLabels[i] is not None:
+                newPresent = newPresent | (1 << i)
+
+        addedPairs = []     # (ancestor index, descendant index)
+        removedPairs = []
+        for i in affected:
+            if not newPresent & (1 << i):
+                continue    # deleted with its node, or never had one
+            newBits = newSets[i] & newPresent
+            oldBits = 0
+            if oldPresent & (1 << i):
+                oldBits = oldSets[i] & oldPresent
+            for j in dagClosure.bitIndexes (newBits & ~oldBits):
+                addedPairs.append ( (i, j) )
+            # pairs with a deleted descendant go with its node
+            for j in dagClosure.bitIndexes (oldBits & ~newBits & newPresent):
+                removedPairs.append ( (i, j) )
+
+        self.log.writeline (vocloadlib.timestamp ('Computed DAG differences:'))
+        self.log.writeline ('Nodes: %d added, %d deleted, %d relabeled' % \
+            (len(addedNodes), len(deletedNodes), len(relabeledNodes)))
+        self.log.writeline ('Edges: %d added, %d removed, %d changed' % \
+            (len(addedEdges), len(removedEdges), len(changedEdges)))
+        self.log.writeline ('Closure: %d added, %d removed (%d nodes affected)' % \
+            (len(addedPairs), len(removedPairs), len(affected)))
+
+        # deletions; edges and closure rows of deleted nodes go with them
+
+        vocloadlib.nl_sqlogBatch (DELETE_EDGES,
+            [ '%d' % oldEdges[edge][0] for edge in removedEdges
+                if newPresent & (1 << edge[0]) and newPresent & (1 << edge[1]) ],
+            self.log)
+        vocloadlib.nl_sqlogBatch (DELETE_CLOSURE_PAIRS % self.dag_key,
+            [ '(%d,%d)' % (nodeKeys[i], nodeKeys[j]) for (i, j) in removedPairs ],
+            self.log)
+        vocloadlib.nl_sqlogBatch (DELETE_NODES,
+            [ '%d' % nodeKeys[i] for i in deletedNodes ], self.log)
+
+        # updates
+
+        relabels = [ '(%d,%d)' % (nodeKeys[i], nodeLabels[i]) for i in relabeledNodes ]
+        vocloadlib.nl_sqlogBatch (UPDATE_NODE_LABELS, relabels, self.log)
+        vocloadlib.nl_sqlogBatch (UPDATE_ANCESTOR_LABELS % self.dag_key, relabels, self.log)
+        vocloadlib.nl_sqlogBatch (UPDATE_DESCENDENT_LABELS % self.dag_key, relabels, self.log)
+        vocloadlib.nl_sqlogBatch (UPDATE_EDGES,
+            [ '(%d,%d,%d)' % ((oldEdges[edge][0],) + newEdges[edge]) for edge in changedEdges ],
+            self.log)
+
+        # additions
+
+        vocloadlib.nl_sqlogBatch (INSERT_NODES,
+            [ '(%d,%d,%d,%d)' % (nodeKeys[i], self.dag_key, objKeys[i], nodeLabels[i])
+                for i in addedNodes ],
+            self.log)
+
+        rows = []
+        for (parent, child, label_key, seqNum) in self.edges:
+            if (parent, child) not in oldEdges:
+                self.max_edge_key = self.max_edge_key + 1
+                rows.append ('(%d,%d,%d,%d,%d,%d)' % (self.max_edge_key, self.dag_key,
+                    nodeKeys[parent], nodeKeys[child], label_key, seqNum))
+        vocloadlib.nl_sqlogBatch (INSERT_EDGES, rows, self.log)
+
+        self.saveMaxKeys ()
+
+        vocloadlib.nl_sqlogBatch (INSERT_CLOSURES,
+            [ '(%d,%s,%d,%d,%d,%d,%d,%d)' % (self.dag_key, mgiType,
+                nodeKeys[i], nodeKeys[j], objKeys[i], objKeys[j],
+                nodeLabels[i], nodeLabels[j]) for (i, j) in addedPairs ],
+            self.log)
+
+        self.log.writeline (vocloadlib.timestamp ('Incremental DAG Load Stop:'))
         return
 
+class LineLog:
+    # IS: a stand-in for a Log.Log, for a DAGLoad in a worker process
+    # HAS: the lines written to it
+    # DOES: keeps the lines, for the parent process to log
+
+    def __init__ (self):
+        # Purpose: constructor
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        self.lines = []
+        return
+
+    def writeline (self,
+        line    # str. line to log
+        ):
+        # Purpose: log 'line'
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: keeps 'line'
+        # Throws: nothing
+
+        self.lines.append (line)
+        return
+
+###--- Functions ---###
+
+def loadParallel (
+    dagloads,   # list of DAGLoad objects, all for one vocabulary, in full mode
+    log,        # Log.Log object; what to use for logging
+    processes   # integer; number of DAGs to compute at once
+    ):
+    # Purpose: run full loads of several DAGs, computing their nodes,
+    #   edges and closures in parallel
+    # Returns: nothing
+    # Assumes: the DAGs have distinct abbreviations (which name their
+    #   bcp and discrepancy files) and share one LoadSession; the worker
+    #   processes can be forked
+    # Effects: same as dagload.go() for each of 'dagloads'; writes one
+    #   discrepancy file per DAG (DAG_DISCREP_FILE + abbreviation)
+    # Throws: propagates any exception raised by a DAG's computation
+    #   (such as dagClosure.DAGClosureError), or by the database
+    # Notes: Only the computation runs in the worker processes; the
+    #   deletes, and the bcp loads afterwards, are done here, one DAG
+    #   at a time.  Each DAG is given a range of node and edge keys
+    #   before the workers start, so they need not share a counter.
+
+    abbrevs = [ dagload.abbrev for dagload in dagloads ]
+    if len(set(abbrevs)) < len(abbrevs):
+        log.writeline (vocloadlib.timestamp ('DAG abbreviations are not distinct; loading the DAGs one at a time'))
+        for dagload in dagloads:
+            dagload.go()
+        return
+
+    log.writeline (vocloadlib.timestamp ('Parallel DAG Load Start: %d DAGs, %d processes' % \
+        (len(dagloads), processes)))
+
+    for dagload in dagloads:
+        dagload.startFull ()
+
+    # reserve a range of keys for each DAG
+
+    session = dagloads[0].session
+    max_node_key = session.getMax ('_Node_key', 'DAG_Node')
+    max_edge_key = session.getMax ('_Edge_key', 'DAG_Edge')
+    for dagload in dagloads:
+        (nodes, edges) = dagload.countFile ()
+        dagload.max_node_key = max_node_key
+        dagload.max_edge_key = max_edge_key
+        max_node_key = max_node_key + nodes
+        max_edge_key = max_edge_key + edges
+
+        # the closure rows must be in a file to leave the worker
+        dagload.bulkMode = 'file'
+
+    session.setMax ('_Node_key', 'DAG_Node', max_node_key)
+    session.setMax ('_Edge_key', 'DAG_Edge', max_edge_key)
+
+    # the workers have no database connection, so they are given the
+    # term IDs and labels (the same for every DAG of the vocabulary)
+
+    ids = session.getTermIDs ()
+    labels = session.getLabels ()
+    PARALLEL_LOADS[:] = [ (dagload, ids, labels) for dagload in dagloads ]
+
+    executor = concurrent.futures.ProcessPoolExecutor (processes,
+        mp_context = multiprocessing.get_context ('fork'))
+    try:
+        futures = [ executor.submit (computeInWorker, i) for i in range(0, len(dagloads)) ]
+        for i in range(0, len(dagloads)):
+            dagload = dagloads[i]
+            (lines, dagload.loadNodeBCP, dagload.loadEdgeBCP,
+                dagload.loadClosureBCP, dagload.closureBackend,
+                dagload.closureCount, dagload.closureSeconds) = futures[i].result()
+            for line in lines:
+                log.writeline (line)
+    finally:
+        executor.shutdown (wait = True)
+        PARALLEL_LOADS[:] = []
+
+    # the workers wrote and closed the bcp files; close our copies and
+    # load them
+
+    for dagload in dagloads:
+        dagload.closeBCPFiles ()
+        dagload.loadBCPFiles ()
+        log.writeline ('=' * 40)
+
+    log.writeline (vocloadlib.timestamp ('Parallel DAG Load Stop:'))
+    return
+
+def readHeaderIDs (
+    filename    # str. path to a header file (one ID per line), or None
+    ):
+    # Purpose: get the IDs of the header terms of a vocabulary
+    # Returns: set of str.; empty if 'filename' is None or does not exist
+    # Assumes: nothing
+    # Effects: reads 'filename'
+    # Throws: IOError if 'filename' exists but cannot be read
+
+    headerIDs = set()
+    if not filename or not os.path.exists (filename):
+        return headerIDs
+    fp = open (filename, 'r')
+    for line in fp:
+        line = line.strip()
+        if line:
+            headerIDs.add (line)
+    fp.close()
+    return headerIDs
+
+def readCalibration ():
+    # Purpose: read the closure timings measured by the last 'compare' load
+    # Returns: dict; d[backend] = seconds per closure row, for 'python'
+    #   and 'database'; or None if there are no timings
+    # Assumes: nothing
+    # Effects: reads CLOSURE_CALIBRATION_FILE (from the environment)
+    # Throws: nothing; a missing or unreadable file counts as no timings
+
+    filename = os.environ.get ('CLOSURE_CALIBRATION_FILE')
+    if not filename or not os.path.exists (filename):
+        return None
+    try:
+        fp = open (filename, 'r')
+        try:
+            calibration = json.load (fp)
+        finally:
+            fp.close()
+        return { 'python' : float(calibration['python']),
+            'database' : float(calibration['database']) }
+    except (IOError, ValueError, KeyError, TypeError):
+        return None
+
+def saveCalibration (
+    rows,           # integer; number of closure rows timed
+    pythonSeconds,  # float; seconds to compute and load them in python
+    dbSeconds       # float; seconds for the database to compute and
+                    #   insert them
+    ):
+    # Purpose: record the closure timings of a 'compare' load, for
+    #   later 'auto' loads
+    # Returns: nothing
+    # Assumes: nothing
+    # Effects: writes CLOSURE_CALIBRATION_FILE (from the environment),
+    #   if it is set and 'rows' is not zero
+    # Throws: IOError if the file cannot be written
+
+    filename = os.environ.get ('CLOSURE_CALIBRATION_FILE')
+    if not filename or not rows:
+        return
+    calibration = { 'rows' : rows,
+        'python' : pythonSeconds / rows,
+        'database' : dbSeconds / rows }
+    fp = open (filename + '.tmp', 'w')
+    json.dump (calibration, fp)
+    fp.close()
+    os.replace (filename + '.tmp', filename)
+    return
+
 ###--- Private Functions ---###
 
+def computeInWorker (
+    i       # integer; index of the DAGLoad in PARALLEL_LOADS
+    ):
+    # PRIVATE FUNCTION - run by loadParallel() in a worker process
+    #
+    # Purpose: compute one DAG and write its bcp and discrepancy files
+    # Returns: tuple; (list of lines to log, loadNodeBCP, loadEdgeBCP,
+    #   loadClosureBCP, closureBackend, closureCount, closureSeconds)
+    # Assumes: PARALLEL_LOADS was filled before this process was forked
+    # Effects: writes the DAG's bcp and discrepancy files
+    # Throws: propagates any exception from DAGLoad.computeFull()
+
+    (dagload, ids, labels) = PARALLEL_LOADS[i]
+    dagload.log = LineLog()
+    dagload.log.writeline (vocloadlib.timestamp ('Full DAG Load Start: %s' % dagload.dag_name))
+    dagload.openDiscrepancyFile (dagload.abbrev)
+    dagload.computeFull (ids, labels)
+    dagload.closeDiscrepancyFile ()
+    dagload.closeBCPFiles ()
+    dagload.log.writeline (vocloadlib.timestamp ('Full DAG Load Stop: %s' % dagload.dag_name))
+    return (dagload.log.lines, dagload.loadNodeBCP, dagload.loadEdgeBCP,
+        dagload.loadClosureBCP, dagload.closureBackend, dagload.closureCount,
+        dagload.closureSeconds)
+
 def getClosure (
     dag, # the DAG, as a list of lists.
          #   list[0] = list of keys of parent-less nodes
@@ -608,11 +1374,12 @@ def getClosure (
     ):
     # Purpose: get the closure for the given 'dag'
     # Returns: dictionary where d[key i] = list of keys of all descendants of the node with key i
-    # Assumes: 'dag' has no cycles, otherwise results will be incorrect.
+    # Assumes: nothing
     # Effects: nothing
-    # Throws: nothing
-    # Notes: This closure computation is based on the one in WTS, which was derived by Joel.  
-    #   It is based on a recursive depth-first search of the DAG, caching intermediate results along the way.
+    # Throws: dagClosure.DAGClosureError if 'dag' has a cycle
+    # Notes: The closure is computed by dagClosure.getClosure(), without
+    #   recursion; DAGLoad itself uses dagClosure.closurePairs() so the
+    #   closure need not be held in memory.
     # Example:
     #   dag = [ [ 2 ],              2
     #       [ ],                   / \
@@ -627,45 +1394,13 @@ def getClosure (
     #         3 : [ ],
     #         4 : [ 3 ],
     #       }
+    #   (the descendants may be listed in a different order)
 
-    start = 0   # start with the list of parent-less nodes, so we will
-            # do the closure for each (thus arriving at the
-            # closure of the whole DAG)
-
-    closure = {}    # the closure of the DAG, as computed so far
-            #   closure[i] = list of keys of descendants of the node with key i
-
-    getNodeClosure (dag, start, closure)
-    #for a in closure.keys():
-    #   self.log.writeline(vocloadlib.timestamp('ancestor: %s descendants: %s' % (a, closure[a])))
-    return closure
-
-def getNodeClosure (
-    dag,        # the DAG, same format as for 'getClosure()' function
-    i,          # integer index into 'dag', telling us where to start
-                # computing the closure (at what node).  To do the full DAG, i=0 so we start with all root nodes.
-    closure     # dict as described in 'getClosure()' function; the closure as computed so far
-    ):
-    # Purpose: compute the closure of all nodes which are children of node 'i' and store it in 'closure'
-    # Returns: nothing
-    # Assumes: 'dag' has no cycles
-    # Effects: updates 'closure'
-    # Throws: nothing
-    # Notes: This function should only be invoked by the getClosure() function, and should not be invoked separately.
-
-    if i in closure:     # if we've already computed the
-        return          # closure of this node, bail out
-
-    # the closure of node 'i' will include all the children of 'i', plus
-    # the closure of each child of 'i' (recursively traversing the DAG)
-
-    closure[i] = dag[i][:]
-    for child in dag[i]:
-        getNodeClosure (dag, child, closure)
-        for descendant in closure[child]:
-            if not descendant in closure[i]:
-                closure[i].append (descendant)
-    return
+    childrenOf = {}
+    for i in range(0, len(dag)):
+        if dag[i]:
+            childrenOf[i] = dag[i]
+    return dagClosure.getClosure (childrenOf, [ 0 ])
 
 ###--- Main Program ---###
 
@@ -2,6 +2,16 @@
 #
 # Modification History:
 #
+# 10/17/2026:
+# CycleChecker finds the strongly connected components (Tarjan's algorithm,
+#   without recursion) instead of traversing all paths; it also finds cycles
+#   which cannot be reached from a root.
+# DAG.freeze() gives an array-based snapshot (FrozenDAG) for bulk algorithms,
+#   and ReachabilityIndex answers ancestor/descendant queries from one.
+# DAG.addEdge() keeps a topological order, to check new edges for cycles
+#   quickly; traverse() uses an explicit stack instead of recursion (the
+#   recursive version is kept as traverseRecursive(), for the self test).
+#
 # 11/18/2013 jak:
 # Added CycleChecker class and DAG.checkCycles() method.
 # Changed Traversal.go() method to so you can set parameter defaults in subclass
@@ -59,6 +69,8 @@
 #  - as the Traversals may cause infinite loops if there are cycles.
 
 import sys
+from array import array
+import dagClosure
 #from collections import OrderedDict
 
 #####################################################################
@@ -67,6 +79,15 @@ class DAG(object):
     def __init__(self):
         #self.nodes = OrderedDict()
         self.nodes = {}
+        # A topological order of the nodes (every parent before its
+        #  children), kept up to date as cycle-checked edges are added,
+        #  so a new edge is checked by searching only the nodes between
+        #  its ends in the order (Pearce & Kelly).  Edges added without
+        #  checks may break the order; it is then rebuilt the next time
+        #  it is needed.
+        self.order = {}		# node -> position in the order
+        self.nextPosition = 0	# position for the next new node
+        self.orderValid = True	# False if the order must be rebuilt
 
     #----------------------------------------------------------
     # STRUCTURING METHODS
@@ -83,13 +104,18 @@ class DAG(object):
         for c in self.iterChildren(n):
             self.__parents__(c).pop(n)
         self.nodes.pop(n)
+        self.order.pop(n, None)
         return self
 
     def addEdge(self, parent, child, edgeData=None, checkCycles=True):
         self.addNode(parent)
         self.addNode(child)
-        if checkCycles and (parent == child or self.isDescendant(parent, child)):
-            raise CycleError("Edge would create cycle.")
+        if checkCycles:
+            if parent == child:
+                raise CycleError("Edge would create cycle.")
+            self.__orderEdge__(parent, child)
+        elif self.orderValid and self.order[parent] >= self.order[child]:
+            self.orderValid = False
         self.__children__(parent)[child] = edgeData
         self.__parents__(child)[parent] = edgeData
         return self
@@ -103,10 +129,16 @@ class DAG(object):
         cln = DAG()
         for n, (parents, children) in self.nodes.items():
             cln.nodes[n] = (parents.copy(), children.copy())
+        cln.order = self.order.copy()
+        cln.nextPosition = self.nextPosition
+        cln.orderValid = self.orderValid
         return cln
 
     def clear(self):
         self.nodes = {}
+        self.order = {}
+        self.nextPosition = 0
+        self.orderValid = True
         return self
 
     #----------------------------------------------------------
@@ -135,14 +167,39 @@ class DAG(object):
         return self.isChild(m, n)
 
     def isDescendant(self, n, m):
-        for c in self.iterChildren(m):
-            if n == c or self.isDescendant(n, c):
+        # Search down from m, visiting each node once.  With a valid
+        #  order, nodes after n in it cannot lead to n, so are skipped.
+        limit = None
+        if self.orderValid and n in self.order:
+            limit = self.order[n]
+        visited = set()
+        stack = list(self.iterChildren(m))
+        while stack:
+            c = stack.pop()
+            if c == n:
                 return True
+            if c in visited or (limit is not None and self.order[c] >= limit):
+                continue
+            visited.add(c)
+            stack.extend(self.iterChildren(c))
         return False
 
     def isAncestor(self, n, m):
         return self.isDescendant(m, n)
 
+    def freeze(self):
+        '''
+        Return an immutable, array-based snapshot of the graph (see
+        FrozenDAG), for running graph algorithms over all of it.
+        '''
+        return FrozenDAG(self)
+
+    def reachabilityIndex(self):
+        '''
+        Return a ReachabilityIndex of the graph as it is now.
+        '''
+        return ReachabilityIndex(self.freeze())
+
     def checkCycles(self):
         '''
         Return list of nodes involved in cycles.
@@ -228,6 +285,102 @@ class DAG(object):
                 beforeTraverse=None, afterTraverse=None, 
                 beforeNode=None, afterNode=None, 
                 beforeEdge=None, afterEdge=None):
+        # The visit is done with an explicit stack instead of recursion
+        #  (so deep graphs cannot exceed the recursion limit); the
+        #  callbacks are made in the same order as by the recursive
+        #  traverseRecursive(), below.
+        visited = set()
+        # Path stack. A path:
+        #  - is an alternating sequence of nodes and edges
+        #  - begins with a startNode
+        #  - ends with the edge (or node) just prior to the current node
+        #    (or edge). That is:
+        # 	beforeNode() and afterNode() see a path whose last
+        #	item is the edge we crossed to get to the node.
+        #	beforeEdge() and afterEdge() see a path whose
+        #	last item is the node from which the edge is crossed.
+        # Note that:
+        #  - when processing a startNode, the path is empty
+        #  - the path item at position i is a node if i is even,
+        #	and an edge if i is odd.
+        #
+        path = [ ]
+        iterEdges = self.iterOutEdges
+        if reversed:
+            iterEdges = self.iterInEdges
+        edgeHooks = beforeEdge is not None or afterEdge is not None
+
+        # Frame stack: one frame per node being visited, [node, iterator
+        #  of its remaining edges, (p,c,d) of the edge being crossed].
+        frames = [ ]
+
+        def enter(n):
+            # start the visit to n; False if beforeNode() refuses it
+            if beforeNode is not None and beforeNode(self, n, path) == False:
+                return False
+            path.append(n)
+            visited.add(n)
+            frames.append([n, iterEdges(n), None])
+            return True
+
+        if beforeTraverse and beforeTraverse(self) == False:
+            return
+        if startNodes is None:
+            if reversed:
+                startNodes = self.iterLeaves()
+            else:
+                startNodes = self.iterRoots()
+        for r in startNodes:
+            if not self.hasNode(r) or r in visited:
+                continue
+            enter(r)
+            while frames:
+                frame = frames[-1]
+                n = frame[0]
+                descended = False
+                for (n2,d) in frame[1]:
+                    if edgeHooks:
+                        if reversed:
+                            p,c = n2,n
+                        else:
+                            p,c = n,n2
+                        if beforeEdge is not None and beforeEdge(self,p,c,d, path) == False:
+                            continue
+                    if allPaths or not n2 in visited:
+                        path.append( (n, n2, d) )
+                        if enter(n2):
+                            if edgeHooks:
+                                frame[2] = (p,c,d)
+                            descended = True
+                            break
+                        path.pop()
+                    if afterEdge is not None:
+                        afterEdge(self,p,c,d, path)
+                if descended:
+                    continue
+
+                # done with n: finish it, and the edge crossed to reach it
+                frames.pop()
+                path.pop()
+                if afterNode is not None:
+                    afterNode(self, n, path)
+                if frames:
+                    path.pop()
+                    if afterEdge is not None:
+                        (p,c,d) = frames[-1][2]
+                        afterEdge(self,p,c,d, path)
+        afterTraverse and afterTraverse(self)
+
+    def traverseRecursive(self, 
+                startNodes=None,
+                reversed=False,
+                allPaths=False,
+                beforeTraverse=None, afterTraverse=None, 
+                beforeNode=None, afterNode=None, 
+                beforeEdge=None, afterEdge=None):
+        # The original, recursive traverse(): kept as a reference for the
+        #  self test, which checks that traverse() makes the same callbacks
+        #  in the same order.
         visited = set()
         # Path stack. A path:
         #  - is an alternating sequence of nodes and edges
@@ -319,6 +472,80 @@ class DAG(object):
     def __addnode__(self, n):
         #self.nodes[n] = (OrderedDict(), OrderedDict())    # ({parents}, {children})
         self.nodes[n] = ({}, {})    # ({parents}, {children})
+        self.order[n] = self.nextPosition
+        self.nextPosition += 1
+
+    def __orderEdge__(self, parent, child):
+        # Check that the edge parent->child would not make a cycle, and
+        #  update the order for it (raises CycleError if it would).
+        if not self.orderValid and not self.__sortNodes__():
+            # the graph already has a cycle, so has no order
+            if self.isDescendant(parent, child):
+                raise CycleError("Edge would create cycle.")
+            return
+        order = self.order
+        lower = order[child]
+        upper = order[parent]
+        if upper < lower:		# already in order
+            return
+
+        # the nodes from child down, up to parent's position; finding
+        #  parent among them means a cycle
+        forward = []
+        visited = set([child])
+        stack = [child]
+        while stack:
+            n = stack.pop()
+            forward.append(n)
+            for c in self.iterChildren(n):
+                if c == parent:
+                    raise CycleError("Edge would create cycle.")
+                if c not in visited and order[c] < upper:
+                    visited.add(c)
+                    stack.append(c)
+
+        # the nodes from parent up, down to child's position
+        backward = []
+        visited = set([parent])
+        stack = [parent]
+        while stack:
+            n = stack.pop()
+            backward.append(n)
+            for p in self.iterParents(n):
+                if p not in visited and order[p] > lower:
+                    visited.add(p)
+                    stack.append(p)
+
+        # give the same positions to the same nodes, with the backward
+        #  ones (parent and its ancestors) first
+        backward.sort(key=order.get)
+        forward.sort(key=order.get)
+        moved = backward + forward
+        positions = sorted([ order[n] for n in moved ])
+        for i in range(len(moved)):
+            order[moved[i]] = positions[i]
+
+    def __sortNodes__(self):
+        # Rebuild the order from scratch (Kahn's algorithm).
+        # Return False (leaving the order invalid) if the graph has a cycle.
+        parentsLeft = {}
+        for n in self.iterNodes():
+            parentsLeft[n] = len(self.__parents__(n))
+        ready = [ n for n in parentsLeft if parentsLeft[n] == 0 ]
+        order = {}
+        while ready:
+            n = ready.pop()
+            order[n] = len(order)
+            for c in self.iterChildren(n):
+                parentsLeft[c] -= 1
+                if parentsLeft[c] == 0:
+                    ready.append(c)
+        if len(order) < len(parentsLeft):
+            return False
+        self.order = order
+        self.nextPosition = len(order)
+        self.orderValid = True
+        return True
 
     def __parents__(self, child):
         return self.nodes[child][0]
@@ -521,46 +748,388 @@ class DAGMapper(Traversal):
 
 #-------------------------------------------------------
 
-class CycleChecker(Traversal):
+class CycleChecker(object):
     '''
-    A Traversal whose go() & getResults() methods return a list of nodes
+    An object whose go() & getResults() methods return a list of nodes
      involved in cycles in the graph (empty list if no cycles)
-    '''
-    def __init__(self):
-        self.allPaths=True	# so we search all paths to each node
-        self.nodesOnPath = {}	# dict of nodes on the current traversal path
-                                #  nodesOnPath[node] = index of node in the
-                                #       current traversal path
-        self.cycleNodes = {}	# dict of nodes known to be involved in cycles
 
-    def beforeNode(self, dag, node, path):
-        if node in self.nodesOnPath:	# node on path already, cycle!
-            
-            # starting w/ earliest occurrance of this node on path,
-            #  add all nodes on the path to self.cycleNodes
-            # Remember in beforeNode(), path has even length, nodes are at even
-            #  indexes (edges at odd)
-            for i in range( self.nodesOnPath[node], len(path), 2):
-                self.cycleNodes[ path[i] ] = 1
+    The nodes involved in cycles are those of the strongly connected
+     components with more than one node (plus any node with an edge to
+     itself).  The components are found by Tarjan's algorithm, with an
+     explicit stack instead of recursion, so the check is linear in the
+     size of the graph - unlike a traversal of all paths, which is
+     exponential in the number of nodes with several parents.
+    '''
+    startNodes = None
 
-            return False	# important, otherwise traversal will
-                                #  visit node again and infinite loop
+    def __init__(self):
+        self.cycleNodes = []	# nodes known to be involved in cycles
 
-        self.nodesOnPath[node] = len(path)  # Traversal will appended to path
+    def go(self, dag, startNodes=None):
+        '''
+        Find the nodes involved in cycles; if startNodes is given, only
+         among the nodes reachable from them (default: the whole graph)
+        '''
+        if startNodes != None:
+            self.startNodes = startNodes
+        starts = self.startNodes
+        if starts is None:
+            starts = dag.iterNodes()
+
+        index = {}	# node -> order in which the search reached it
+        low = {}	# node -> lowest index reachable from its subtree
+        onStack = set()	# nodes of components not yet complete
+        stack = []	# ... in the order they were reached
+        self.cycleNodes = []
+
+        for start in starts:
+            if start in index or not dag.hasNode(start):
+                continue
+            index[start] = low[start] = len(index)
+            stack.append(start)
+            onStack.add(start)
+            work = [ (start, dag.iterChildren(start)) ]	# the search path
+
+            while work:
+                (n, children) = work[-1]
+                for c in children:
+                    if c not in index:	# descend to c; resume n later
+                        index[c] = low[c] = len(index)
+                        stack.append(c)
+                        onStack.add(c)
+                        work.append( (c, dag.iterChildren(c)) )
+                        break
+                    elif c in onStack and index[c] < low[n]:
+                        low[n] = index[c]
+                else:
+                    # done with n's children
+                    work.pop()
+                    if work and low[n] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[n]
+                    if low[n] == index[n]:
+                        # n is the first node reached of a component
+                        component = []
+                        while True:
+                            m = stack.pop()
+                            onStack.discard(m)
+                            component.append(m)
+                            if m == n:
+                                break
+                        if len(component) > 1 or dag.hasEdge(n, n):
+                            self.cycleNodes.extend(component)
 
-    def afterNode(self, dag, node, path):
-        self.nodesOnPath.pop(node)
+        return self.getResults()
 
     def getResults(self):
         '''
         Return the list of nodes involved in cycles (empty list if no cycles)
         '''
-        return list(self.cycleNodes.keys())
+        return list(self.cycleNodes)
 
 # end class CycleChecker --------------------------------
     
 #####################################################################
 
+class FrozenDAG(object):
+    '''
+    An immutable snapshot of a DAG in compressed sparse row form.
+
+    The nodes are numbered 0..n-1 (in the DAG's node order).  The
+    children of node i are children[childOffsets[i]:childOffsets[i+1]],
+    with the edge data of each in childLabels (as an index into labels);
+    parents, parentOffsets and parentLabels are the same going up.  Each
+    node's parents and children are in the same order as in the DAG.
+
+    Methods taking or returning nodes use their numbers; getNode() and
+    getIndex() convert.  The snapshot does not change with the DAG.
+    '''
+    def __init__(self, dag):
+        self.nodeList = list(dag.iterNodes())	# number -> node
+        self.index = {}				# node -> number
+        for i, n in enumerate(self.nodeList):
+            self.index[n] = i
+        self.labels = []			# distinct edge data values
+        labelIndex = {}				# edge data -> index in labels
+
+        def label(d):
+            try:
+                if d not in labelIndex:
+                    labelIndex[d] = len(self.labels)
+                    self.labels.append(d)
+                return labelIndex[d]
+            except TypeError:			# unhashable edge data
+                self.labels.append(d)
+                return len(self.labels) - 1
+
+        self.childOffsets = array('i', [0])
+        self.children = array('i')
+        self.childLabels = array('i')
+        self.parentOffsets = array('i', [0])
+        self.parents = array('i')
+        self.parentLabels = array('i')
+        index = self.index
+        for n in self.nodeList:
+            for (c, d) in dag.iterOutEdges(n):
+                self.children.append(index[c])
+                self.childLabels.append(label(d))
+            self.childOffsets.append(len(self.children))
+            for (p, d) in dag.iterInEdges(n):
+                self.parents.append(index[p])
+                self.parentLabels.append(label(d))
+            self.parentOffsets.append(len(self.parents))
+
+    #----------------------------------------------------------
+    # INQUIRY METHODS
+    #----------------------------------------------------------
+
+    def nodeCount(self):
+        return len(self.nodeList)
+
+    def edgeCount(self):
+        return len(self.children)
+
+    def getNode(self, i):
+        return self.nodeList[i]
+
+    def getIndex(self, n):
+        return self.index[n]
+
+    def getChildren(self, i):
+        return self.children[self.childOffsets[i]:self.childOffsets[i+1]]
+
+    def getParents(self, i):
+        return self.parents[self.parentOffsets[i]:self.parentOffsets[i+1]]
+
+    def iterOutEdges(self, i):
+        # (child node, edge data) for each child of node i, as
+        #  DAG.iterOutEdges() gives them for the node itself
+        for k in range(self.childOffsets[i], self.childOffsets[i+1]):
+            yield self.nodeList[self.children[k]], self.labels[self.childLabels[k]]
+
+    def iterInEdges(self, i):
+        # (parent node, edge data) for each parent of node i
+        for k in range(self.parentOffsets[i], self.parentOffsets[i+1]):
+            yield self.nodeList[self.parents[k]], self.labels[self.parentLabels[k]]
+
+    def isRoot(self, i):
+        return self.parentOffsets[i] == self.parentOffsets[i+1]
+
+    def isLeaf(self, i):
+        return self.childOffsets[i] == self.childOffsets[i+1]
+
+    def getRoots(self):
+        offsets = self.parentOffsets
+        return [ i for i in range(len(self.nodeList)) if offsets[i] == offsets[i+1] ]
+
+    def getLeaves(self):
+        offsets = self.childOffsets
+        return [ i for i in range(len(self.nodeList)) if offsets[i] == offsets[i+1] ]
+
+    #----------------------------------------------------------
+    # ALGORITHMS
+    #----------------------------------------------------------
+
+    def childLists(self):
+        # children of each node, as dagClosure wants them
+        return [ self.getChildren(i) for i in range(len(self.nodeList)) ]
+
+    def topologicalOrder(self):
+        '''
+        Return an array of the node numbers, every parent before its
+        children.  Raises CycleError if the graph has a cycle.
+        '''
+        offsets = self.parentOffsets
+        parentsLeft = array('i', [ offsets[i+1] - offsets[i]
+            for i in range(len(self.nodeList)) ])
+        ready = [ i for i in range(len(self.nodeList)) if parentsLeft[i] == 0 ]
+        order = array('i')
+        while ready:
+            i = ready.pop()
+            order.append(i)
+            for c in self.getChildren(i):
+                parentsLeft[c] -= 1
+                if parentsLeft[c] == 0:
+                    ready.append(c)
+        if len(order) < len(self.nodeList):
+            raise CycleError("Graph has a cycle.")
+        return order
+
+    def closurePairs(self):
+        '''
+        Generate the (ancestor, descendant) number pairs of the
+        transitive closure (see dagClosure.indexedClosurePairs(), which
+        raises dagClosure.DAGClosureError if the graph has a cycle).
+        '''
+        return dagClosure.indexedClosurePairs(self.childLists(), self.nodeList)
+
+    def getClosure(self):
+        '''
+        Return a dict mapping each node to the set of its descendants
+        (nodes, not numbers; a node is not its own descendant).  Raises
+        CycleError if the graph has a cycle.
+        '''
+        # children before parents, so each node's set is the union of
+        #  its children and their sets
+        nodes = self.nodeList
+        closure = {}
+        order = self.topologicalOrder()
+        for k in range(len(order) - 1, -1, -1):
+            i = order[k]
+            descendants = set()
+            for c in self.getChildren(i):
+                child = nodes[c]
+                descendants.add(child)
+                descendants |= closure[child]
+            closure[nodes[i]] = descendants
+        return closure
+
+    def reachable(self, starts, reversed=False):
+        '''
+        Return the set of numbers of the nodes below (or, if reversed,
+        above) the given node numbers.  A start node is included only
+        if it can be reached from another.
+        '''
+        if reversed:
+            offsets, targets = self.parentOffsets, self.parents
+        else:
+            offsets, targets = self.childOffsets, self.children
+        reached = set()
+        stack = list(starts)
+        while stack:
+            i = stack.pop()
+            for k in range(offsets[i], offsets[i+1]):
+                j = targets[k]
+                if j not in reached:
+                    reached.add(j)
+                    stack.append(j)
+        return reached
+
+#####################################################################
+
+class ReachabilityIndex(object):
+    '''
+    Answers isDescendant()/isAncestor() in constant time, and lists a
+    node's descendants or ancestors without walking the graph, for a
+    snapshot (FrozenDAG) of a DAG.  Build it once and query it often;
+    it does not change with the DAG.
+
+    The nodes are renumbered in postorder of a depth first walk from the
+    roots, so each node's descendants in the walk's spanning tree are
+    the numbers just below its own (an interval), and most of its other
+    descendants are close by.  Each node keeps its descendants as a
+    bitset (a bytes object, so a bit can be tested without copying)
+    covering only the numbers from its lowest descendant to its own.
+    The ancestors are listed from these when first asked for.
+
+    Raises CycleError if the graph has a cycle.
+    '''
+    def __init__(self, frozen):
+        self.frozen = frozen
+        count = frozen.nodeCount()
+
+        # postorder numbering, without recursion
+        self.number = array('i', [-1]) * count	# frozen index -> number
+        self.byNumber = array('i', [0]) * count	# number -> frozen index
+        numbered = 0
+        for start in frozen.getRoots() + list(range(count)):
+            if self.number[start] != -1:
+                continue
+            self.number[start] = -2		# on the stack
+            stack = [ (start, iter(frozen.getChildren(start))) ]
+            while stack:
+                (i, children) = stack[-1]
+                for c in children:
+                    if self.number[c] == -1:
+                        self.number[c] = -2
+                        stack.append((c, iter(frozen.getChildren(c))))
+                        break
+                else:
+                    stack.pop()
+                    self.number[i] = numbered
+                    self.byNumber[numbered] = i
+                    numbered += 1
+
+        children = [ [ self.number[c] for c in frozen.getChildren(self.byNumber[k]) ]
+            for k in range(count) ]
+        names = [ frozen.getNode(self.byNumber[k]) for k in range(count) ]
+
+        self.low = array('i', [0]) * count	# number -> lowest descendant
+        self.bits = [ b'' ] * count		# number -> bytes; bit j is
+                                        #  descendant low + j
+        try:
+            for (k, bits) in dagClosure.descendantBits(children, names):
+                if bits:
+                    low = (bits & -bits).bit_length() - 1
+                    bits >>= low
+                    self.low[k] = low
+                    self.bits[k] = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        except dagClosure.DAGClosureError as e:
+            raise CycleError(str(e))
+
+        self.ancestorOffsets = None		# see __ancestors__()
+        self.ancestors = None
+
+    def __has__(self, k, j):
+        # True if number j is a descendant of number k
+        j -= self.low[k]
+        bits = self.bits[k]
+        return 0 <= j < 8 * len(bits) and (bits[j >> 3] >> (j & 7)) & 1 == 1
+
+    def __ancestors__(self):
+        # Build the ancestor lists (by number, in compressed sparse row
+        #  form) from the descendant bitsets, the first time needed.
+        if self.ancestors is not None:
+            return
+        count = len(self.bits)
+        lists = [ [] for k in range(count) ]
+        for k in range(count):
+            if self.bits[k]:
+                low = self.low[k]
+                for j in dagClosure.bitIndexes(int.from_bytes(self.bits[k], 'little')):
+                    lists[low + j].append(k)
+        self.ancestorOffsets = array('i', [0])
+        self.ancestors = array('i')
+        for k in range(count):
+            self.ancestors.extend(lists[k])
+            self.ancestorOffsets.append(len(self.ancestors))
+
+    def __node__(self, k):
+        return self.frozen.getNode(self.byNumber[k])
+
+    def __number__(self, n):
+        return self.number[self.frozen.getIndex(n)]
+
+    def isDescendant(self, n, m):
+        '''
+        True if n is a descendant of m (as DAG.isDescendant()).
+        '''
+        return self.__has__(self.__number__(m), self.__number__(n))
+
+    def isAncestor(self, n, m):
+        return self.isDescendant(m, n)
+
+    def getDescendants(self, n):
+        '''
+        Return a list of the descendants of n (not including n).
+        '''
+        k = self.__number__(n)
+        if not self.bits[k]:
+            return []
+        low = self.low[k]
+        return [ self.__node__(low + j) for j in
+            dagClosure.bitIndexes(int.from_bytes(self.bits[k], 'little')) ]
+
+    def getAncestors(self, n):
+        '''
+        Return a list of the ancestors of n (not including n).
+        '''
+        self.__ancestors__()
+        k = self.__number__(n)
+        return [ self.__node__(a) for a in
+            self.ancestors[self.ancestorOffsets[k]:self.ancestorOffsets[k+1]] ]
+
+#####################################################################
+
 class CycleError(Exception):
     pass
 
@@ -677,3 +1246,85 @@ if __name__ == "__main__":
     cycleNodes = d2.checkCycles()
     print("List of nodes involved in cycles:")
     print(cycleNodes)
+
+    print()
+    print("CycleChecker on a cycle with no root, a self loop, and a long chain:")
+    d3 = DAG()
+    d3.addEdge('p', 'q').addEdge('q', 'r').addEdge('r', 'p', checkCycles=False)
+    d3.addEdge('s', 's', checkCycles=False)
+    for i in range(10000):
+        d3.addEdge(i, i + 1, checkCycles=False)
+    print(sorted(d3.checkCycles(), key=str))
+
+    print()
+    print("Cycle-checked edges (x->a should be refused):")
+    d4 = DAG()
+    d4.addEdge('b', 'x').addEdge('a', 'b').addEdge('c', 'x').addEdge('a', 'c')
+    try:
+        d4.addEdge('x', 'a')
+        print("not refused!")
+    except CycleError:
+        print("refused")
+
+    print()
+    print("traverse() makes the same callbacks as traverseRecursive():")
+    def callbacks(method, **options):
+        # the callbacks made, with a copy of the path each saw
+        made = []
+        def node(name):
+            def hook(dag, n, path):
+                made.append( (name, n, tuple(path)) )
+                return options.get('refuseNode') != n
+            return hook
+        def edge(name):
+            def hook(dag, p, c, d, path):
+                made.append( (name, p, c, d, tuple(path)) )
+                return options.get('refuseEdge') != (p, c)
+            return hook
+        method(startNodes=options.get('startNodes'),
+            reversed=options.get('reversed', False),
+            allPaths=options.get('allPaths', False),
+            beforeNode=node('beforeNode'), afterNode=node('afterNode'),
+            beforeEdge=edge('beforeEdge'), afterEdge=edge('afterEdge'))
+        return made
+    examples = [ {}, { 'reversed' : True }, { 'allPaths' : True },
+        { 'allPaths' : True, 'reversed' : True }, { 'startNodes' : ['c','b'] },
+        { 'refuseNode' : 'c' }, { 'refuseEdge' : ('b','d') },
+        { 'refuseNode' : 'd', 'allPaths' : True } ]
+    d5 = DAG()		# the first example again, with a longer path to y
+    d5.addEdge('a','b').addEdge('a','c').addEdge('b','d').addEdge('c','d')
+    d5.addEdge('b','x', 99).addEdge('c','y').addEdge('d','y')
+    for g in [ d, d4, d5 ]:
+        for options in examples:
+            assert callbacks(g.traverse, **options) == \
+                callbacks(g.traverseRecursive, **options), options
+    for t in [ Closure(), RedundantEdgeFinder(), SubgraphExtracter() ]:
+        t.go(d4, startNodes=['a'])
+    chain = DAG()
+    for i in range(100000):
+        chain.addEdge(i, i + 1, checkCycles=False)
+    seen = []
+    chain.traverse(beforeNode=lambda dag, n, path: seen.append(n))
+    print("same; nodes visited on a 100001 node chain:", len(seen))
+
+    print()
+    print("FrozenDAG of the first example:")
+    f = d5.freeze()
+    print([ f.getNode(i) for i in f.getRoots() ], [ f.getNode(i) for i in f.getLeaves() ])
+    print([ f.getNode(i) for i in f.topologicalOrder() ])
+    closure = f.getClosure()
+    for n in f.nodeList:
+        assert closure[n] == Closure().go(d5)[n] - set([n]), n
+        assert list(f.iterInEdges(f.getIndex(n))) == d5.getInEdges(n), n
+        assert list(f.iterOutEdges(f.getIndex(n))) == d5.getOutEdges(n), n
+    print(sorted([ f.getNode(i) for i in f.reachable([f.getIndex('d')], reversed=True) ]))
+
+    print()
+    print("ReachabilityIndex of the first example:")
+    r = d5.reachabilityIndex()
+    for n in d5.iterNodes():
+        assert set(r.getDescendants(n)) == closure[n], n
+        for m in d5.iterNodes():
+            assert r.isDescendant(n, m) == d5.isDescendant(n, m), (n, m)
+            assert r.isAncestor(n, m) == d5.isAncestor(n, m), (n, m)
+    print(sorted(r.getAncestors('d')), sorted(r.getDescendants('b')))
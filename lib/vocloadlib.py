@@ -19,10 +19,18 @@ import time
 import types
 import re
 import os
+import json
+import concurrent.futures
 
 import dbTable  # dbTable library
 import db
 
+try:
+    import psycopg2     # needed to stream rows (BULK_LOAD_MODE), and to
+                        # bcp several tables at once (BulkLoader)
+except ImportError:
+    psycopg2 = None
+
 ###--- Exceptions ---###
 
 class VocloadlibError(Exception):
@@ -35,9 +43,14 @@ unknown_dag_key = 'unknown DAG key "%s"'
 unknown_vocab = 'unknown vocabulary name "%s"'
 unknown_vocab_key = 'unknown vocabulary key "%s"'
 unknown_synonymtype = 'unknown synonym type "%s"'
+unknown_notetype = 'unknown note type "%s"'
 
 bad_line = '%s:Incorrect Line Format for Line Number %d\n%s'
 
+unknown_bulk_mode = 'unknown BULK_LOAD_MODE "%s"; expected one of %s'
+no_psycopg2 = 'BULK_LOAD_MODE "%s" needs the psycopg2 module'
+delete_mismatch = 'fast delete does not match the VOC_Term_Delete trigger for vocab %d in %s'
+
 ###--- Globals ---###
 
 VOCABULARY_TERM_TYPE = 13   # default _MGIType_key for vocab terms
@@ -48,15 +61,872 @@ TERM_IDS = None         # dictionary mapping term ID to term key,
                 #   set by TermLoad when running in
                 #   no-load mode
 
-# maps synonymtype to synonymtype_key
+SQL_SERVER = None       # database login, as given to setupSql()
+SQL_DATABASE = None
+SQL_USER = None
+SQL_PASSWORD = None
+
+PENDING_FILES = []      # list of (pending name, final name) for files
+                        # which describe the load, and which commit() puts
+                        # in place once its transaction has committed
+
+# reference data; see loadReferenceData()
+
+REFDATA_SOURCE = None   # where the reference data came from:
+                        #   None (not loaded yet), 'database' or 'snapshot'
+
+# maps _MGIType_key to a dictionary of synonymtype to synonymtype_key
 SYNONYM_TYPE_MAP = {} 
 
-# maps notetype to notetype_key
+# maps _MGIType_key to a dictionary of notetype to notetype_key
 NOTE_TYPE_MAP = {} 
 
+# maps ACC_LogicalDB.name to _LogicalDB_key
+LOGICALDB_MAP = {}
+
+# maps DAG_Label.label to _Label_key
+LABEL_MAP = {}
+
+# maps VOC_Vocab.name to _Vocab_key
+VOCAB_KEY_MAP = {}
+
+SQL_BATCH_SIZE = 500        # maximum rows sent in one multi-row statement
+
+# maps a table to the sequence and key field used by KeyAllocator
+KEY_SEQUENCES = {
+    'VOC_Term' : ('voc_term_seq', '_Term_key'),
+    'MGI_Note' : ('mgi_note_seq', '_Note_key'),
+    'MGI_Synonym' : ('mgi_synonym_seq', '_Synonym_key'),
+    'ACC_Accession' : ('acc_accession_seq', '_Accession_key'),
+    }
+
+KEY_BLOCK_SIZE = 1000       # default number of keys reserved at a time
+
+ARRAY_BATCH_SIZE = 5000     # maximum keys sent in one "= any(array[...])"
+
+BCP_MAX_WORKERS = 3         # default number of tables bcp'd at once
+                            # (each on a connection of its own)
+
+# how BulkLoader loads the tables given rows rather than a finished file:
+#   'file' - write the rows to the bcp file, then bcp it
+#   'stream' - stream the rows straight into COPY, with no file
+#   'tee' - stream the rows into COPY, and write the bcp file as they go
+BULK_LOAD_MODES = [ 'file', 'stream', 'tee' ]
+BULK_LOAD_MODE = 'file'     # default; BULK_LOAD_MODE in the environment
+
+COPY_BUFFER_SIZE = 1048576  # bytes of rows handed to COPY at a time
+
+COPY_FROM = '''copy %s from stdin with (format text, delimiter '%s', null '')'''
+
+# the set-based deletes run before the terms of a vocabulary are deleted
+# when FAST_DELETE is set; see deleteVocabTerms().  each is (table to
+# delete from, other tables joined, condition), where the condition takes
+# the _MGIType_key for terms and the _Vocab_key.
+FAST_DELETES = [
+    ('MGI_Note m', 'VOC_Term t',
+        '''m._Object_key = t._Term_key
+        and m._MGIType_key = %d
+        and t._Vocab_key = %d'''),
+    ('MGI_Synonym m', 'VOC_Term t',
+        '''m._Object_key = t._Term_key
+        and m._MGIType_key = %d
+        and t._Vocab_key = %d'''),
+    ('MGI_SetMember msm', 'MGI_Set ms, VOC_Term t',
+        '''msm._Object_key = t._Term_key
+        and msm._Set_key = ms._Set_key
+        and ms._MGIType_key = %d
+        and t._Vocab_key = %d'''),
+    ('DAG_Node dnode', 'DAG_DAG ddag, VOC_Term t',
+        '''dnode._Object_key = t._Term_key
+        and dnode._DAG_key = ddag._DAG_key
+        and ddag._MGIType_key = %d
+        and t._Vocab_key = %d'''),
+    ('ACC_Accession a', 'VOC_Term t',
+        '''a._Object_key = t._Term_key
+        and a._MGIType_key = %d
+        and t._Vocab_key = %d'''),
+    ]
+
+# compareVocabTermDeletes() saves the keys of the terms it deletes (and
+# rolls back), so the rows which belonged to them can be counted after
+SAVE_DELETED_TERMS = '''create temp table tmp_vocload_deleted as
+    select _Term_key, _Vocab_key from VOC_Term where _Vocab_key = %d'''
+
+# fields of tab-delimited input files whose values repeat from line to line,
+# and so are interned by TabFileReader
+INTERNED_FIELDS = [ 'status', 'synonymTypes', 'node_label', 'edge_label' ]
+
+
+###--- Classes ---###
+
+class KeyAllocator:
+    # IS: the source of primary keys for the tables in KEY_SEQUENCES
+    #   during a load
+    # HAS: for each table, the block of keys reserved from its sequence
+    #   and the next key to hand out
+    # DOES: reserves contiguous blocks of keys from each table's sequence
+    #   (one statement per block), hands the keys out from memory, and
+    #   at the end of the load gives back the unused part of the last
+    #   block if no one else has taken keys from the sequence since
+    # Notes: Reserving a block advances the sequence past the whole
+    #   block, so two loads (or a load and the EI) running at the same
+    #   time never get the same key.  Blocks come from the sequence
+    #   alone; before its first block for a table, the allocator moves
+    #   the sequence past the table's maximum key if it has fallen
+    #   behind (rows added without using it), once per run.
+
+    def __init__ (self):
+        # Purpose: constructor
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        self.nextKey = {}       # table -> next key to hand out
+        self.lastKey = {}       # table -> last key in the current block
+        self.blockSize = {}     # table -> size of the next block to reserve
+        self.repaired = {}      # table -> 1 once its sequence is checked
+        return
+
+    def repair (self,
+        table       # str. table name; a key of KEY_SEQUENCES
+        ):
+        # Purpose: make sure the sequence for 'table' is past the table's
+        #   maximum key
+        # Returns: nothing
+        # Assumes: setupSql() has been called appropriately
+        # Effects: may advance the sequence for 'table' (unless in a
+        #   no-load state); queries max() of the key field, so is done
+        #   only once per table (see reserve())
+        # Throws: propagates any exceptions raised by db.sql()
+
+        seq, keyField = KEY_SEQUENCES[table]
+        self.repaired[table] = 1
+
+        if NO_LOAD:
+            return
+
+        db.sql ('''select setval('%s', m.maxKey) from %s,
+                (select max(%s) as maxKey from %s) m
+                where m.maxKey > last_value''' % \
+            (seq, seq, keyField, table), None)
+        return
+
+    def reserve (self,
+        table,      # str. table name; a key of KEY_SEQUENCES
+        count       # integer; number of keys expected to be needed
+        ):
+        # Purpose: reserve a block of 'count' keys for 'table'; later
+        #   blocks (if these run out) are the same size
+        # Returns: nothing
+        # Assumes: setupSql() has been called appropriately
+        # Effects: advances the sequence for 'table' (unless in a no-load
+        #   state); discards any keys left in the current block; the
+        #   first time for 'table', see repair()
+        # Throws: propagates any exceptions raised by db.sql()
+
+        seq, keyField = KEY_SEQUENCES[table]
+        count = max(1, count)
+        self.blockSize[table] = count
+
+        if table not in self.repaired:
+            self.repair (table)
+
+        if NO_LOAD:
+            result = db.sql ('''select last_value + %d as lastKey from %s''' % \
+                (count, seq))
+        else:
+            result = db.sql ('''select setval('%s', nextval('%s') + %d - 1) as lastKey''' % \
+                (seq, seq, count))
+
+        self.lastKey[table] = result[0]['lastKey']
+        self.nextKey[table] = self.lastKey[table] - count + 1
+        return
+
+    def next (self,
+        table       # str. table name; a key of KEY_SEQUENCES
+        ):
+        # Purpose: hand out the next key for 'table'
+        # Returns: integer
+        # Assumes: nothing
+        # Effects: reserves another block if the current one is used up
+        #   (or none was reserved yet)
+        # Throws: propagates any exceptions raised by reserve()
+
+        if table not in self.nextKey or self.nextKey[table] > self.lastKey[table]:
+            self.reserve (table, self.blockSize.get (table, KEY_BLOCK_SIZE))
+
+        key = self.nextKey[table]
+        self.nextKey[table] = key + 1
+        return key
+
+    def finish (self):
+        # Purpose: give back the unused keys of each table's current
+        #   block, if the sequence has not been used by anyone else
+        #   since the block was reserved
+        # Returns: nothing
+        # Assumes: the keys handed out have been loaded (or the load has
+        #   been abandoned)
+        # Effects: may set the sequence of each table back
+        # Throws: propagates any exceptions raised by db.sql()
+
+        if NO_LOAD:
+            return
+
+        for table in list(self.nextKey.keys()):
+            seq, keyField = KEY_SEQUENCES[table]
+            used = self.nextKey[table] - 1
+            if 0 < used < self.lastKey[table]:
+                db.sql ('select setval(\'%s\', %d) from %s where last_value = %d' % \
+                    (seq, used, seq, self.lastKey[table]), None)
+        return
+
+class BulkLoader:
+    # IS: a set of bcp files to load into their tables
+    # HAS: for each table, its bcp file and the tables which must be
+    #   loaded before it (for foreign keys); the outcome of each load
+    # DOES: loads the files, several at a time, starting each one as
+    #   soon as the tables it depends on are loaded, and reports what was
+    #   loaded.  Each load opens a connection of its own (see
+    #   openConnection()), COPYs its file on it and commits.  A table may
+    #   be given its rows instead of a finished file; how those are
+    #   loaded depends on BULK_LOAD_MODE (see bulkLoadMode()).
+    # Notes: Each table is committed by itself, so a failed run can
+    #   leave some tables loaded; the report (in the log, and in the
+    #   exception raised) says which.  A table whose load fails, even
+    #   partway through its rows (if the iterable of rows raises, say),
+    #   is rolled back, so none of its rows are loaded; tables already
+    #   committed, and those loading alongside it which succeed, stay
+    #   loaded; tables which depend on a failed one are not started.
+    #   In the 'tee' mode, the bcp file of a failed table holds the
+    #   rows it got before the failure.  BCP_MAX_WORKERS in the
+    #   environment sets the number of files loaded at once; 1 loads
+    #   them in order.  Without psycopg2 the files are loaded with
+    #   db.bcp(), which promises no connection of its own, so one at a
+    #   time.
+
+    def __init__ (self,
+        log     # Log.Log object; where to report the loads
+        ):
+        # Purpose: constructor
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        self.log = log
+        self.tables = []        # tables, in the order they were added
+        self.files = {}         # table -> bcp file name
+        self.rows = {}          # table -> iterable of bcp lines, or None
+        self.after = {}         # table -> list of tables to load first
+        self.outcome = {}       # table -> string describing the outcome
+        self.seconds = {}       # table -> seconds its load took
+        self.maxWorkers = max (1, int (os.environ.get ('BCP_MAX_WORKERS',
+            BCP_MAX_WORKERS)))
+        if psycopg2 is None:
+            self.maxWorkers = 1
+        self.mode = bulkLoadMode()
+        return
+
+    def add (self,
+        table,          # str. name of the table to load
+        filename,       # str. path to its '|'-delimited bcp file
+        after = [],     # list of str. tables to load before this one
+        rows = None     # iterable of str.; the '|'-delimited lines for
+                        #   the table, if 'filename' is not yet written
+        ):
+        # Purpose: add a table to be loaded
+        # Returns: nothing
+        # Assumes: each table in 'after' is added as well
+        # Effects: nothing
+        # Throws: nothing
+        # Notes: 'rows' is read once, when the table is loaded (in a
+        #   worker thread); a generator lets the rows be computed as
+        #   COPY takes them.  'filename' is then written only in the
+        #   'file' and 'tee' modes.
+
+        self.tables.append (table)
+        self.files[table] = filename
+        self.after[table] = list(after)
+        self.rows[table] = rows
+        return
+
+    def run (self):
+        # Purpose: load all of the tables
+        # Returns: nothing
+        # Assumes: the bcp files are complete and closed
+        # Effects: loads the tables; writes a line per table to the log
+        # Throws: VocloadlibError (after the loads already started have
+        #   finished) if any table could not be loaded
+
+        if not self.tables:
+            return
+
+        if NO_LOAD:
+            # write the files we were given rows for, as a load would
+            if self.mode != 'stream':
+                for table in self.tables:
+                    if self.rows[table] is not None:
+                        writeRows (self.rows[table], self.files[table])
+            return
+
+        pending = list(self.tables)
+        loaded = []
+        running = {}        # future -> table
+        failed = 0
+
+        executor = concurrent.futures.ThreadPoolExecutor (self.maxWorkers)
+        try:
+            while pending or running:
+                # start the tables whose prerequisites are loaded
+                for table in list(pending):
+                    if len(running) >= self.maxWorkers:
+                        break
+                    if failed or [ t for t in self.after[table] if t not in loaded ]:
+                        continue
+                    pending.remove (table)
+                    running[executor.submit (self.load, table)] = table
+
+                if not running:
+                    # nothing can be started: something failed
+                    for table in pending:
+                        self.outcome[table] = 'not loaded'
+                    break
+
+                done, notDone = concurrent.futures.wait (list(running.keys()),
+                    return_when = concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    table = running[future]
+                    del running[future]
+                    if future.exception() is None:
+                        loaded.append (table)
+                    else:
+                        self.outcome[table] = 'FAILED: %s' % future.exception()
+                        failed = 1
+        finally:
+            executor.shutdown (wait = True)
+
+        for table in self.tables:
+            self.log.writeline ('bcp %s: %s' % (table, self.outcome[table]))
+
+        if failed:
+            raise VocloadlibError('bcp failed; ' + '; '.join ([
+                '%s: %s' % (t, self.outcome[t]) for t in self.tables ]))
+        return
+
+    def load (self,
+        table   # str. name of the table to load
+        ):
+        # Purpose: bcp the file for one table, or stream its rows
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: loads and commits 'table'; may write its bcp file;
+        #   records the outcome
+        # Throws: propagates any exceptions raised by db.bcp(),
+        #   copyRows() or the COPY
+
+        filename = self.files[table]
+        rows = self.rows[table]
+        start = time.time()
+
+        if psycopg2 is None:
+            if rows is not None:
+                writeRows (rows, filename)
+            db.bcp (filename, table, delimiter='|')
+            self.seconds[table] = time.time() - start
+            self.outcome[table] = 'loaded %d bytes from %s in %.1f seconds' % \
+                (os.path.getsize (filename), filename, time.time() - start)
+            return
+
+        connection = openConnection()
+        try:
+            if rows is not None and self.mode != 'file':
+                if self.mode == 'tee':
+                    teeFilename = filename
+                else:
+                    teeFilename = None
+                (count, size) = copyRows (connection, table, rows,
+                    teeFilename)
+            else:
+                if rows is not None:
+                    writeRows (rows, filename)
+                fp = open (filename, 'r')
+                try:
+                    connection.cursor().copy_expert (COPY_FROM % (table, '|'),
+                        fp, COPY_BUFFER_SIZE)
+                finally:
+                    fp.close()
+            connection.commit()
+        except:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        self.seconds[table] = time.time() - start
+
+        if rows is not None and self.mode != 'file':
+            self.outcome[table] = 'streamed %d rows (%d bytes) in %.1f seconds' % \
+                (count, size, time.time() - start)
+            return
+        self.outcome[table] = 'loaded %d bytes from %s in %.1f seconds' % \
+            (os.path.getsize (filename), filename, time.time() - start)
+        return
+
+class RowStream:
+    # IS: a read-only file-like view of an iterable of lines
+    # HAS: the iterable, a buffer of at most about one read's worth of
+    #   lines, and (optionally) a file to which each line is copied
+    # DOES: hands the lines to whatever reads it (such as COPY), a block
+    #   at a time, pulling from the iterable only as needed
+    # Notes: The lines are never all in memory at once, so a generator
+    #   of rows can be loaded while it is still computing them.
+
+    def __init__ (self,
+        rows,           # iterable of str.; each a line ending in '\n'
+        tee = None      # open file to which to copy each line, or None
+        ):
+        # Purpose: constructor
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        self.rows = iter(rows)
+        self.tee = tee
+        self.buffer = ''        # text pulled from 'rows' but not yet read
+        self.count = 0          # number of lines pulled from 'rows'
+        self.size = 0           # number of characters pulled
+        self.done = 0           # boolean; is 'rows' used up?
+        return
+
+    def fill (self,
+        size    # integer; number of characters wanted in self.buffer
+        ):
+        # Purpose: pull lines until the buffer has 'size' characters or
+        #   the lines run out
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: extends self.buffer; writes to self.tee
+        # Throws: propagates any exception raised by the iterable
+
+        pieces = [ self.buffer ]
+        have = len(self.buffer)
+        while have < size and not self.done:
+            try:
+                line = next(self.rows)
+            except StopIteration:
+                self.done = 1
+                break
+            pieces.append (line)
+            have = have + len(line)
+            self.count = self.count + 1
+            if self.tee:
+                self.tee.write (line)
+        self.size = self.size + have - len(self.buffer)
+        self.buffer = ''.join (pieces)
+        return
+
+    def read (self,
+        size = -1   # integer; most characters to return (-1 = all)
+        ):
+        # Purpose: read up to 'size' characters
+        # Returns: str.; empty once the lines run out
+        # Assumes: nothing
+        # Effects: pulls lines from the iterable
+        # Throws: propagates any exception raised by the iterable
+
+        if size is None or size < 0:
+            self.fill (sys.maxsize)
+            size = len(self.buffer)
+        else:
+            self.fill (size)
+        text = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return text
+
+    def readline (self):
+        # Purpose: read one line
+        # Returns: str.; empty once the lines run out
+        # Assumes: nothing
+        # Effects: pulls a line from the iterable, if the buffer has none
+        # Throws: propagates any exception raised by the iterable
+
+        end = self.buffer.find ('\n')
+        while end < 0 and not self.done:
+            self.fill (len(self.buffer) + 1)
+            end = self.buffer.find ('\n')
+        if end < 0:
+            end = len(self.buffer)
+        else:
+            end = end + 1
+        text = self.buffer[:end]
+        self.buffer = self.buffer[end:]
+        return text
+
+class AsciiScrubTable (dict):
+    # IS: a str.translate() table which replaces each non-ASCII
+    #   character with a space and leaves ASCII characters alone
+    # HAS: the non-ASCII characters seen so far, each mapped to ' '
+    # DOES: fills itself in as str.translate() asks for characters
+
+    def __missing__ (self,
+        char        # integer; the ordinal of a character
+        ):
+        # Purpose: look up a character not yet in the table
+        # Returns: ' ' for a non-ASCII character
+        # Assumes: nothing
+        # Effects: remembers the replacement for 'char'
+        # Throws: LookupError for an ASCII character, which tells
+        #   str.translate() to leave it unchanged
+
+        if char < 128:
+            raise LookupError(char)
+        self[char] = ' '
+        return ' '
+
+ASCII_SCRUB = AsciiScrubTable()
+
+class TabRecord (tuple):
+    # IS: one line of a tab-delimited file, stored as a tuple of its
+    #   field values
+    # HAS: the field values; the field names (and their positions) are
+    #   shared by every record of the same type (see recordType())
+    # DOES: gives read-only, dictionary-style access to the values by
+    #   field name, as in record['accID']
+    # Notes: A tuple needs far less memory than a dictionary with the
+    #   same keys, and the field names are stored only once per type.
+
+    __slots__ = ()
+
+    fieldnames = ()         # overridden by recordType()
+    fieldIndex = {}         # overridden by recordType()
+
+    def __getitem__ (self,
+        field       # str. name of the field
+        ):
+        # Purpose: return the value of 'field'
+        # Returns: string
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: KeyError if 'field' is not a field of this record
+
+        return tuple.__getitem__ (self, self.fieldIndex[field])
+
+    def __contains__ (self,
+        field       # str. name of a field
+        ):
+        return field in self.fieldIndex
+
+    def get (self,
+        field,          # str. name of the field
+        default = None  # value to return if there is no such field
+        ):
+        if field in self.fieldIndex:
+            return tuple.__getitem__ (self, self.fieldIndex[field])
+        return default
+
+    def keys (self):
+        return list(self.fieldnames)
+
+    def values (self):
+        return list(tuple.__iter__ (self))
+
+    def items (self):
+        return list(zip (self.fieldnames, tuple.__iter__ (self)))
+
+RECORD_TYPES = {}       # maps a tuple of field names to its TabRecord type
+
+def recordType (
+    fieldnames      # list of str.; each is the name of one field
+    ):
+    # Purpose: get the TabRecord subclass for records with 'fieldnames'
+    # Returns: class; call it with a sequence of field values (in the
+    #   order of 'fieldnames') to make a record
+    # Assumes: nothing
+    # Effects: creates the class the first time it is asked for
+    # Throws: nothing
+
+    fieldnames = tuple(fieldnames)
+    if fieldnames not in RECORD_TYPES:
+        fieldIndex = {}
+        for i in range(0, len(fieldnames)):
+            fieldIndex[fieldnames[i]] = i
+        RECORD_TYPES[fieldnames] = type ('TabRecord', (TabRecord,),
+            { '__slots__' : (), 'fieldnames' : fieldnames,
+              'fieldIndex' : fieldIndex })
+    return RECORD_TYPES[fieldnames]
+
+class TabFileReader:
+    # IS: a tab-delimited file, seen as a sequence of records
+    # HAS: a filename and the names of its fields; if asked to cache
+    #   them, the records read by the first complete pass
+    # DOES: checks that each line has the right number of fields, and
+    #   yields one TabRecord per line each time it is iterated, with
+    #   non-ASCII characters replaced by spaces
+    # Notes: By default the records are read from the file as they are
+    #   needed rather than being held in memory, so each loop over the
+    #   reader reads and parses the file again.  A caller which loops
+    #   over it several times should ask for the records to be cached;
+    #   the file is then read once.  Values of the INTERNED_FIELDS are
+    #   interned, so the many records with the same status (say) share
+    #   one string.
+
+    def __init__ (self,
+        filename,   # str. path to a tab-delimited file to read
+        fieldnames, # list of str.; each is the name of one field
+        cache = 0   # boolean (0/1); keep the records after the first pass?
+        ):
+        # Purpose: constructor
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: reads 'filename' once, to check the number of
+        #   fields on each line
+        # Throws: 1. IOError if we cannot read from 'filename';
+        #   2. VocloadlibError if a line has the wrong number of fields
+
+        self.filename = filename
+        self.fieldnames = list(fieldnames)
+        self.recordType = recordType (self.fieldnames)
+        self.cache = cache
+        self.records = None     # list of TabRecords, once cached
+        self.interned = []
+        for i in range(0, len(self.fieldnames)):
+            if self.fieldnames[i] in INTERNED_FIELDS:
+                self.interned.append (i)
+
+        # validate up front, so a bad file is rejected before the caller
+        # starts changing the database
+
+        tabs = len(self.fieldnames) - 1
+        fp = open (self.filename, 'r')
+        try:
+            lineNbr = 0
+            for line in fp:
+                lineNbr = lineNbr + 1
+                if line.count ('\t') != tabs:
+                    raise VocloadlibError(bad_line % (self.filename, lineNbr, line))
+        finally:
+            fp.close()
+        return
+
+    def __iter__ (self):
+        # Purpose: iterate through the records in the file
+        # Returns: iterator of TabRecords, one per line
+        # Assumes: the file has not changed since it was validated
+        # Effects: reads the file, unless the records are cached
+        # Throws: IOError if we cannot read from the file
+
+        if self.records is not None:
+            return iter (self.records)
+        return self.read()
+
+    def read (self):
+        # Purpose: read the records from the file
+        # Returns: generator of TabRecords, one per line
+        # Assumes: the file has not changed since it was validated
+        # Effects: reads the file; caches the records if asked to, once
+        #   they have all been read
+        # Throws: IOError if we cannot read from the file
+
+        if self.cache:
+            records = []
+        else:
+            records = None
+        makeRecord = self.recordType
+        interned = self.interned
+        intern = sys.intern
+        fp = open (self.filename, 'r')
+        try:
+            for line in fp:
+                if line[-1:] == '\n':
+                    line = line[:-1]
+                # to ignore/skip non-ascii characters
+                if not line.isascii():
+                    line = line.translate (ASCII_SCRUB)
+                fields = line.split ('\t')
+                for i in interned:
+                    fields[i] = intern (fields[i])
+                record = makeRecord (fields)
+                if records is not None:
+                    records.append (record)
+                yield record
+        finally:
+            fp.close()
+
+        if records is not None:
+            self.records = records
+
+class LoadSession:
+    # IS: what the steps of one vocabulary load know in common
+    # HAS: the vocabulary's key and name, its term IDs (as from
+    #   getTermIDs()), and the highest key used so far in some tables
+    # DOES: looks each of these up at most once, lets the step which
+    #   changes one (TermLoad, DAGLoad) update it, and saves the term
+    #   IDs for the steps run later as separate scripts (see
+    #   readLoadSession())
+    # Notes: The DAG labels come from the reference data, which is
+    #   already read only once (see loadReferenceData()).
+
+    def __init__ (self,
+        vocab_key,          # integer; key of the vocabulary being loaded
+        vocab_name = None   # str. its name (looked up if None)
+        ):
+        # Purpose: constructor
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: queries the database if 'vocab_name' is None
+        # Throws: propagates any exceptions from getVocabName()
+
+        if vocab_name is None:
+            vocab_name = getVocabName (vocab_key)
+        self.vocab_key = vocab_key
+        self.vocab_name = vocab_name
+        self.termIDs = None     # accID -> [ term key, isObsolete, term, 0 ]
+        self.maxKeys = {}       # (fieldname, table) -> highest key used
+        return
+
+    def getTermIDs (self):
+        # Purpose: get the primary IDs of the vocabulary's terms
+        # Returns: dictionary; see getTermIDs()
+        # Assumes: nothing
+        # Effects: queries the database, the first time only
+        # Throws: propagates any exceptions from getTermIDs()
+
+        if self.termIDs is None:
+            self.termIDs = getTermIDs (self.vocab_key)
+        return self.termIDs
+
+    def setTermIDs (self,
+        termIDs     # dictionary; as from getTermIDs()
+        ):
+        # Purpose: give the session the term IDs, from the step which
+        #   loaded the terms
+        # Returns: nothing
+        # Assumes: 'termIDs' matches the database
+        # Effects: nothing
+        # Throws: nothing
+
+        self.termIDs = termIDs
+        return
+
+    def forgetTermIDs (self):
+        # Purpose: note that the terms have changed in ways the session
+        #   does not know
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: the next getTermIDs() queries the database
+        # Throws: nothing
+
+        self.termIDs = None
+        return
+
+    def getTermKeyMap (self,
+        accIDs      # list of str. primary term IDs
+        ):
+        # Purpose: look up the term keys for 'accIDs'
+        # Returns: dictionary; accID -> term key, for each known ID
+        # Assumes: nothing
+        # Effects: see self.getTermIDs()
+        # Throws: propagates any exceptions from self.getTermIDs()
+
+        termIDs = self.getTermIDs()
+        termKeyMap = {}
+        for accID in accIDs:
+            if accID in termIDs:
+                termKeyMap[accID] = termIDs[accID][0]
+        return termKeyMap
+
+    def getLabels (self):
+        # Purpose: get the DAG labels
+        # Returns: dictionary; see getLabels()
+        # Assumes: nothing
+        # Effects: see getLabels()
+        # Throws: propagates any exceptions from getLabels()
+
+        return getLabels()
+
+    def getMax (self,
+        fieldname,  # str. name of a key field in 'table'
+        table       # str. name of a table
+        ):
+        # Purpose: get the highest key used in 'table'
+        # Returns: integer
+        # Assumes: nothing
+        # Effects: queries the database, the first time only
+        # Throws: propagates any exceptions from getMax()
+
+        if (fieldname, table) not in self.maxKeys:
+            self.maxKeys[(fieldname, table)] = max(0, getMax (fieldname, table))
+        return self.maxKeys[(fieldname, table)]
+
+    def setMax (self,
+        fieldname,  # str. name of a key field in 'table'
+        table,      # str. name of a table
+        key         # integer; highest key now used (or reserved)
+        ):
+        # Purpose: record the highest key used in 'table'
+        # Returns: nothing
+        # Assumes: nothing
+        # Effects: nothing
+        # Throws: nothing
+
+        self.maxKeys[(fieldname, table)] = key
+        return
+
+    def save (self,
+        filename    # str. path to the file to write
+        ):
+        # Purpose: save the term IDs, for the steps run later
+        # Returns: nothing
+        # Assumes: the load has succeeded
+        # Effects: (re)writes 'filename'; queries the database
+        # Throws: propagates any exceptions raised
+
+        if not filename or NO_LOAD:
+            return
+
+        session = {
+            'vocab_key' : self.vocab_key,
+            'vocab_name' : self.vocab_name,
+            'termState' : getTermState (self.vocab_key),
+            'termIDs' : self.getTermIDs(),
+            }
+        fp = open (filename + '.tmp', 'w')
+        json.dump (session, fp)
+        fp.close()
+        os.replace (filename + '.tmp', filename)
+        return
 
 ###--- Functions ---###
 
+def readLoadSession (
+    filename,   # str. path to a file written by LoadSession.save()
+    vocab_name  # str. name of the vocabulary we need it for
+    ):
+    # Purpose: pick up the session of the last load of 'vocab_name'
+    # Returns: LoadSession, or None if there is no file, it is for
+    #   another vocabulary, or the terms have changed since it was saved
+    # Assumes: nothing
+    # Effects: reads 'filename'; queries the database
+    # Throws: propagates any exceptions from getTermState()
+
+    if not filename or not os.path.exists (filename):
+        return None
+    try:
+        fp = open (filename, 'r')
+        saved = json.load (fp)
+        fp.close()
+    except ValueError:
+        return None
+
+    if saved.get('vocab_name') != vocab_name or \
+            saved.get('termState') != getTermState (saved['vocab_key']):
+        return None
+
+    session = LoadSession (saved['vocab_key'], saved['vocab_name'])
+    session.setTermIDs (saved['termIDs'])
+    return session
+
 def setupSql (server,   # str. name of database server
     database,   # str. name of database
     username,   # str. user with full permissions on database
@@ -71,8 +941,14 @@ def setupSql (server,   # str. name of database server
     #   connection for each db.sql() call)
     # Throws: nothing
 
+    global SQL_SERVER, SQL_DATABASE, SQL_USER, SQL_PASSWORD
+
     db.set_sqlLogin (username, password, server, database)
     db.useOneConnection(1)
+    SQL_SERVER = server
+    SQL_DATABASE = database
+    SQL_USER = username
+    SQL_PASSWORD = password
     return
 
 def unsetupSql ():
@@ -85,6 +961,37 @@ def unsetupSql ():
     db.useOneConnection(0)
     return
 
+def addPendingFile (
+    pendingName,    # str. name of the file as written
+    finalName       # str. name it is to have once the load commits
+    ):
+    # Purpose: note a file which describes the database as the current
+    #   transaction leaves it, and so which should only replace
+    #   'finalName' if that transaction commits
+    # Returns: nothing
+    # Assumes: nothing
+    # Effects: alters the global PENDING_FILES
+    # Throws: nothing
+
+    PENDING_FILES.append ((pendingName, finalName))
+    return
+
+def commit ():
+    # Purpose: commit the load's transaction, then put in place the files
+    #   given to addPendingFile()
+    # Returns: nothing
+    # Assumes: setupSql() has been called
+    # Effects: commits the current transaction; renames files; empties
+    #   the global PENDING_FILES
+    # Throws: propagates any exceptions raised by db.commit() (in which
+    #   case no file is renamed) or by os.replace()
+
+    db.commit()
+    while PENDING_FILES:
+        pendingName, finalName = PENDING_FILES.pop(0)
+        os.replace (pendingName, finalName)
+    return
+
 def sqlog (
     commands,   # str.of SQL, or list of SQL str.
     log     # Log.Log object to which to log the 'commands'
@@ -135,6 +1042,115 @@ def nl_sqlog (
         return db.sql (commands)
     return []
 
+def nl_sqlogBatch (
+    template,   # str. SQL with one %s, where the list of row values goes
+    rows,       # list of str.; each is one parenthesized row of values
+    log,        # Log.Log object to which to log the commands
+    batchSize = SQL_BATCH_SIZE  # integer; maximum rows per statement
+    ):
+    # Purpose: send 'rows' to the database as few multi-row statements
+    #   (insert ... values %s, update ... from (values %s), etc.)
+    #   rather than one statement per row
+    # Returns: nothing
+    # Assumes: same as db.sql()
+    # Effects: see nl_sqlog(); does nothing if 'rows' is empty
+    # Throws: propagates any exceptions raised by db.sql()
+
+    for batch in batchList (rows, batchSize):
+        nl_sqlog (template % ',\n'.join(batch), log)
+    return
+
+def bulkLoadMode ():
+    # Purpose: get the way rows given to a BulkLoader are loaded
+    # Returns: str.; one of BULK_LOAD_MODES
+    # Assumes: nothing
+    # Effects: nothing
+    # Throws: VocloadlibError if BULK_LOAD_MODE in the environment is
+    #   not one of BULK_LOAD_MODES, or asks for streaming without psycopg2
+
+    mode = os.environ.get ('BULK_LOAD_MODE', BULK_LOAD_MODE) or BULK_LOAD_MODE
+    if mode not in BULK_LOAD_MODES:
+        raise VocloadlibError(unknown_bulk_mode % (mode, BULK_LOAD_MODES))
+    if mode != 'file' and psycopg2 is None:
+        raise VocloadlibError(no_psycopg2 % mode)
+    return mode
+
+def copyRows (
+    connection,         # psycopg2 connection, from openConnection()
+    table,              # str. name of the table to load
+    rows,               # iterable of str.; '|'-delimited lines for 'table'
+    teeFilename = None, # str. path to which to copy the lines, or None
+    delimiter = '|'     # str. field delimiter used in 'rows'
+    ):
+    # Purpose: load 'rows' into 'table' with COPY, as they are produced,
+    #   rather than writing and then bcp'ing a file
+    # Returns: tuple; (number of rows, number of characters) loaded
+    # Assumes: psycopg2 is available; the lines are formatted as for
+    #   db.bcp() (empty field = null)
+    # Effects: loads 'table' on 'connection', leaving the caller to
+    #   commit or roll back (see BulkLoader.load()); writes 'teeFilename'
+    #   if given
+    # Throws: propagates any exception raised by psycopg2 or by 'rows';
+    #   the COPY then fails as a whole, and 'teeFilename' is left with
+    #   the lines pulled before the exception
+
+    if teeFilename:
+        tee = open (teeFilename, 'w')
+    else:
+        tee = None
+
+    stream = RowStream (rows, tee)
+    try:
+        cursor = connection.cursor()
+        cursor.copy_expert (COPY_FROM % (table, delimiter), stream,
+            COPY_BUFFER_SIZE)
+    finally:
+        if tee:
+            tee.close()
+    return (stream.count, stream.size)
+
+def openConnection ():
+    # Purpose: open a new connection to the database given to setupSql(),
+    #   for a bulk load of its own (see BulkLoader)
+    # Returns: psycopg2 connection; the caller commits and closes it
+    # Assumes: setupSql() has been called; psycopg2 is available
+    # Effects: connects to the database
+    # Throws: propagates any exception raised by psycopg2.connect()
+
+    return psycopg2.connect (host = SQL_SERVER, dbname = SQL_DATABASE,
+        user = SQL_USER, password = SQL_PASSWORD)
+
+def writeRows (
+    rows,       # iterable of str.; lines to write
+    filename    # str. path to the file to write
+    ):
+    # Purpose: write 'rows' to a bcp file
+    # Returns: nothing
+    # Assumes: nothing
+    # Effects: writes 'filename'
+    # Throws: propagates any exception raised writing the file or by 'rows'
+
+    fp = open (filename, 'w')
+    try:
+        fp.writelines (rows)
+    finally:
+        fp.close()
+    return
+
+def batchList (
+    items,      # list to split
+    n = 1       # integer; maximum size of each piece
+    ):
+    # Purpose: split 'items' into consecutive pieces of at most 'n' items
+    # Returns: generator of lists
+    # Assumes: nothing
+    # Effects: nothing
+    # Throws: nothing
+
+    l = len(items)
+    for ndx in range(0, l, n):
+        yield items[ndx:min(ndx+n, l)]
+
 
 def setVocabMGITypeKey (
     key     # integer; _MGIType_key for vocabulary terms
@@ -206,6 +1222,41 @@ def getAnyTermMarkerCrossReferences (
        raise VocloadlibError('xref error', sys.exc_info()[1])
     return results
 
+def getTermMarkerCrossReferences (
+    termKeys,      # list of integers; VOC_Term._Term_key values
+    annotationKey  # integer; corresponds to the VOC_AnnotType._AnnotType_key
+    ):
+    # Purpose: get the term to marker annotations for a set of terms at
+    #   once; the set-based version of getAnyTermMarkerCrossReferences()
+    # Returns: dictionary mapping each term key which has annotations
+    #   to its list of annotations (as getAnyTermMarkerCrossReferences()
+    #   would return them)
+    # Assumes: see db.sql()
+    # Effects: queries the database, once per SQL_BATCH_SIZE term keys
+    # Throws:  propagates any exceptions raised by db.sql()
+
+    annotations = {}
+    for batch in batchList (list(termKeys), SQL_BATCH_SIZE):
+        try:
+            results = db.sql (
+                ''' select m.symbol
+                          ,t.term
+                          ,t._term_key
+                    from   VOC_Term t
+                          ,VOC_Annot a
+                          ,MRK_Marker m
+                    where  t._Term_key      = any(array[%s])
+                    and    t._Term_key      = a._Term_key
+                    and    a._AnnotType_key = %s
+                    and    a._Object_key    = m._Marker_key
+                ''' % (','.join(map(str, batch)), annotationKey), 'auto')
+        except:
+            raise VocloadlibError('xref error', sys.exc_info()[1])
+
+        for r in results:
+            annotations.setdefault (r['_term_key'], []).append (r)
+    return annotations
+
 def timestamp (
     label = 'Current time:'     # str. preface to the timestamp
     ):
@@ -279,10 +1330,14 @@ def getVocabKey (
     # Purpose: return the vocabulary key for the given 'vocab' name
     # Returns: integer
     # Assumes: nothing
-    # Effects: queries the database
+    # Effects: loads the reference data, if not already loaded; queries
+    #   the database for vocabularies added since it was loaded
     # Throws: 1. error if the given 'vocab' is not in the database
     #   2. propagates any exceptions raised by db.sql()
 
+    if vocab in getReferenceMap (VOCAB_KEY_MAP):
+        return VOCAB_KEY_MAP[vocab]
+
     result = db.sql ('select _Vocab_key from VOC_Vocab where name = \'%s\'' % \
         vocab)
     if len(result) != 1:
@@ -295,23 +1350,16 @@ def getSynonymTypeKey (
     # Purpose: return the synonym type key for the given 'vocab' synonym type
     # Returns: integer
     # Assumes: nothing
-    # Effects: queries the database
+    # Effects: loads the reference data, if not already loaded
     # Throws: 1. error if the given synonym type is not in the database
-    #   2. propagates any exceptions raised by db.sql()
-
-    global SYNONYM_TYPE_MAP 
-
-    if not SYNONYM_TYPE_MAP:
-        results = db.sql ('select _synonymtype_key, synonymtype from MGI_SynonymType where _MGIType_key = %d' % VOCABULARY_TERM_TYPE)
-        for r in results:
-                SYNONYM_TYPE_MAP[r['synonymtype'].lower()] = r['_synonymtype_key']
+    #   2. propagates any exceptions raised by loadReferenceData()
 
     synonymType = synonymType.lower()
 
-    if synonymType not in SYNONYM_TYPE_MAP:
+    if synonymType not in getReferenceMap (SYNONYM_TYPE_MAP, VOCABULARY_TERM_TYPE, synonymType):
         raise VocloadlibError(unknown_synonymtype % synonymType)
 
-    return SYNONYM_TYPE_MAP[synonymType]
+    return SYNONYM_TYPE_MAP[VOCABULARY_TERM_TYPE][synonymType]
 
 def getNoteTypeKey (
     noteType 
@@ -321,19 +1369,23 @@ def getNoteTypeKey (
         using the mgitype_key for voc_term
     """
 
-    global NOTE_TYPE_MAP 
-
-    if not NOTE_TYPE_MAP:
-        results = db.sql ('select _notetype_key, notetype from MGI_NoteType where _MGIType_key = %d' % VOCABULARY_TERM_TYPE)
-        for r in results:
-                NOTE_TYPE_MAP[r['notetype'].lower()] = r['_notetype_key']
-
     noteType = noteType.lower()
 
-    if noteType not in NOTE_TYPE_MAP:
+    if noteType not in getReferenceMap (NOTE_TYPE_MAP, VOCABULARY_TERM_TYPE, noteType):
         raise VocloadlibError(unknown_notetype % noteType)
 
-    return NOTE_TYPE_MAP[noteType]
+    return NOTE_TYPE_MAP[VOCABULARY_TERM_TYPE][noteType]
+
+def getLogicalDBKeyByName (
+    name        # str. logical database name from ACC_LogicalDB.name
+    ):
+    # Purpose: return the _LogicalDB_key for the logical database 'name'
+    # Returns: integer, or None if there is no such logical database
+    # Assumes: nothing
+    # Effects: loads the reference data, if not already loaded
+    # Throws: propagates any exceptions raised by loadReferenceData()
+
+    return getReferenceMap (LOGICALDB_MAP, None, name).get (name)
 
 def checkVocabKey (
     vocab_key   # integer; key for vocabulary, as VOC_Vocab._Vocab_key
@@ -417,13 +1469,15 @@ def countNodes (
     return result[0]['ct']
 
 def getTerms (
-    vocab   # integer vocabulary key or str.vocabulary name
+    vocab,          # integer vocabulary key or str.vocabulary name
+    termKeys = None # list of integer term keys to get, or None for all
     ):
     # Purpose: retrieve the terms for the given 'vocab' and their
     #   respective attributes
     # Returns: dbTable.RecordSet object
     # Assumes: 'vocab' exists in the database
-    # Effects: queries the database
+    # Effects: queries the database (once for all of the terms, or once
+    #   per ARRAY_BATCH_SIZE of the 'termKeys')
     # Throws: propagates exceptions from db.sql()
     # Notes: The RecordSet object returned contains dictionaries, each
     #   of which represents a term and its attributes.  The
@@ -432,26 +1486,49 @@ def getTerms (
     if type(vocab) == str:
         vocab = getVocabKey (vocab)
 
-    [ voc_term, voc_synonym, voc_comment ] = db.sql( [
-        '''select *             -- basic term info
-        from VOC_Term
-        where _Vocab_key = %d''' % vocab,
+    if termKeys is None:
+        batches = [ None ]
+    else:
+        batches = batchList (list(termKeys), ARRAY_BATCH_SIZE)
 
-        '''select vs.*, vst.synonymType   -- synonyms/synonymTypes for term
-        from MGI_Synonym vs, MGI_SynonymType vst, VOC_Term vt
-        where vt._Vocab_key = %d
-            and vt._Term_key = vs._Object_key
-            and vs._MGIType_key = %d
-            and vs._SynonymType_key = vst._SynonymType_key
-        order by vs.synonym''' % (vocab, VOCABULARY_TERM_TYPE),
-
-        '''select n._Object_key, n.note
-        from VOC_Term vt, MGI_Note n
-        where vt._Vocab_key = %d
-        and vt._Term_key = n._Object_key
-        and n._NoteType_key = %s
-        order by n._Object_key''' % (vocab, os.environ['VOCAB_COMMENT_KEY'])
-        ] )
+    voc_term = []
+    voc_synonym = []
+    voc_comment = []
+
+    for batch in batches:
+        if batch is None:
+            restriction = ''
+        else:
+            restriction = 'and vt._Term_key = any(array[%s])' % \
+                ','.join (map (str, batch))
+
+        [ terms, synonyms, comments ] = db.sql( [
+            '''select *             -- basic term info
+            from VOC_Term vt
+            where vt._Vocab_key = %d
+            %s''' % (vocab, restriction),
+
+            '''select vs.*, vst.synonymType   -- synonyms/synonymTypes for term
+            from MGI_Synonym vs, MGI_SynonymType vst, VOC_Term vt
+            where vt._Vocab_key = %d
+                %s
+                and vt._Term_key = vs._Object_key
+                and vs._MGIType_key = %d
+                and vs._SynonymType_key = vst._SynonymType_key
+            order by vs.synonym''' % (vocab, restriction, VOCABULARY_TERM_TYPE),
+
+            '''select n._Object_key, n.note
+            from VOC_Term vt, MGI_Note n
+            where vt._Vocab_key = %d
+            %s
+            and vt._Term_key = n._Object_key
+            and n._NoteType_key = %s
+            order by n._Object_key''' % (vocab, restriction, os.environ['VOCAB_COMMENT_KEY'])
+            ] )
+
+        voc_term.extend (terms)
+        voc_synonym.extend (synonyms)
+        voc_comment.extend (comments)
     
     # build a dictionary of 'comments', mapping a term key to a str.of comments/notes
 
@@ -497,18 +1574,63 @@ def getTerms (
 
     return dbTable.RecordSet (voc_term, '_Term_key')
 
+def getTermState (
+    vocab   # integer vocabulary key
+    ):
+    # Purpose: summarize the current state of the terms of 'vocab', to
+    #   tell whether terms have been added, deleted or modified
+    # Returns: string
+    # Assumes: 'vocab' exists in the database
+    # Effects: queries the database
+    # Throws: propagates exceptions from db.sql()
+
+    result = db.sql ('''select count(*) || ':' || coalesce(max(_Term_key), 0) || ':' ||
+            coalesce(max(modification_date)::text, '') as terms
+        from VOC_Term
+        where _Vocab_key = %d''' % vocab, 'auto')
+    return result[0]['terms']
+
+def getVocabState (
+    vocab   # integer vocabulary key
+    ):
+    # Purpose: summarize the current state of the terms, comments and
+    #   synonyms of 'vocab', to tell whether anything has changed them
+    # Returns: string; it differs whenever a term, comment or synonym of
+    #   'vocab' has been added, deleted or modified (through the load or
+    #   through the EI)
+    # Assumes: 'vocab' exists in the database
+    # Effects: queries the database
+    # Throws: propagates exceptions from db.sql()
+
+    result = db.sql ('''select
+        (select count(*) || ':' || coalesce(max(vt.modification_date)::text, '')
+            from VOC_Term vt
+            where vt._Vocab_key = %d) as terms,
+        (select count(*) || ':' || coalesce(max(n._Note_key), 0) || ':' ||
+                coalesce(max(n.modification_date)::text, '')
+            from VOC_Term vt, MGI_Note n
+            where vt._Vocab_key = %d
+            and vt._Term_key = n._Object_key
+            and n._MGIType_key = %d) as notes,
+        (select count(*) || ':' || coalesce(max(vs._Synonym_key), 0) || ':' ||
+                coalesce(max(vs.modification_date)::text, '')
+            from VOC_Term vt, MGI_Synonym vs
+            where vt._Vocab_key = %d
+            and vt._Term_key = vs._Object_key
+            and vs._MGIType_key = %d) as synonyms
+        ''' % (vocab, vocab, VOCABULARY_TERM_TYPE, vocab, VOCABULARY_TERM_TYPE), 'auto')
+
+    r = result[0]
+    return '%s/%s/%s' % (r['terms'], r['notes'], r['synonyms'])
+
 def getLabels ():
     # Purpose: find the complete set of DAG labels from the database
     # Returns: dictionary mapping labels to their keys
     # Assumes: nothing
-    # Effects: queries the database
-    # Throws: propagates any exceptions from db.sql()
+    # Effects: loads the reference data, if not already loaded
+    # Throws: propagates any exceptions from loadReferenceData()
 
-    result = db.sql ('select label, _Label_key from DAG_Label')
-    labels = {}
-    for row in result:
-        labels[row['label']] = row['_Label_key']
-    return labels
+    return dict (getReferenceMap (LABEL_MAP))
 
 def setTermIDs (
     dict        # dictionary mapping term IDs to term keys
@@ -565,17 +1687,12 @@ def getTermKeyMap (
     in the specified vocabName
     """
 
-    # perform queries in batches of 100 IDs
-    def batch_list(iterable, n = 1):
-       l = len(iterable)
-       for ndx in range(0, l, n):
-           yield iterable[ndx:min(ndx+n, l)]
-
     term_mgitype_key = 13
 
     termKeyMap = {}
 
-    for batch in batch_list(termIDs, 100):
+    # perform queries in batches of 100 IDs
+    for batch in batchList(termIDs, 100):
 
         result = db.sql ('''select acc.accid, t._term_key
                 from ACC_Accession acc join 
@@ -624,49 +1741,87 @@ def getSecondaryTermIDs (
 
 def readTabFile (
     filename,   # str. path to a tab-delimited file to read
-    fieldnames  # list of str.; each is the name of one field
+    fieldnames, # list of str.; each is the name of one field
+    cache = 0   # boolean (0/1); keep the records for later passes?
     ):
     # Purpose: read a tab-delimited file and convert each line to a
-    #   dictionary mapping from fieldnames to values
-    # Returns: list of dictionaries
+    #   record mapping from fieldnames to values
+    # Returns: TabFileReader, which yields the records (TabRecords) each
+    #   time it is iterated (reading them from 'filename' as it goes,
+    #   or, if 'cache' is set, only the first time)
     # Assumes: 'filename' is readable
-    # Effects: reads 'filename'
+    # Effects: reads 'filename' to check its format
     # Throws: 1. IOError if we cannot read from 'filename';
     #   2. error if a line has the wrong number of fields
     # Example: Consider the following tab-delimited file 'foo.txt':
     #       3   Joe Smith
     #       5   Jane    Jones
-    #   Then, readTabFile ('foo.txt', ['key', 'first', 'last' ])
+    #   Then, looping over readTabFile ('foo.txt', ['key', 'first', 'last' ])
     #   returns:
-    #       [ { 'key' : 3, 'first' : 'Joe', 'last' : 'Smith' },
-    #         { 'key' : 5, 'first' : 'Jane', 'last' : 'Jones' } ]
+    #       { 'key' : 3, 'first' : 'Joe', 'last' : 'Smith' },
+    #       { 'key' : 5, 'first' : 'Jane', 'last' : 'Jones' }
+
+    return TabFileReader (filename, fieldnames, cache)
 
-    num_fields = len(fieldnames)
-    lines = []
+def bcpStaged (
+    filename,   # str. path to a '|'-delimited bcp file for 'table'
+    table,      # str. name of the table to load
+    log         # Log.Log object; where to log the SQL
+    ):
+    # Purpose: load 'filename' into 'table' through a staging table:
+    #   the file is loaded into a temp copy of 'table', which is then
+    #   added to 'table' with one insert ... select
+    # Returns: nothing
+    # Assumes: setupSql() has been called; the rows of 'filename' have
+    #   the columns of 'table', in order
+    # Effects: creates, loads and drops temp table tmp_vocload_<table>;
+    #   inserts into 'table'
+    # Throws: propagates any exceptions raised by db.sql()
+    # Notes: Everything runs through db.sql() (see stageFile()), so it
+    #   is all part of the current transaction, unlike a db.bcp()
+    #   straight into 'table'.  A temp table is private to the
+    #   connection, so concurrent loads cannot collide; if anything
+    #   fails, the rollback (or the end of the session) removes it.
+
+    stageTable = 'tmp_vocload_%s' % table.lower()
+
+    nl_sqlog ('create temp table %s (like %s)' % (stageTable, table), log)
+    stageFile (filename, stageTable, log)
+    nl_sqlog ('insert into %s select * from %s' % (table, stageTable), log)
+    nl_sqlog ('drop table %s' % stageTable, log)
+    return
+
+def stageFile (
+    filename,           # str. path to a bcp file for 'table'
+    table,              # str. name of the (staging) table to load
+    log,                # Log.Log object; where to log the SQL
+    delimiter = '|'     # str. field delimiter used in 'filename'
+    ):
+    # Purpose: load the rows of 'filename' into 'table' as multi-row
+    #   inserts through db.sql(), so they are part of the current
+    #   transaction (db.bcp() and BulkLoader commit on connections of
+    #   their own, and the db module offers no COPY on its connection)
+    # Returns: nothing
+    # Assumes: setupSql() has been called; the lines are formatted as
+    #   for db.bcp() (empty field = null), and every value can be given
+    #   to its column as a quoted literal
+    # Effects: loads 'table' (uncommitted); see nl_sqlogBatch()
+    # Throws: propagates any exceptions raised by db.sql()
+
+    rows = []
     fp = open (filename, 'r')
-    line = fp.readline()
-    lineNbr = 0
-    while line:
-        lineNbr = lineNbr + 1
-        # note that we use line[:-1] to trim the trailing newline
-        fields = re.split ('\t', line[:-1])
-
-        if len(fields) != num_fields:
-            raise VocloadlibError(bad_line % (filename, lineNbr, line))
-
-        # map each tab-delimited field to its corresponding fieldname
-        i = 0
-        dict = {}
-        while i < num_fields:
-            #dict[fieldnames[i]] = fields[i]
-            # to ignore/skip non-ascii characters
-            dict[fieldnames[i]] = ''.join([j if ord(j) < 128 else ' ' for j in fields[i]])
-            i = i + 1
-
-        lines.append(dict)  # add to the list of dictionaries
-        line = fp.readline()
+    for line in fp:
+        values = []
+        for field in str.split (line.rstrip('\n'), delimiter):
+            if field == '':
+                values.append ('null')
+            else:
+                values.append ("'%s'" % field.replace ("'", "''"))
+        rows.append ('(%s)' % ','.join (values))
     fp.close()
-    return lines
+
+    nl_sqlogBatch ('insert into %s values %%s' % table, rows, log)
+    return
 
 def getMax (
     fieldname,  # str. name of a field in 'table' in the database
@@ -728,71 +1883,128 @@ def deleteVocabTerms (
     #          Also, we need to check that we are not in
     #          a no-load state before calling the db.sql() function.
 
-#
-#       this delete takes a long time; to speed it up....
-#       disable trigger
-#       remove these things
-#       delete all terms
-#       enable trigger
-#
-#    sql = '''
-#
-#        DELETE FROM MGI_Note m
-#        USING VOC_Term t
-#        WHERE m._Object_key = t._Term_key
-#        AND m._MGIType_key = 13
-#        AND t._Vocab_key = %s
-#        ;
-#
-#        DELETE FROM MGI_Synonym m
-#        USING VOC_Term t
-#        WHERE m._Object_key = t._Term_key
-#        AND m._MGIType_key = 13
-#        AND t._Vocab_key = %s
-#        ;
-#
-#        DELETE FROM MGI_SetMember msm
-#        USING MGI_Set ms, VOC_Term t
-#        WHERE msm._Object_key = t._Term_key
-#        AND msm._Set_key = ms._Set_key
-#        AND ms._MGIType_key = 13
-#        AND t._Vocab_key = %s
-#        ;
-#
-#        DELETE FROM DAG_Node dnode
-#        USING DAG_DAG ddag, VOC_Term t
-#        WHERE dnode._Object_key = t._Term_key
-#        AND dnode._DAG_key = ddag._DAG_key
-#        AND ddag._MGIType_key = 13
-#        AND t._Vocab_key = %s
-#        ;
-#
-#        DELETE FROM ACC_Accession a
-#        USING VOC_Term t
-#        WHERE a._Object_key = t._Term_key
-#        AND a._MGIType_key = 13
-#        AND t._Vocab_key = %s
-#        ;
-#
-#        DELETE FROM VOC_Annot a
-#        USING VOC_Term t
-#        WHERE a._Object_key =  t._Term_key
-#        AND a._AnnotType_key = 1024
-#        AND t._Vocab_key = %s
-#        ;
-#
-#        DELETE FROM MGI_Relationship r
-#        USING VOC_Term t
-#        WHERE r._Object_key_1 = t._Term_key
-#        AND r._Category_key = 1005
-#        AND t._Vocab_key = %s
-#        ;
-#    '''
+    # this delete takes a long time, as the trigger works one term at a
+    # time; with FAST_DELETE=1 the bulk of the related rows are removed
+    # first, with set-based deletes (see deleteVocabTermsFast()).
+    # FAST_DELETE=compare first times both ways and checks that they
+    # leave the same rows (see compareVocabTermDeletes()), then deletes
+    # as for FAST_DELETE=1.
+
+    fastDelete = os.environ.get ('FAST_DELETE', '0')
+    if fastDelete == 'compare' and not NO_LOAD:
+        compareVocabTermDeletes (vocab_key, log)
+
+    start = time.time()
+
+    if fastDelete in [ '1', 'compare' ]:
+        deleteVocabTermsFast (vocab_key, log)
 
     sql = 'delete from VOC_Term where _Vocab_key = %d' % vocab_key
     nl_sqlog ( sql, log)
+
+    if log:
+        log.writeline (timestamp ('deleteVocabTerms(): %.1f seconds' % \
+            (time.time() - start)))
+    return
+
+def deleteVocabTermsFast (
+    vocab_key,  # integer; vocabulary key from VOC_Vocab._Vocab_key
+    log = None  # Log.Log object; where to log the deletions
+    ):
+    # Purpose: delete the notes, synonyms, set members, DAG nodes and
+    #   accession IDs of the terms of the given vocabulary, each with one
+    #   set-based statement, so the VOC_Term_Delete trigger finds nothing
+    #   left to delete for them when the terms are deleted
+    # Returns: nothing
+    # Assumes: setupSql() has been called appropriately
+    # Effects: removes records from the FAST_DELETES tables; logs the
+    #   number of rows and time taken for each
+    # Throws: propagates any exceptions from db.sql()
+    # Notes: Called by deleteVocabTerms() when FAST_DELETE=1.  The
+    #   trigger still removes everything else (annotations,
+    #   relationships, ...) when the terms themselves are deleted.
+    #   That these deletes leave the same rows as the trigger alone is
+    #   checked by compareVocabTermDeletes() (FAST_DELETE=compare).
+
+    for (table, joined, condition) in FAST_DELETES:
+        condition = condition % (VOCABULARY_TERM_TYPE, vocab_key)
+        count = 'select count(*) as ct from %s, %s where %s' % \
+            (table, joined, condition)
+
+        start = time.time()
+        if NO_LOAD:
+            before = 0
+        else:
+            before = db.sql (count, 'auto')[0]['ct']
+        nl_sqlog ('delete from %s using %s where %s' % \
+            (table, joined, condition), log)
+
+        if log:
+            log.writeline ('deleteVocabTermsFast(): %s: %d rows, %.1f seconds' % \
+                (table.split()[0], before, time.time() - start))
     return
 
+def compareVocabTermDeletes (
+    vocab_key,  # integer; vocabulary key from VOC_Vocab._Vocab_key
+    log = None  # Log.Log object; where to log the comparison
+    ):
+    # Purpose: delete the terms of the given vocabulary both ways -- by
+    #   the VOC_Term_Delete trigger alone, and with deleteVocabTermsFast()
+    #   first -- rolling each back, to time them and to check that they
+    #   leave the same rows in the FAST_DELETES tables
+    # Returns: tuple; (trigger seconds, fast seconds)
+    # Assumes: setupSql() has been called appropriately; not in no-load
+    #   mode
+    # Effects: nothing is left changed (each way runs inside a savepoint
+    #   that is rolled back); logs the times and the rows left in each
+    #   table by each way
+    # Throws: 1. VocloadlibError if the two ways leave different numbers
+    #   of rows in any table; 2. propagates any exceptions from db.sql()
+    # Notes: Run it on a scratch copy of a vocabulary to measure the
+    #   fast delete before turning it on.  The terms' keys are saved in a
+    #   temp table first, so the rows which belonged to them can still be
+    #   counted after the terms are gone.
+
+    db.sql (SAVE_DELETED_TERMS % vocab_key, 'auto')
+
+    def remaining ():
+        # rows left in each of the FAST_DELETES tables for the saved terms
+        counts = {}
+        for (table, joined, condition) in FAST_DELETES:
+            joined = joined.replace ('VOC_Term t', 'tmp_vocload_deleted t')
+            counts[table.split()[0]] = db.sql ('select count(*) as ct from %s, %s where %s' % \
+                (table, joined, condition % (VOCABULARY_TERM_TYPE, vocab_key)),
+                'auto')[0]['ct']
+        return counts
+
+    seconds = {}
+    left = {}
+    for way in [ 'trigger', 'fast' ]:
+        db.sql ('savepoint vocload_delete', 'auto')
+        start = time.time()
+        if way == 'fast':
+            deleteVocabTermsFast (vocab_key)
+        db.sql ('delete from VOC_Term where _Vocab_key = %d' % vocab_key, 'auto')
+        seconds[way] = time.time() - start
+        left[way] = remaining()
+        db.sql ('rollback to savepoint vocload_delete', 'auto')
+        db.sql ('release savepoint vocload_delete', 'auto')
+
+    db.sql ('drop table tmp_vocload_deleted', 'auto')
+
+    if log:
+        log.writeline ('compareVocabTermDeletes(): vocab %d: trigger %.1f seconds, fast %.1f seconds' % \
+            (vocab_key, seconds['trigger'], seconds['fast']))
+        for table in sorted (left['trigger'].keys()):
+            log.writeline ('compareVocabTermDeletes(): %s: rows left: trigger %d, fast %d' % \
+                (table, left['trigger'][table], left['fast'][table]))
+
+    different = [ table for table in sorted (left['trigger'].keys())
+        if left['trigger'][table] != left['fast'][table] ]
+    if different:
+        raise VocloadlibError(delete_mismatch % (vocab_key, ', '.join (different)))
+    return (seconds['trigger'], seconds['fast'])
+
 def deleteDagComponents (
     dag_key,    # integer; DAG key from DAG_DAG._DAG_key
     log = None  # Log.Log object; where to log the deletions
@@ -825,10 +2037,133 @@ def isNoLoad ():
 
     return NO_LOAD
 
+def loadReferenceData (
+    useSnapshot = 1     # boolean (0/1); may we use the on-disk snapshot?
+    ):
+    # Purpose: load the reference data used by the lookup functions
+    #   (logical DBs, synonym types, note types, DAG labels and
+    #   vocabularies) into the global dictionaries, with one query
+    # Returns: nothing
+    # Assumes: setupSql() has been called appropriately
+    # Effects: fills SYNONYM_TYPE_MAP, NOTE_TYPE_MAP, LOGICALDB_MAP,
+    #   LABEL_MAP, VOCAB_KEY_MAP and vocab_info_cache; sets REFDATA_SOURCE.
+    #   If REFDATA_SNAPSHOT_FILE is set, the data are read from that file
+    #   when it is younger than REFDATA_SNAPSHOT_MAXAGE seconds (and was
+    #   written for the same database); otherwise they are queried and
+    #   the file is (re)written.
+    # Throws: propagates any exceptions from db.sql()
+    # Notes: The lookup functions call this the first time they are used,
+    #   and again (without the snapshot) if they cannot find an item
+    #   that came from a snapshot.
+
+    global REFDATA_SOURCE
+
+    snapshotFile = os.environ.get ('REFDATA_SNAPSHOT_FILE')
+    login = [ SQL_SERVER, SQL_DATABASE ]
+    rows = None
+
+    if useSnapshot and snapshotFile and os.path.exists (snapshotFile):
+        maxAge = float (os.environ.get ('REFDATA_SNAPSHOT_MAXAGE', 86400))
+        if time.time() - os.path.getmtime (snapshotFile) < maxAge:
+            try:
+                fp = open (snapshotFile, 'r')
+                snapshot = json.load (fp)
+                fp.close()
+                if snapshot['login'] == login:
+                    rows = snapshot['rows']
+                    REFDATA_SOURCE = 'snapshot'
+            except (IOError, ValueError, KeyError):
+                rows = None
+
+    if rows is None:
+        rows = []
+        for r in db.sql (REFDATA_SQL, 'auto'):
+            rows.append ([ r['tablename'], r['name'], r['objectkey'],
+                r['mgitypekey'], r['issimple'], r['isprivate'],
+                r['logicaldbkey'] ])
+        REFDATA_SOURCE = 'database'
+
+        if snapshotFile:
+            # the snapshot is only an optimization; don't fail the load
+            # if it cannot be written
+            try:
+                fp = open (snapshotFile + '.tmp', 'w')
+                json.dump ({ 'login' : login, 'rows' : rows }, fp)
+                fp.close()
+                os.replace (snapshotFile + '.tmp', snapshotFile)
+            except (IOError, OSError):
+                pass
+
+    for refMap in [ SYNONYM_TYPE_MAP, NOTE_TYPE_MAP, LOGICALDB_MAP,
+            LABEL_MAP, VOCAB_KEY_MAP, vocab_info_cache ]:
+        refMap.clear()
+
+    for (table, name, key, mgiType, simple, private, logicalDB) in rows:
+        if table == 'ACC_LogicalDB':
+            LOGICALDB_MAP[name] = key
+        elif table == 'MGI_SynonymType':
+            SYNONYM_TYPE_MAP.setdefault (mgiType, {})[name.lower()] = key
+        elif table == 'MGI_NoteType':
+            NOTE_TYPE_MAP.setdefault (mgiType, {})[name.lower()] = key
+        elif table == 'DAG_Label':
+            LABEL_MAP[name] = key
+        elif table == 'VOC_Vocab':
+            VOCAB_KEY_MAP[name] = key
+            vocab_info_cache[key] = (simple, private, logicalDB, name, key)
+    return
+
 ###--- Private Functions ---###
 
 vocab_info_cache = {}   # used as a cache for 'getVocabAttributes()' function
 
+# the reference data, as one query; see loadReferenceData()
+REFDATA_SQL = '''select 'ACC_LogicalDB' as tablename, name, _LogicalDB_key as objectkey,
+            null::int as mgitypekey, null::int as issimple, null::int as isprivate,
+            null::int as logicaldbkey
+        from ACC_LogicalDB
+    union all
+    select 'MGI_SynonymType', synonymType, _SynonymType_key, _MGIType_key, null, null, null
+        from MGI_SynonymType
+    union all
+    select 'MGI_NoteType', noteType, _NoteType_key, _MGIType_key, null, null, null
+        from MGI_NoteType
+    union all
+    select 'DAG_Label', label, _Label_key, null, null, null, null
+        from DAG_Label
+    union all
+    select 'VOC_Vocab', name, _Vocab_key, null, isSimple, isPrivate, _LogicalDB_key
+        from VOC_Vocab'''
+
+def getReferenceMap (
+    refMap,         # one of the reference data dictionaries
+    subKey = None,  # _MGIType_key, for dictionaries keyed by it
+    item = None     # the item about to be looked up in the map, if any
+    ):
+    # PRIVATE FUNCTION
+    #
+    # Purpose: return 'refMap' (or refMap[subKey]), loading the
+    #   reference data first if that has not been done yet
+    # Returns: dictionary
+    # Assumes: nothing
+    # Effects: may call loadReferenceData(); if 'item' is not found and
+    #   the data came from a snapshot, reloads them from the database
+    #   in case the snapshot is older than 'item'
+    # Throws: propagates any exceptions from loadReferenceData()
+
+    if REFDATA_SOURCE is None:
+        loadReferenceData ()
+
+    if subKey is None:
+        result = refMap
+    else:
+        result = refMap.get (subKey, {})
+
+    if item is not None and item not in result and REFDATA_SOURCE == 'snapshot':
+        loadReferenceData (useSnapshot = 0)
+        return getReferenceMap (refMap, subKey)
+
+    return result
+
 def getVocabAttributes (
     vocab       # integer vocabulary key or str.vocabulary name
     ):
@@ -848,6 +2183,9 @@ def getVocabAttributes (
         vocab = getVocabKey (vocab)
 
     # get it from the database if it's not in the cache already
+    # (the reference data fills the cache with all vocabularies)
+
+    getReferenceMap (vocab_info_cache)
 
     if vocab not in vocab_info_cache:
         result = db.sql('''select isSimple, isPrivate, _LogicalDB_key,
@@ -0,0 +1,181 @@
+#
+# test_loadTerms.py
+#
+# Purpose: unit tests of bin/loadTerms.py which need no database
+#
+# Usage: python -m unittest discover -s test
+#   (with the MGI python libraries, as for loadTerms.py itself, on
+#   PYTHONPATH)
+#
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+VOCLOAD = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('VOCLOAD', VOCLOAD)
+os.environ.setdefault('DAG_ROOT_ID', '')
+sys.path.insert(0, os.path.join(VOCLOAD, 'lib'))
+sys.path.insert(0, os.path.join(VOCLOAD, 'bin'))
+
+import vocloadlib
+import loadTerms
+
+EIGHT_COLUMNS = ['term', 'accID', 'status', 'abbreviation',
+    'note', 'comment', 'synonyms', 'otherIDs']
+NINE_COLUMNS = ['term', 'accID', 'status', 'abbreviation',
+    'note', 'comment', 'synonyms', 'synonymTypes', 'otherIDs']
+
+def readRecord (line, fieldnames):
+    # Purpose: read one line of a termfile as loadTerms.py does
+    # Returns: the record (TabRecord)
+
+    (fd, filename) = tempfile.mkstemp(suffix = '.txt')
+    try:
+        fp = os.fdopen(fd, 'w')
+        fp.write(line + '\n')
+        fp.close()
+        return list(vocloadlib.readTabFile(filename, fieldnames))[0]
+    finally:
+        os.remove(filename)
+
+def termLoad (useSynonymType):
+    # Purpose: a TermLoad with just the settings getFingerprint() uses
+    #   (without reading a file or touching the database)
+
+    load = loadTerms.TermLoad.__new__(loadTerms.TermLoad)
+    load.useSynonymType = useSynonymType
+    return load
+
+class NullLog:
+    def writeline (self, line):
+        pass
+
+class FingerprintTest (unittest.TestCase):
+
+    def testEightColumnRecord (self):
+        record = readRecord('term one\tGO:0000001\tcurrent\t\tdef\tcomment\tsyn b|syn a\tGO:0000009',
+            EIGHT_COLUMNS)
+        fingerprint = termLoad(0).getFingerprint(record)
+        self.assertEqual(len(fingerprint), 40)
+
+        # the same as a nine-column record with "exact" synonym types
+        record = readRecord('term one\tGO:0000001\tcurrent\t\tdef\tcomment\tsyn b|syn a\texact|exact\tGO:0000009',
+            NINE_COLUMNS)
+        self.assertEqual(fingerprint, termLoad(1).getFingerprint(record))
+
+    def testSynonymTypeChange (self):
+        load = termLoad(1)
+        before = readRecord('term one\tMP:0000001\tcurrent\t\t\t\tsyn a\texact\t', NINE_COLUMNS)
+        after = readRecord('term one\tMP:0000001\tcurrent\t\t\t\tsyn a\tbroad\t', NINE_COLUMNS)
+        self.assertNotEqual(load.getFingerprint(before), load.getFingerprint(after))
+
+class ChangedTermsTest (unittest.TestCase):
+
+    def setUp (self):
+        self.records = [
+            readRecord('term one\tMP:0000001\tcurrent\t\t\t\t\t\t', NINE_COLUMNS),
+            readRecord('term two\tMP:0000002\tcurrent\t\t\t\t\t\t', NINE_COLUMNS),
+            readRecord('term three\tMP:0000003\tcurrent\t\t\t\t\t\t', NINE_COLUMNS),
+            readRecord('term four\tMP:0000004\tcurrent\t\t\t\t\t\t', NINE_COLUMNS),
+            ]
+        self.load = termLoad(1)
+        self.load.datafile = self.records
+        self.lastFingerprints = {}
+        for record in self.records:
+            self.lastFingerprints[record['accID']] = \
+                self.load.getFingerprint(record)
+
+    def testClassification (self):
+        # term one: unchanged, so skipped
+        # term two: its record changed since the fingerprints were saved
+        # term three: changed in the database since (by another load)
+        # term four: not in the database, so left to the add pass
+        self.lastFingerprints['MP:0000002'] = 'x' * 40
+        primaryTermIDs = {
+            'MP:0000001' : [ 101, 0, 'term one', 0 ],
+            'MP:0000002' : [ 102, 0, 'term two', 0 ],
+            'MP:0000003' : [ 103, 1, 'term three', 0 ],
+            }
+        changed = self.load.findChangedTerms(self.lastFingerprints,
+            primaryTermIDs)
+        self.assertEqual(changed, set([ 102, 103 ]))
+        self.assertEqual(len(self.load.fingerprints), 4)
+
+    def testNoFingerprints (self):
+        primaryTermIDs = { 'MP:0000001' : [ 101, 0, 'term one', 0 ] }
+        self.assertEqual(self.load.findChangedTerms({}, primaryTermIDs),
+            set([ 101 ]))
+
+class ReserveKeysTest (unittest.TestCase):
+
+    def testCounts (self):
+        load = termLoad(1)
+        load.keys = mock.Mock()
+        load.reserveKeys([
+            readRecord('term one\tMP:0000001\tcurrent\t\t\tnote\tsyn a|syn b\texact|exact\tMP:0000009',
+                NINE_COLUMNS),
+            readRecord('term two\tMP:0000002\tcurrent\t\t\t\t\t\t', NINE_COLUMNS),
+            ])
+        reserved = dict([ args for (args, kwargs) in load.keys.reserve.call_args_list ])
+        self.assertEqual(reserved, { 'VOC_Term' : 2, 'MGI_Note' : 1,
+            'MGI_Synonym' : 2, 'ACC_Accession' : 3 })
+
+class SaveFingerprintsTest (unittest.TestCase):
+
+    def setUp (self):
+        self.dir = tempfile.mkdtemp()
+        self.load = termLoad(1)
+        self.load.datafile = [ readRecord(
+            'term one\tMP:0000001\tcurrent\t\t\t\t\t\t', NINE_COLUMNS) ]
+        self.load.fingerprints = None
+        self.load.fingerprintFileName = os.path.join(self.dir, 'fingerprints')
+        self.load.vocab_key = 5
+        self.load.log = NullLog()
+        self.state = mock.patch.object(vocloadlib, 'getVocabState',
+            return_value = '1|2026-10-17')
+        self.state.start()
+        del vocloadlib.PENDING_FILES[:]
+
+    def tearDown (self):
+        del vocloadlib.PENDING_FILES[:]
+        self.state.stop()
+        shutil.rmtree(self.dir)
+
+    def testCommit (self):
+        self.load.saveFingerprints()
+        self.assertEqual(self.load.readFingerprints(), {})
+
+        with mock.patch.object(vocloadlib.db, 'commit', create = True):
+            vocloadlib.commit()
+        self.assertEqual(list(self.load.readFingerprints()), [ 'MP:0000001' ])
+        self.assertEqual(vocloadlib.PENDING_FILES, [])
+
+    def testRollback (self):
+        # the fingerprints of an earlier load stay in place when a later
+        # one saves its fingerprints but never commits
+        self.load.saveFingerprints()
+        with mock.patch.object(vocloadlib.db, 'commit', create = True):
+            vocloadlib.commit()
+        before = self.load.readFingerprints()
+
+        self.load.fingerprints = { 'MP:0000001' : 'x' * 40 }
+        self.load.saveFingerprints()
+        with mock.patch.object(vocloadlib.db, 'commit', create = True,
+                side_effect = RuntimeError('commit failed')):
+            self.assertRaises(RuntimeError, vocloadlib.commit)
+        self.assertEqual(self.load.readFingerprints(), before)
+
+    def testVocabularyChanged (self):
+        self.load.saveFingerprints()
+        with mock.patch.object(vocloadlib.db, 'commit', create = True):
+            vocloadlib.commit()
+        with mock.patch.object(vocloadlib, 'getVocabState',
+                return_value = '1|2026-10-18'):
+            self.assertEqual(self.load.readFingerprints(), {})
+
+if __name__ == '__main__':
+    unittest.main()
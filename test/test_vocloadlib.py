@@ -0,0 +1,287 @@
+#
+# test_vocloadlib.py
+#
+# Purpose: unit tests of lib/vocloadlib.py which need no database (the
+#   db module's calls are replaced, and the SQL they are given checked)
+#
+# Usage: python -m unittest discover -s test
+#   (with the MGI python libraries, as for loadTerms.py itself, on
+#   PYTHONPATH)
+#
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+VOCLOAD = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(VOCLOAD, 'lib'))
+
+import vocloadlib
+
+class NullLog:
+    def writeline (self, line):
+        pass
+
+def writeFile (lines):
+    # Purpose: write 'lines' to a temp file
+    # Returns: the name of the file (which the caller removes)
+
+    (fd, filename) = tempfile.mkstemp(suffix = '.bcp')
+    fp = os.fdopen(fd, 'w')
+    for line in lines:
+        fp.write(line + '\n')
+    fp.close()
+    return filename
+
+class FakeCursor:
+    def __init__ (self, connection):
+        self.connection = connection
+
+    def copy_expert (self, sql, fp, size = 8192):
+        data = fp.read(size)
+        while data:
+            self.connection.copied.append(data)
+            data = fp.read(size)
+        self.connection.sql = sql
+
+class FakeConnection:
+    # a psycopg2 connection which keeps what was COPY'd to it, and which
+    # of it was committed
+
+    def __init__ (self, server):
+        self.server = server
+        self.copied = []
+        self.sql = None
+        self.closed = 0
+        server.connections.append(self)
+
+    def cursor (self):
+        return FakeCursor(self)
+
+    def commit (self):
+        self.server.committed[self.sql.split()[1]] = ''.join(self.copied)
+        self.copied = []
+
+    def rollback (self):
+        self.copied = []
+
+    def close (self):
+        self.closed = 1
+
+class FakeServer:
+    # stands in for the psycopg2 module
+
+    def __init__ (self):
+        self.connections = []
+        self.committed = {}     # table -> data committed
+
+    def connect (self, **login):
+        return FakeConnection(self)
+
+class BulkLoaderTest (unittest.TestCase):
+
+    def setUp (self):
+        self.dir = tempfile.mkdtemp()
+        self.server = FakeServer()
+        self.patches = [
+            mock.patch.object(vocloadlib, 'psycopg2', self.server),
+            mock.patch.dict(os.environ, { 'BCP_MAX_WORKERS' : '3',
+                'BULK_LOAD_MODE' : 'file' }),
+            ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown (self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.dir)
+
+    def loader (self, rows = {}):
+        # a BulkLoader of three DAG tables, from files unless given in
+        # 'rows' (table -> iterable of rows)
+
+        loader = vocloadlib.BulkLoader(NullLog())
+        for (table, after) in [ ('DAG_Node', []), ('DAG_Edge', [ 'DAG_Node' ]),
+                ('DAG_Closure', [ 'DAG_Node' ]) ]:
+            filename = os.path.join(self.dir, table + '.bcp')
+            if table not in rows:
+                fp = open(filename, 'w')
+                fp.write('1|%s\n' % table)
+                fp.close()
+            loader.add(table, filename, after, rows.get(table))
+        return loader
+
+    def testConnectionPerLoad (self):
+        with mock.patch.object(vocloadlib.db, 'bcp', create = True) as bcp:
+            self.loader().run()
+        self.assertFalse(bcp.called)
+        self.assertEqual(len(self.server.connections), 3)
+        for connection in self.server.connections:
+            self.assertTrue(connection.closed)
+        self.assertEqual(self.server.committed, {
+            'DAG_Node' : '1|DAG_Node\n', 'DAG_Edge' : '1|DAG_Edge\n',
+            'DAG_Closure' : '1|DAG_Closure\n' })
+
+    def testWithoutPsycopg2 (self):
+        # db.bcp() promises no connection of its own, so the files are
+        # loaded one at a time, in order
+        loads = []
+        def bcp (filename, table, delimiter = '\t'):
+            loads.append(table)
+        with mock.patch.object(vocloadlib, 'psycopg2', None), \
+                mock.patch.object(vocloadlib.db, 'bcp', bcp, create = True):
+            loader = self.loader()
+            self.assertEqual(loader.maxWorkers, 1)
+            loader.run()
+        self.assertEqual(loads, [ 'DAG_Node', 'DAG_Edge', 'DAG_Closure' ])
+
+    def testRowsFailPartway (self):
+        # the rows for DAG_Closure raise after some have been COPY'd, by
+        # when DAG_Node is committed and DAG_Edge is loading alongside
+        def closureRows ():
+            yield '1|1|1\n'
+            yield '1|2|1\n'
+            raise ValueError('no more rows')
+
+        with mock.patch.dict(os.environ, { 'BULK_LOAD_MODE' : 'tee' }):
+            loader = self.loader({ 'DAG_Closure' : closureRows() })
+            loader.add('DAG_Label', os.path.join(self.dir, 'label.bcp'),
+                [ 'DAG_Closure' ], [ '1|label\n' ])
+            self.assertRaises(vocloadlib.VocloadlibError, loader.run)
+
+        # the failed table is rolled back; the others stay committed
+        self.assertEqual(sorted(self.server.committed),
+            [ 'DAG_Edge', 'DAG_Node' ])
+        self.assertTrue(loader.outcome['DAG_Closure'].startswith('FAILED'))
+        self.assertEqual(loader.outcome['DAG_Label'], 'not loaded')
+        for connection in self.server.connections:
+            self.assertTrue(connection.closed)
+
+        # the tee file has the rows pulled before the failure
+        fp = open(os.path.join(self.dir, 'DAG_Closure.bcp'), 'r')
+        self.assertEqual(fp.read(), '1|1|1\n1|2|1\n')
+        fp.close()
+
+class TabFileReaderTest (unittest.TestCase):
+
+    def setUp (self):
+        self.filename = writeFile([ 'term one\tMP:0000001',
+            'term two\tMP:0000002' ])
+
+    def tearDown (self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def testStreaming (self):
+        reader = vocloadlib.readTabFile(self.filename, [ 'term', 'accID' ])
+        self.assertEqual([ r['accID'] for r in reader ],
+            [ 'MP:0000001', 'MP:0000002' ])
+        self.assertEqual(reader.records, None)
+        os.remove(self.filename)
+        self.assertRaises(IOError, list, reader)
+
+    def testCache (self):
+        reader = vocloadlib.readTabFile(self.filename, [ 'term', 'accID' ],
+            cache = 1)
+
+        # a pass which stops early caches nothing
+        for record in reader:
+            break
+        self.assertEqual(reader.records, None)
+
+        first = list(reader)
+        os.remove(self.filename)
+        second = list(reader)
+        self.assertEqual(second, first)
+        self.assertEqual([ r['term'] for r in second ],
+            [ 'term one', 'term two' ])
+
+class KeyAllocatorTest (unittest.TestCase):
+
+    def setUp (self):
+        self.sql = mock.patch.object(vocloadlib.db, 'sql', create = True,
+            side_effect = self.execute)
+        self.sql.start()
+        self.commands = []
+        self.sequence = 100
+
+    def tearDown (self):
+        self.sql.stop()
+
+    def execute (self, command, parser = 'auto'):
+        # a sequence whose last value is self.sequence
+        self.commands.append(command)
+        if 'nextval' in command:
+            count = int(command.split('+')[1].split('-')[0])
+            self.sequence = self.sequence + count
+            return [ { 'lastKey' : self.sequence } ]
+        return []
+
+    def testBlocks (self):
+        keys = vocloadlib.KeyAllocator()
+        keys.reserve('VOC_Term', 2)
+        self.assertEqual([ keys.next('VOC_Term') for i in range(5) ],
+            [ 101, 102, 103, 104, 105 ])
+
+        # three blocks, but max() is only queried once
+        self.assertEqual(len(self.commands), 4)
+        self.assertEqual(len([ c for c in self.commands if 'max(' in c ]), 1)
+        self.assertTrue('max(_Term_key)' in self.commands[0])
+
+        keys.finish()
+        self.assertTrue('setval(\'voc_term_seq\', 105)' in self.commands[-1])
+
+class BcpStagedTest (unittest.TestCase):
+
+    def setUp (self):
+        self.filename = writeFile([ '1001|term one|', "1002|term's two|a note" ])
+        self.sql = mock.patch.object(vocloadlib.db, 'sql', create = True,
+            return_value = [])
+        self.commands = self.sql.start()
+
+    def tearDown (self):
+        self.sql.stop()
+        os.remove(self.filename)
+
+    def statements (self):
+        return [ args[0] for (args, kwargs) in self.commands.call_args_list ]
+
+    def testStaging (self):
+        vocloadlib.bcpStaged(self.filename, 'VOC_Term', NullLog())
+        self.assertEqual(self.statements(), [
+            'create temp table tmp_vocload_voc_term (like VOC_Term)',
+            "insert into tmp_vocload_voc_term values ('1001','term one',null),\n"
+                "('1002','term''s two','a note')",
+            'insert into VOC_Term select * from tmp_vocload_voc_term',
+            'drop table tmp_vocload_voc_term',
+            ])
+
+    def testBatches (self):
+        filename = writeFile([ '%d|term' % i for i in range(5) ])
+        try:
+            vocloadlib.stageFile(filename, 'tmp_stage', NullLog())
+        finally:
+            os.remove(filename)
+        self.assertEqual(len(self.statements()), 1)
+
+        filename = writeFile([ '%d|term' % i
+            for i in range(vocloadlib.SQL_BATCH_SIZE + 1) ])
+        try:
+            vocloadlib.stageFile(filename, 'tmp_stage', NullLog())
+        finally:
+            os.remove(filename)
+        self.assertEqual(len(self.statements()), 3)
+
+    def testNoLoad (self):
+        vocloadlib.setNoload(1)
+        try:
+            vocloadlib.bcpStaged(self.filename, 'VOC_Term', NullLog())
+        finally:
+            vocloadlib.setNoload(0)
+        self.assertEqual(self.statements(), [])
+
+if __name__ == '__main__':
+    unittest.main()